@@ -3,7 +3,7 @@ import os
 import webbrowser
 import json
 import re
-from typing import Callable, List, Dict, Any
+from typing import Callable, List, Dict, Any, Optional
 
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
@@ -13,7 +13,7 @@ from PySide6.QtWidgets import (
     QTableWidgetItem, QHeaderView, QFileDialog, QInputDialog, QDialog,
     QDialogButtonBox, QCheckBox, QAbstractItemView, QToolBar, QTreeWidget, QTreeWidgetItem
 )
-from PySide6.QtCore import QDateTime, Qt, QDate, QTime, QUrl, QTimeZone, QByteArray, QUrlQuery, QFile, QIODevice
+from PySide6.QtCore import QDateTime, Qt, QDate, QTime, QUrl, QTimeZone, QByteArray, QUrlQuery, QFile, QIODevice, QTimer
 from PySide6.QtGui import QIcon, QColor, QFont, QPixmap, QPainter, QAction
 from PySide6.QtSvg import QSvgRenderer
 from PySide6.QtNetwork import QNetworkAccessManager, QNetworkRequest, QNetworkReply, QHttpMultiPart, QHttpPart 
@@ -23,6 +23,25 @@ from spreadsheet_widget import SpreadsheetWidget, ColumnSpec
 
 API_URL = "https://auto-report-backend.onrender.com"
 
+# Server nén JSON bằng gzip: Qt tự gửi Accept-Encoding và tự giải nén khi request KHÔNG tự đặt header này.
+# JSON lặp nhiều (template_data) có thể nén hơn 40 lần, vượt ngưỡng chống "bom giải nén" mặc định của Qt
+# (áp dụng từ 10 MiB) nên nới ngưỡng cho API của chính hệ thống.
+DECOMPRESSED_SAFETY_THRESHOLD = 256 * 1024 * 1024
+
+def api_request(url: QUrl) -> QNetworkRequest:
+    req = QNetworkRequest(url)
+    req.setDecompressedSafetyCheckThreshold(DECOMPRESSED_SAFETY_THRESHOLD)
+    return req
+
+def _show_upload_progress(label: QLabel, sent: int, total: int):
+    """Tiến độ gửi file đính kèm lên server; gửi xong thì server mới chuyển tiếp lên Google Drive."""
+    if total <= 0:
+        return
+    if sent < total:
+        label.setText(f"Đang tải lên... {sent * 100 // total}%")
+    else:
+        label.setText("Đang chuyển lên Google Drive...")
+
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     try:
@@ -43,29 +62,51 @@ def handle_api_error(self, status_code, response_text, context_message):
     QMessageBox.critical(self, "Lỗi", f"{context_message}\nLỗi từ server (Code: {status_code}): {detail}")
 
 class Paginator:
-    def __init__(self, page_size=20):
-        self.page = 1
+    """
+    Vẽ danh sách dài theo từng trang khi cuộn: chỉ tạo widget cho trang đầu, trang tiếp theo được thêm
+    khi thanh cuộn chạm đáy (hoặc khi danh sách chưa lấp đầy khung nhìn).
+    Không tải thêm từ API: yêu cầu, báo cáo và trường của admin đến từ GET /sync (một lần đầy đủ rồi
+    chỉ các thay đổi), nên dữ liệu đã có sẵn; phân trang ở đây chỉ tránh tạo hàng nghìn widget cùng lúc.
+    Dòng đã sắp xếp theo cùng thứ tự với API: (deadline, id) hoặc (name, id).
+    """
+    def __init__(self, list_widget: QListWidget, render_row: Callable[[Dict[str, Any]], None], page_size=50):
+        self.list_widget = list_widget
+        self.render_row = render_row
         self.page_size = page_size
-        self.has_next = False
-
-    def next(self):
-        if self.has_next:
-            self.page += 1
-
-    def prev(self):
-        if self.page > 1:
-            self.page -= 1
+        self._rows: List[Dict[str, Any]] = []
+        self._shown = 0
+        list_widget.verticalScrollBar().valueChanged.connect(self._on_scroll)
 
     @property
-    def skip(self):
-        return (self.page - 1) * self.page_size
+    def has_next(self):
+        return self._shown < len(self._rows)
+
+    def reset(self, rows: List[Dict[str, Any]]):
+        """Thay toàn bộ dữ liệu, giữ vị trí cuộn nếu các trang đã xem vẫn còn đủ dòng."""
+        scroll_bar = self.list_widget.verticalScrollBar()
+        position = scroll_bar.value()
+        shown = max(self._shown, self.page_size)
+        self.list_widget.clear()
+        self._rows = rows
+        self._shown = 0
+        while self.has_next and self._shown < shown:
+            self.next()
+        scroll_bar.setValue(position)
+        QTimer.singleShot(0, self._fill_viewport)
 
-    @property
-    def limit(self):
-        return self.page_size
+    def next(self):
+        for row in self._rows[self._shown:self._shown + self.page_size]:
+            self.render_row(row)
+        self._shown = min(self._shown + self.page_size, len(self._rows))
+
+    def _on_scroll(self, value):
+        if self.has_next and value >= self.list_widget.verticalScrollBar().maximum():
+            self.next()
 
-    def mark_result(self, count):
-        self.has_next = (count >= self.page_size)
+    def _fill_viewport(self):
+        if self.has_next and self.list_widget.verticalScrollBar().maximum() == 0:
+            self.next()
+            QTimer.singleShot(0, self._fill_viewport)
 
 class DataReportListItemWidget(QWidget):
     def __init__(self, report_id, title, deadline, schema, template_data, is_locked, attachment_url, description, parent=None):
@@ -170,7 +211,8 @@ class DataReportListItemWidget(QWidget):
                 attachment_label.setText("Lỗi tải lên.")
                 handle_api_error(dialog, s, e, "Không thể tải file.")
             
-            main_window.api_upload_file("/admin/upload-attachment", file_path, on_success, on_error)
+            main_window.api_upload_file("/admin/upload-attachment", file_path, on_success, on_error,
+                                        on_progress=lambda sent, total: _show_upload_progress(attachment_label, sent, total))
 
         attachment_btn = QPushButton("Chọn file khác...")
         attachment_btn.clicked.connect(select_new_attachment)
@@ -311,7 +353,8 @@ class FileTaskListItemWidget(QWidget):
             def on_error(s, e):
                 attachment_label.setText("Lỗi tải lên.")
                 handle_api_error(dialog, s, e, "Không thể tải file.")
-            main_window.api_upload_file("/admin/upload-attachment", file_path, on_success, on_error)
+            main_window.api_upload_file("/admin/upload-attachment", file_path, on_success, on_error,
+                                        on_progress=lambda sent, total: _show_upload_progress(attachment_label, sent, total))
 
         attachment_btn = QPushButton("Chọn file khác...")
         attachment_btn.clicked.connect(select_new_attachment)
@@ -564,6 +607,8 @@ class AdminWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.network_manager = QNetworkAccessManager(self)
+        # Phản hồi GET gần nhất theo URL: {url: (etag, body)} để gửi If-None-Match
+        self._etag_cache = {}
         self.setWindowTitle("Bảng điều khiển cho Quản trị viên")
         self.setWindowIcon(QIcon(resource_path('baocao.ico')))
         self.setGeometry(100, 100, 1400, 850)
@@ -608,6 +653,9 @@ class AdminWindow(QMainWindow):
         self._custom_selected_school_ids = set()
         self._ft_custom_selected_school_ids = set() 
         self._school_year_cache = []
+        # Bản sao cục bộ nhận qua GET /sync (id -> dòng), cursor None = lần sau tải toàn bộ
+        self._sync_cursor = None
+        self._sync_rows = {"file_task": {}, "data_report": {}, "school": {}}
 
         self.dashboard_tab, self.school_years_tab, self.schools_tab, self.file_tasks_tab, self.data_reports_tab, self.report_tab, self.settings_tab = (QWidget() for _ in range(7))
         self.create_main_dashboard()
@@ -624,13 +672,18 @@ class AdminWindow(QMainWindow):
         self.stacked_widget.setCurrentWidget(self.dashboard_tab)
         self.load_all_initial_data()
 
-    def _handle_reply(self, reply: QNetworkReply, on_success: Callable, on_error: Callable):
+    def _handle_reply(self, reply: QNetworkReply, on_success: Callable, on_error: Callable, cache_key: str = None):
         if reply.error() == QNetworkReply.NoError:
             status_code = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
             response_data = bytes(reply.readAll()).decode('utf-8')
             if 200 <= status_code < 300:
                 try:
-                    on_success(json.loads(response_data) if response_data else {}, {})
+                    headers = {bytes(name).decode('latin-1'): bytes(value).decode('latin-1')
+                               for name, value in reply.rawHeaderPairs()}
+                    etag = headers.get("ETag") or headers.get("etag")
+                    if cache_key is not None and etag:
+                        self._etag_cache[cache_key] = (etag, response_data, headers)
+                    on_success(json.loads(response_data) if response_data else {}, headers)
                 except json.JSONDecodeError:
                     on_error(status_code, "Lỗi giải mã JSON.")
             else:
@@ -647,26 +700,57 @@ class AdminWindow(QMainWindow):
                 if v is not None:
                     query.addQueryItem(k, str(v))
             url.setQuery(query)
-        req = QNetworkRequest(url)
+        req = api_request(url)
+        # Gửi ETag của lần tải trước; 304 nghĩa là dùng lại dữ liệu đã có
+        cache_key = url.toString()
+        cached = self._etag_cache.get(cache_key)
+        if cached:
+            req.setRawHeader(b"If-None-Match", cached[0].encode('latin-1'))
         reply = self.network_manager.get(req)
-        reply.finished.connect(lambda: self._handle_reply(reply, on_success, on_error))
+
+        def finished():
+            status_code = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+            if cached and status_code == 304:
+                reply.deleteLater()
+                on_success(json.loads(cached[1]) if cached[1] else {}, cached[2])
+                return
+            self._handle_reply(reply, on_success, on_error, cache_key)
+
+        reply.finished.connect(finished)
+
+    def api_get_all_pages(self, endpoint: str, on_success: Callable, on_error: Callable, params: dict = None):
+        """
+        Tải hết một danh sách phân trang keyset: gửi lại header X-Next-Cursor của mỗi trang qua ?cursor=
+        cho tới trang cuối (không có header), rồi gọi on_success với toàn bộ các dòng.
+        """
+        rows = []
+
+        def on_page(data, headers):
+            rows.extend(data)
+            next_cursor = headers.get("X-Next-Cursor") or headers.get("x-next-cursor")
+            if next_cursor:
+                self.api_get(endpoint, on_page, on_error, params={**(params or {}), "cursor": next_cursor})
+            else:
+                on_success(rows, headers)
+
+        self.api_get(endpoint, on_page, on_error, params=params)
 
     def api_post(self, endpoint: str, data: dict, on_success: Callable, on_error: Callable):
-        req = QNetworkRequest(QUrl(f"{API_URL}{endpoint}"))
+        req = api_request(QUrl(f"{API_URL}{endpoint}"))
         req.setHeader(QNetworkRequest.ContentTypeHeader, "application/json")
         payload = QByteArray(json.dumps(data, ensure_ascii=False).encode('utf-8'))
         reply = self.network_manager.post(req, payload)
         reply.finished.connect(lambda: self._handle_reply(reply, on_success, on_error))
 
     def api_put(self, endpoint: str, data: dict, on_success: Callable, on_error: Callable):
-        req = QNetworkRequest(QUrl(f"{API_URL}{endpoint}"))
+        req = api_request(QUrl(f"{API_URL}{endpoint}"))
         req.setHeader(QNetworkRequest.ContentTypeHeader, "application/json")
         payload = QByteArray(json.dumps(data, ensure_ascii=False).encode('utf-8'))
         reply = self.network_manager.put(req, payload)
         reply.finished.connect(lambda: self._handle_reply(reply, on_success, on_error))
 
     def api_delete(self, endpoint: str, on_success: Callable, on_error: Callable):
-        req = QNetworkRequest(QUrl(f"{API_URL}{endpoint}"))
+        req = api_request(QUrl(f"{API_URL}{endpoint}"))
         reply = self.network_manager.deleteResource(req)
         reply.finished.connect(lambda: self._handle_reply(reply, on_success, on_error))
 
@@ -682,7 +766,7 @@ class AdminWindow(QMainWindow):
 
         # Gửi GET và tự theo redirect (không dùng FollowRedirectsAttribute)
         def do_get(url_obj: QUrl, redirects_left: int = 5):
-            req = QNetworkRequest(url_obj)
+            req = api_request(url_obj)
             req.setTransferTimeout(60000)
             req.setRawHeader(
                 b"Accept",
@@ -731,9 +815,10 @@ class AdminWindow(QMainWindow):
 
         do_get(url)
 
-    def api_upload_file(self, endpoint: str, file_path: str, on_success: Callable, on_error: Callable):
+    def api_upload_file(self, endpoint: str, file_path: str, on_success: Callable, on_error: Callable,
+                        on_progress: Optional[Callable[[int, int], None]] = None):
         url = QUrl(f"{API_URL}{endpoint}")
-        req = QNetworkRequest(url)
+        req = api_request(url)
 
         multi_part = QHttpMultiPart(QHttpMultiPart.FormDataType)
         
@@ -763,47 +848,81 @@ class AdminWindow(QMainWindow):
         reply = self.network_manager.post(req, multi_part)
         multi_part.setParent(reply)
         
+        if on_progress:
+            reply.uploadProgress.connect(on_progress)
         reply.finished.connect(lambda: self._handle_reply(reply, on_success, on_error))
 
     def load_all_initial_data(self):
         self.load_dashboard_stats()
         self.load_school_years()
-        self.load_schools()
-        self.load_file_tasks()
-        self.load_data_reports()
-        self.load_report_file_tasks_list()
-        self.load_report_data_reports_list()
+        self.sync_data()
 
     def load_report_file_tasks_list(self):
-        def on_success(data, _):
-            self.fr_task_selector.clear()
-            self.fr_task_selector.addItem("--- Vui lòng chọn một yêu cầu ---", userData=None)
-            sorted_tasks = sorted(data, key=lambda x: x.get('deadline', ''), reverse=True)
-            for task in sorted_tasks:
-                self.fr_task_selector.addItem(f"ID {task['id']}: {task['title']}", userData=task['id'])
-
-        def on_error(s, e):
-            handle_api_error(self, s, e, "Không thể tải danh sách yêu cầu nộp file.")
-            self.fr_task_selector.clear()
-            self.fr_task_selector.addItem("Lỗi khi tải danh sách", userData=None)
-
-        self.api_get("/file-tasks/", on_success, on_error, params={"limit": 1000})
-
+        self.sync_data()
 
     def load_report_data_reports_list(self):
-        def on_success(data, _):
-            self.dr_report_selector.clear()
-            self.dr_report_selector.addItem("--- Vui lòng chọn một báo cáo ---", userData=None)
-            sorted_reports = sorted(data, key=lambda x: x.get('deadline', ''), reverse=True)
-            for report in sorted_reports:
-                self.dr_report_selector.addItem(f"ID {report['id']}: {report['title']}", userData=report['id'])
+        self.sync_data()
+
+    def sync_data(self):
+        """
+        Đồng bộ tăng dần qua GET /sync: chỉ nhận yêu cầu, báo cáo, trường đã thay đổi sau cursor lần trước,
+        cập nhật bản sao cục bộ rồi vẽ lại những danh sách có thay đổi.
+        """
+        def on_success(payload, _):
+            full = payload.get('full', True)
+            deleted = payload.get('deleted', {})
+            changed = set()
+            for entity, key in (("file_task", "file_tasks"), ("data_report", "data_reports"), ("school", "schools")):
+                rows = self._sync_rows[entity]
+                if full:
+                    rows.clear()
+                    changed.add(entity)
+                for row in payload.get(key, []):
+                    rows[row['id']] = row
+                    changed.add(entity)
+                for item_id in deleted.get(entity, []):
+                    if rows.pop(item_id, None) is not None:
+                        changed.add(entity)
+            self._sync_cursor = payload.get('cursor')
+
+            if "file_task" in changed:
+                self._render_file_tasks()
+                self._render_report_selector(self.fr_task_selector, self._sync_rows["file_task"],
+                                             "--- Vui lòng chọn một yêu cầu ---")
+            if "data_report" in changed:
+                self._render_data_reports()
+                self._render_report_selector(self.dr_report_selector, self._sync_rows["data_report"],
+                                             "--- Vui lòng chọn một báo cáo ---")
+            if "school" in changed:
+                self._render_schools()
+            if not full and (payload.get('school_years') or deleted.get('school_year')):
+                self.load_school_years()
 
         def on_error(s, e):
-            handle_api_error(self, s, e, "Không thể tải danh sách báo cáo nhập liệu.")
-            self.dr_report_selector.clear()
-            self.dr_report_selector.addItem("Lỗi khi tải danh sách", userData=None)
-            
-        self.api_get("/data-reports/", on_success, on_error, params={"limit": 1000})
+            handle_api_error(self, s, e, "Không thể đồng bộ dữ liệu.")
+
+        params = {"since": self._sync_cursor} if self._sync_cursor else None
+        self.api_get("/sync", on_success, on_error, params=params)
+
+    @staticmethod
+    def _sorted_by_deadline(rows: dict) -> list:
+        # Cùng thứ tự với API: hạn nộp mới nhất trước, cùng hạn thì id lớn trước
+        return sorted(rows.values(), key=lambda r: (r.get('deadline') or '', r['id']), reverse=True)
+
+    def _render_report_selector(self, selector: QComboBox, rows: dict, placeholder: str):
+        """Vẽ lại combobox chọn yêu cầu/báo cáo ở tab Báo cáo, giữ nguyên mục đang chọn nếu còn."""
+        current_id = selector.currentData()
+        selector.blockSignals(True)
+        selector.clear()
+        selector.addItem(placeholder, userData=None)
+        for row in self._sorted_by_deadline(rows):
+            selector.addItem(f"ID {row['id']}: {row['title']}", userData=row['id'])
+        index = selector.findData(current_id) if current_id is not None else 0
+        selector.setCurrentIndex(max(index, 0))
+        selector.blockSignals(False)
+        if current_id is not None and index < 0:
+            # Mục đang xem đã bị xóa
+            selector.currentIndexChanged.emit(0)
 
     def create_main_dashboard(self):
         layout = QVBoxLayout(self.dashboard_tab)
@@ -953,6 +1072,7 @@ class AdminWindow(QMainWindow):
         list_layout = QVBoxLayout(list_card)
         list_layout.addWidget(QLabel("<b>Danh sách Trường học và API Key</b>"))
         self.schools_list_widget = QListWidget()
+        self.schools_pager = Paginator(self.schools_list_widget, self._add_school_row)
         list_layout.addWidget(self.schools_list_widget)
         left_layout.addWidget(list_card)
         
@@ -1010,7 +1130,8 @@ class AdminWindow(QMainWindow):
             self.ft_attachment_label.setStyleSheet("font-style: italic; color: red;")
             handle_api_error(self, s, e, "Không thể tải file lên.")
 
-        self.api_upload_file("/admin/upload-attachment", file_path, on_success, on_error)
+        self.api_upload_file("/admin/upload-attachment", file_path, on_success, on_error,
+                             on_progress=lambda sent, total: _show_upload_progress(self.ft_attachment_label, sent, total))
        
     def create_data_reports_tab(self):
         layout = QVBoxLayout(self.data_reports_tab)
@@ -1094,6 +1215,7 @@ class AdminWindow(QMainWindow):
         list_layout = QVBoxLayout(list_card)
         list_layout.addWidget(QLabel("<b>Danh sách đã ban hành</b>"))
         self.data_reports_list_widget = QListWidget()
+        self.dr_pager = Paginator(self.data_reports_list_widget, self._add_data_report_row)
         list_layout.addWidget(self.data_reports_list_widget)
 
     def select_dr_attachment(self):
@@ -1115,53 +1237,9 @@ class AdminWindow(QMainWindow):
             self.dr_attachment_label.setStyleSheet("font-style: italic; color: red;")
             handle_api_error(self, s, e, "Không thể tải file lên.")
 
-        self.api_upload_file("/admin/upload-attachment", file_path, on_success, on_error)
+        self.api_upload_file("/admin/upload-attachment", file_path, on_success, on_error,
+                             on_progress=lambda sent, total: _show_upload_progress(self.dr_attachment_label, sent, total))
         
-    def _create_paginated_list_tab(self, page_size="20"):
-        tab_widget = QWidget()
-        layout = QVBoxLayout(tab_widget)
-
-        top_layout = QHBoxLayout()
-        filter_sy_selector = QComboBox()
-        top_layout.addWidget(QLabel("Lọc theo năm học:"))
-        top_layout.addWidget(filter_sy_selector, 1)
-        reload_button = QPushButton("Làm mới")
-        top_layout.addWidget(reload_button)
-        layout.addLayout(top_layout)
-
-        list_widget = QListWidget()
-        list_widget.setSelectionMode(QAbstractItemView.SingleSelection)
-        layout.addWidget(list_widget, 1)
-
-        pag_layout = QHBoxLayout()
-        prev_button = QPushButton("◀ Trước")
-        next_button = QPushButton("Tiếp ▶")
-        info_label = QLabel("Trang 1")
-        size_selector = QComboBox()
-        size_selector.addItems(["10", "20", "50"])
-        size_selector.setCurrentText(page_size)
-
-        pag_layout.addWidget(prev_button)
-        pag_layout.addWidget(next_button)
-        pag_layout.addSpacing(15)
-        pag_layout.addWidget(QLabel("Kích thước trang:"))
-        pag_layout.addWidget(size_selector)
-        pag_layout.addStretch(1)
-        pag_layout.addWidget(info_label)
-        layout.addLayout(pag_layout)
-
-        return {
-            "tab": tab_widget,
-            "filter_sy_selector": filter_sy_selector,
-            "reload_button": reload_button,
-            "list_widget": list_widget,
-            "prev_button": prev_button,
-            "next_button": next_button,
-            "info_label": info_label,
-            "size_selector": size_selector,
-            "pager": Paginator(page_size=int(size_selector.currentText()))
-        }
-
     def create_report_tab(self):
         layout = QVBoxLayout(self.report_tab)
         
@@ -1330,7 +1408,10 @@ class AdminWindow(QMainWindow):
                 self.school_years_list_widget_tab.setItemWidget(item, widget)
                 for selector in selectors:
                     selector.addItem(sy['name'], userData=sy['id'])
-        self.api_get("/school_years/", on_success, lambda s, e: QMessageBox.critical(self, "Lỗi", f"Không thể tải năm học: {e}"))
+            # Danh sách báo cáo lọc theo năm học đang chọn
+            self._render_data_reports()
+        self.api_get_all_pages("/school_years/", on_success,
+                               lambda s, e: QMessageBox.critical(self, "Lỗi", f"Không thể tải năm học: {e}"))
 
     def add_new_school(self):
         school_name = self.school_name_input.text().strip()
@@ -1352,17 +1433,21 @@ class AdminWindow(QMainWindow):
         self.api_post("/schools/", {"name": school_name}, on_success, on_error)
 
     def load_schools(self):
-        def on_success(data, headers):
-            self._all_schools_cache = data[:]
-            self.schools_list_widget.clear()
-            for school in data:
-                item = QListWidgetItem()
-                widget = SchoolListItemWidget(school['id'], school['name'], school['api_key'])
-                item.setSizeHint(widget.sizeHint())
-                self.schools_list_widget.addItem(item)
-                self.schools_list_widget.setItemWidget(item, widget)
-            self.load_school_groups_ui()
-        self.api_get("/schools/", on_success, lambda s,e: QMessageBox.critical(self,"Lỗi",f"Không thể tải trường học: {e}"))
+        self.sync_data()
+
+    def _render_schools(self):
+        # Cùng thứ tự với GET /schools/: (name, id)
+        data = sorted(self._sync_rows["school"].values(), key=lambda s: (s['name'], s['id']))
+        self._all_schools_cache = data[:]
+        self.schools_pager.reset(data)
+        self.load_school_groups_ui()
+
+    def _add_school_row(self, school):
+        item = QListWidgetItem()
+        widget = SchoolListItemWidget(school['id'], school['name'], school['api_key'])
+        item.setSizeHint(widget.sizeHint())
+        self.schools_list_widget.addItem(item)
+        self.schools_list_widget.setItemWidget(item, widget)
 
     def add_new_file_task(self):
         school_year_id = self.ft_school_year_selector.currentData()
@@ -1416,31 +1501,28 @@ class AdminWindow(QMainWindow):
         self.api_post("/file-tasks/", payload, on_success, on_error)
         
     def load_file_tasks(self):
-        school_year_id = self.ft_filter_sy_selector.currentData()
-        params = {"school_year_id": school_year_id, "limit": 1000}
+        self.sync_data()
 
-        def on_ok(data, _):
-            self.file_tasks_list_widget.clear()
-            for t in data:
-                deadline_str = QDateTime.fromString(t['deadline'].replace('T', ' '), "yyyy-MM-dd HH:mm:ss").toString("HH:mm dd/MM/yyyy") if t.get('deadline') else "N/A"
-                w = FileTaskListItemWidget(
-                    task_id=t['id'],
-                    title=t['title'],
-                    content=t.get('content', ""),
-                    deadline=deadline_str,
-                    school_year_id=t['school_year_id'],
-                    is_locked=t.get('is_locked', False),
-                    attachment_url=t.get('attachment_url')
-                )
-                item = QListWidgetItem(self.file_tasks_list_widget)
-                item.setSizeHint(w.sizeHint())
-                self.file_tasks_list_widget.addItem(item)
-                self.file_tasks_list_widget.setItemWidget(item, w)
-
-        def on_err(s, e):
-            handle_api_error(self, s, e, "Không tải được danh sách Yêu cầu nộp file")
-
-        self.api_get("/file-tasks/", on_ok, on_err, params=params)
+    def _render_file_tasks(self):
+        school_year_id = self.ft_filter_sy_selector.currentData()
+        self.ft_pager.reset([t for t in self._sorted_by_deadline(self._sync_rows["file_task"])
+                             if school_year_id is None or t['school_year_id'] == school_year_id])
+
+    def _add_file_task_row(self, t):
+        deadline_str = QDateTime.fromString(t['deadline'].replace('T', ' '), "yyyy-MM-dd HH:mm:ss").toString("HH:mm dd/MM/yyyy") if t.get('deadline') else "N/A"
+        w = FileTaskListItemWidget(
+            task_id=t['id'],
+            title=t['title'],
+            content=t.get('content', ""),
+            deadline=deadline_str,
+            school_year_id=t['school_year_id'],
+            is_locked=t.get('is_locked', False),
+            attachment_url=t.get('attachment_url')
+        )
+        item = QListWidgetItem(self.file_tasks_list_widget)
+        item.setSizeHint(w.sizeHint())
+        self.file_tasks_list_widget.addItem(item)
+        self.file_tasks_list_widget.setItemWidget(item, w)
 
     def add_new_data_report(self):
         school_year_id = self.dr_school_year_selector.currentData()
@@ -1503,35 +1585,29 @@ class AdminWindow(QMainWindow):
         self.api_post("/data-reports/", payload, on_success, on_error)
          
     def load_data_reports(self):
-        school_year_id = self.dr_school_year_selector.currentData()
-        params = {
-            "school_year_id": school_year_id,
-            "limit": 1000
-        }
+        self.sync_data()
 
-        def on_ok(data, _):
-            self.data_reports_list_widget.clear()
-            for r in data:
-                deadline_str = QDateTime.fromString(r['deadline'].replace('T', ' '), "yyyy-MM-dd HH:mm:ss").toString("HH:mm dd/MM/yyyy") if r.get('deadline') else "N/A"
-                w = DataReportListItemWidget(
-                    report_id=r['id'],
-                    title=r['title'],
-                    deadline=deadline_str,
-                    schema=r.get('columns_schema', []),
-                    template_data=r.get('template_data'),
-                    is_locked=r.get('is_locked', False),
-                    attachment_url=r.get('attachment_url'),
-                    description=r.get('description', '')
-                )
-                it = QListWidgetItem(self.data_reports_list_widget)
-                it.setSizeHint(w.sizeHint())
-                self.data_reports_list_widget.addItem(it)
-                self.data_reports_list_widget.setItemWidget(it, w)
-                
-        def on_err(s, e):
-            handle_api_error(self, s, e, "Không tải được danh sách Báo cáo nhập liệu")
-
-        self.api_get("/data-reports/", on_ok, on_err, params=params)
+    def _render_data_reports(self):
+        school_year_id = self.dr_school_year_selector.currentData()
+        self.dr_pager.reset([r for r in self._sorted_by_deadline(self._sync_rows["data_report"])
+                             if school_year_id is None or r['school_year_id'] == school_year_id])
+
+    def _add_data_report_row(self, r):
+        deadline_str = QDateTime.fromString(r['deadline'].replace('T', ' '), "yyyy-MM-dd HH:mm:ss").toString("HH:mm dd/MM/yyyy") if r.get('deadline') else "N/A"
+        w = DataReportListItemWidget(
+            report_id=r['id'],
+            title=r['title'],
+            deadline=deadline_str,
+            schema=r.get('columns_schema', []),
+            template_data=r.get('template_data'),
+            is_locked=r.get('is_locked', False),
+            attachment_url=r.get('attachment_url'),
+            description=r.get('description', '')
+        )
+        it = QListWidgetItem(self.data_reports_list_widget)
+        it.setSizeHint(w.sizeHint())
+        self.data_reports_list_widget.addItem(it)
+        self.data_reports_list_widget.setItemWidget(it, w)
 
     def load_file_task_report(self):
         task_id = self.fr_task_selector.currentData()
@@ -1936,11 +2012,12 @@ class AdminWindow(QMainWindow):
         list_header_layout.addStretch()
         list_header_layout.addWidget(QLabel("Lọc theo năm học:"))
         self.ft_filter_sy_selector = QComboBox()
-        self.ft_filter_sy_selector.currentIndexChanged.connect(self.load_file_tasks)
+        self.ft_filter_sy_selector.currentIndexChanged.connect(self._render_file_tasks)
         list_header_layout.addWidget(self.ft_filter_sy_selector)
         
         list_layout.addLayout(list_header_layout)
         self.file_tasks_list_widget = QListWidget()
+        self.ft_pager = Paginator(self.file_tasks_list_widget, self._add_file_task_row)
         list_layout.addWidget(self.file_tasks_list_widget)
 
 
@@ -2251,24 +2328,6 @@ class AdminWindow(QMainWindow):
 
         self.api_get("/school_years/", on_ok, on_error)
         
-    def _change_ft_page_size(self):
-        self.ft_pager.page_size = int(self.ft_size.currentText())
-        self.ft_pager.page = 1
-        self.load_file_tasks()
-
-    def _change_dr_page_size(self):
-        self.dr_pager.page_size = int(self.dr_size.currentText())
-        self.dr_pager.page = 1
-        self.load_data_reports()
-
-    def _reload_ft(self):
-        self.ft_pager.page = 1
-        self.load_file_tasks()
-
-    def _reload_dr(self):
-        self.dr_pager.page = 1
-        self.load_data_reports()
-        
     def show_data_report_schema(self, report_id: int):
         """
         Hiển thị chi tiết 'BÁO CÁO NHẬP LIỆU' cho admin:
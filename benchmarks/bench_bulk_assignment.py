@@ -0,0 +1,102 @@
+# benchmarks/bench_bulk_assignment.py
+"""
+Đo thời gian giao một báo cáo nhập liệu / yêu cầu nộp file cho nhiều trường:
+cách cũ (mỗi trường một db.add) so với crud.create_data_report / create_file_task_with_targets (INSERT nhiều dòng).
+
+    python benchmarks/bench_bulk_assignment.py [--schools 5000] [--url sqlite:///bench.db]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+import crud, models, schemas
+from database import build_engine
+
+TEMPLATE = [{"lop": f"{k}A", "si_so": 0} for k in range(20)]
+
+
+def legacy_create_data_report(db, report: schemas.DataReportCreate):
+    """Bản sao cách giao cũ: tạo một đối tượng ORM DataEntry cho từng trường."""
+    db_report = models.DataReport(
+        title=report.title, deadline=report.deadline, school_year_id=report.school_year_id,
+        columns_schema=[col.dict() for col in report.columns_schema], template_data=report.template_data,
+    )
+    db.add(db_report)
+    db.commit()
+    db.refresh(db_report)
+    for s in db.query(models.School).all():
+        db.add(models.DataEntry(report_id=db_report.id, school_id=s.id, data=report.template_data, submitted_at=None))
+    db.commit()
+    return db_report
+
+
+def legacy_create_file_task(db, task: schemas.FileTaskCreate):
+    db_task = models.FileTask(**task.dict())
+    db.add(db_task)
+    db.commit()
+    db.refresh(db_task)
+    for (sid,) in db.query(models.School.id).all():
+        db.add(models.TaskReminder(task_type="file", task_id=db_task.id, school_id=sid))
+    db.commit()
+    return db_task
+
+
+def _timed(label, fn, *args):
+    started = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - started
+    print(f"  {label:<32} {elapsed * 1000:9.1f} ms")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schools", type=int, default=5000)
+    parser.add_argument("--url", default=None, help="Mặc định: SQLite tạm")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        url = args.url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = build_engine(url)
+        models.Base.metadata.drop_all(bind=engine)
+        models.Base.metadata.create_all(bind=engine)
+        db = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+
+        year = models.SchoolYear(name="2025-2026")
+        db.add(year)
+        db.commit()
+        crud._bulk_insert(db, models.School, [{"name": f"Trường {i:05d}", "api_key": f"key-{i}"} for i in range(args.schools)])
+        db.commit()
+
+        deadline = datetime.utcnow() + timedelta(days=7)
+        report = schemas.DataReportCreate(
+            title="Báo cáo sĩ số", deadline=deadline, school_year_id=year.id,
+            columns_schema=[schemas.ColumnDefinition(name="lop", title="Lớp", dtype="str"),
+                            schemas.ColumnDefinition(name="si_so", title="Sĩ số", dtype="int")],
+            template_data=TEMPLATE,
+        )
+        task = schemas.FileTaskCreate(title="Nộp kế hoạch", content="...", deadline=deadline, school_year_id=year.id)
+
+        print(f"Giao cho {args.schools} trường ({engine.dialect.name}):")
+        before = _timed("data report - per-object ORM", legacy_create_data_report, db, report)
+        after = _timed("data report - bulk insert", crud.create_data_report, db, report, None)
+        print(f"  speedup x{before / after:.1f}")
+        before = _timed("file task - per-object ORM", legacy_create_file_task, db, task)
+        after = _timed("file task - bulk insert", crud.create_file_task_with_targets, db, task, None)
+        print(f"  speedup x{before / after:.1f}")
+
+        assert db.query(models.DataEntry).count() == 2 * args.schools
+        assert db.query(models.TaskReminder).count() == 2 * args.schools
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# benchmarks/bench_google_services.py
+"""
+Chi phí lấy một service Google Drive trước mỗi thao tác (upload-folder, đính kèm, tải file):
+- cũ:  Credentials.from_service_account_file + build() ở mỗi lần gọi
+- mới: google_services (credentials dùng chung, service theo từng luồng)
+chạy tuần tự và trên nhiều luồng như thread pool của FastAPI.
+
+    python benchmarks/bench_google_services.py [--calls 200] [--threads 8]
+
+Không gọi mạng: dùng một khóa service account giả tạo tại chỗ. Thực tế cách cũ còn tốn thêm
+một lần xin access token (một vòng mạng tới oauth2.googleapis.com) và một lần bắt tay TLS cho mỗi
+service mới, cách mới chỉ tốn khi token hết hạn / luồng mới lần đầu dùng.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from google.oauth2 import service_account
+from googleapiclient.discovery import build
+
+import google_services
+
+SCOPES = ["https://www.googleapis.com/auth/drive"]
+
+
+def _write_fake_key(path):
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                            serialization.NoEncryption()).decode()
+    with open(path, "w") as f:
+        json.dump({
+            "type": "service_account", "project_id": "bench", "private_key_id": "bench",
+            "private_key": pem, "client_email": "bench@bench.iam.gserviceaccount.com", "client_id": "1",
+            "token_uri": "https://oauth2.googleapis.com/token",
+        }, f)
+
+
+def acquire_old(path):
+    creds = service_account.Credentials.from_service_account_file(path, scopes=SCOPES)
+    return build("drive", "v3", credentials=creds)
+
+
+def acquire_pooled(path):
+    return google_services.get_service("drive", "v3", google_services.service_account_credentials(path, SCOPES))
+
+
+def _run(fn, path, calls, threads):
+    # Mỗi lần gọi cũng dựng một request như các hàm trong crud
+    def one(_):
+        fn(path).files().get(fileId="bench", fields="name", supportsAllDrives=True)
+
+    started = time.perf_counter()
+    if threads == 1:
+        for i in range(calls):
+            one(i)
+    else:
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(one, range(calls)))
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "service_account.json")
+        _write_fake_key(path)
+        print(f"{args.calls} lần lấy service Drive v3")
+        for threads in (1, args.threads):
+            for name, fn in (("from_file + build()", acquire_old), ("google_services", acquire_pooled)):
+                elapsed = _run(fn, path, args.calls, threads)
+                print(f"  {threads:>2} luồng  {name:<20} {elapsed * 1000:8.1f} ms"
+                      f"  ({elapsed * 1000 / args.calls:.3f} ms/lần)")
+        print(f"  google_services: {google_services.get_stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+# benchmarks/bench_json_payloads.py
+"""
+Kích thước payload và thời gian mã hóa JSON cho các response lớn:
+- GET /data-reports/ (mỗi báo cáo kèm columns_schema + template_data)
+- GET /data-reports/{id}/status (danh sách trường đã nộp / chưa nộp)
+- GET /data-reports/{id}/submission/{school_id} (toàn bộ dòng dữ liệu của một trường)
+
+So sánh các cách FastAPI có thể mã hóa response:
+- jsonable_encoder + json.dumps   (JSONResponse kiểu cũ)
+- jsonable_encoder + orjson       (ORJSONResponse)
+- TypeAdapter.dump_json           (FastAPI mới: Pydantic ghi thẳng ra bytes khi có response_model)
+và kích thước / thời gian nén gzip ở các mức nén.
+
+    python benchmarks/bench_json_payloads.py [--reports 200] [--rows 300] [--schools 300]
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+import schemas
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn
+    orjson = None
+
+DTYPES = ["text", "int", "float", "date", "enum", "text"]
+
+
+def build_columns(count=12):
+    return [{
+        "name": f"c{i}", "title": f"Chỉ tiêu số {i}", "dtype": DTYPES[i % len(DTYPES)],
+        "required": i % 3 == 0, "enum": ["Đạt", "Chưa đạt", "Không áp dụng"] if DTYPES[i % len(DTYPES)] == "enum" else None,
+    } for i in range(count)]
+
+
+def build_rows(columns, count):
+    values = {"text": lambda r: f"Nội dung dòng {r}", "int": lambda r: r * 7, "float": lambda r: r / 3,
+              "date": lambda r: f"2025-{r % 12 + 1:02d}-{r % 28 + 1:02d}", "enum": lambda r: "Đạt"}
+    return [{c["name"]: values[c["dtype"]](r) for c in columns} for r in range(count)]
+
+
+def build_payloads(n_reports, n_rows, n_schools):
+    columns = build_columns()
+    now = datetime(2025, 9, 1, 7, 30)
+    reports = [{
+        "id": i, "title": f"Báo cáo thống kê số {i}", "description": "Báo cáo định kỳ " * 5,
+        "deadline": now + timedelta(days=i), "created_at": now, "columns_schema": columns,
+        "template_data": build_rows(columns, n_rows), "attachment_url": None,
+        "is_locked": False, "is_submitted": i % 2 == 0, "is_reminded": False,
+    } for i in range(n_reports)]
+    schools = [{"id": i, "name": f"Trường THCS số {i}", "api_key": f"{i:032x}"} for i in range(n_schools)]
+    status = {
+        "report": reports[0],
+        "submitted_schools": [{"id": s["id"], "name": s["name"], "submitted_at": now} for s in schools[: n_schools // 2]],
+        "not_submitted_schools": schools[n_schools // 2:],
+    }
+    submission = {"data": build_rows(columns, n_rows * 10)}
+    return [
+        ("GET /data-reports/", List[schemas.DataReport], reports),
+        ("GET /data-reports/{id}/status", schemas.DataReportStatus, status),
+        ("GET .../submission/{school_id}", Dict[str, Any], submission),
+    ]
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=200)
+    parser.add_argument("--rows", type=int, default=300)
+    parser.add_argument("--schools", type=int, default=300)
+    args = parser.parse_args()
+
+    for label, model, content in build_payloads(args.reports, args.rows, args.schools):
+        adapter = TypeAdapter(model)
+        # Dữ liệu đã qua validate như FastAPI làm trước khi mã hóa
+        value = adapter.validate_python(content)
+        encoders = [
+            ("jsonable_encoder+json", lambda: json.dumps(
+                jsonable_encoder(adapter.dump_python(value, mode="json")), ensure_ascii=False,
+                separators=(",", ":")).encode("utf-8")),
+            ("TypeAdapter.dump_json", lambda: adapter.dump_json(value)),
+        ]
+        if orjson is not None:
+            encoders.insert(1, ("jsonable_encoder+orjson", lambda: orjson.dumps(
+                jsonable_encoder(adapter.dump_python(value, mode="json")))))
+
+        print(label)
+        body = None
+        for name, fn in encoders:
+            elapsed, body = _best_of(fn)
+            print(f"  encode {name:<24} {elapsed * 1000:8.1f} ms")
+        print(f"  kích thước JSON             {len(body) / 1024:10.1f} KiB")
+        for level in (1, 6, 9):
+            elapsed, compressed = _best_of(lambda: gzip.compress(body, compresslevel=level), repeat=3)
+            print(f"  gzip mức {level}                 {len(compressed) / 1024:10.1f} KiB"
+                  f"  (x{len(body) / len(compressed):.1f}, {elapsed * 1000:.1f} ms)")
+
+
+if __name__ == "__main__":
+    main()
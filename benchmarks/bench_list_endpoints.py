@@ -0,0 +1,126 @@
+# benchmarks/bench_list_endpoints.py
+"""
+So sánh cách dựng danh sách cho GET /data-reports/ và GET /file-tasks/ của một trường:
+- trước: get_data_reports + get_data_entry_for_school cho từng báo cáo (N+1),
+         SELECT FileTask + dựng lại từng task qua __table__.columns và schemas.FileTask(**...)
+- sau:   get_data_report_list_rows / get_file_task_list_rows (một câu SELECT kèm cờ)
+
+    python benchmarks/bench_list_endpoints.py [--reports 2000] [--schools 50]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+import crud, models, schemas
+from database import build_engine
+
+COLUMNS = [{"name": f"c{i}", "title": f"Cột {i}", "dtype": "int", "required": False, "enum": None} for i in range(8)]
+
+
+def legacy_data_reports(db, school_id, limit):
+    reports, reminded = crud.get_data_reports(db, current_school_id=school_id, limit=limit)
+    out = []
+    for report in reports:
+        entry = crud.get_data_entry_for_school(db, report_id=report.id, school_id=school_id)
+        out.append(schemas.DataReport(
+            id=report.id, title=report.title, description=report.description, deadline=report.deadline,
+            created_at=report.created_at, columns_schema=report.columns_schema, template_data=report.template_data,
+            attachment_url=report.attachment_url, is_locked=report.is_locked or False,
+            is_submitted=bool(entry and entry.submitted_at), is_reminded=report.id in reminded,
+        ))
+    return out
+
+
+def legacy_file_tasks(db, school_id, limit):
+    is_reminded, is_assigned = crud._file_task_assignment_clauses(school_id)
+    rows = db.execute(crud._file_task_page(
+        select(models.FileTask, is_reminded.label("is_reminded")).where(is_assigned), None, 0, limit
+    )).all()
+    tasks = [row[0] for row in rows]
+    reminded = {row[0].id for row in rows if row.is_reminded}
+    submitted = crud.get_submitted_file_task_ids_for_school(db, school_id=school_id)
+    out = []
+    for task in tasks:
+        task_dict = {c.name: getattr(task, c.name) for c in task.__table__.columns}
+        task_dict["is_locked"] = task_dict.get("is_locked") or False
+        task_dict["is_submitted"] = task.id in submitted
+        task_dict["is_reminded"] = task.id in reminded
+        out.append(schemas.FileTask(**task_dict))
+    return out
+
+
+def _best_of(fn, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reports", type=int, default=2000)
+    parser.add_argument("--schools", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = Session()
+
+        year = models.SchoolYear(name="2025-2026")
+        db.add(year)
+        db.commit()
+        crud._bulk_insert(db, models.School, [{"name": f"Trường {i:03d}", "api_key": f"k{i}"} for i in range(args.schools)])
+        school_ids = [sid for (sid,) in db.query(models.School.id)]
+        now = datetime.utcnow()
+        crud._bulk_insert(db, models.DataReport, [
+            {"title": f"Báo cáo {i}", "deadline": now + timedelta(hours=i), "school_year_id": year.id,
+             "columns_schema": COLUMNS, "template_data": [{"c0": 0}], "is_locked": False}
+            for i in range(args.reports)
+        ])
+        crud._bulk_insert(db, models.FileTask, [
+            {"title": f"Nộp file {i}", "content": "...", "deadline": now + timedelta(hours=i),
+             "school_year_id": year.id, "is_locked": False}
+            for i in range(args.reports)
+        ])
+        report_ids = [rid for (rid,) in db.query(models.DataReport.id)]
+        task_ids = [tid for (tid,) in db.query(models.FileTask.id)]
+        for rid in report_ids:
+            crud.bulk_assign_data_report(db, rid, school_ids)
+        for tid in task_ids:
+            crud.bulk_assign_file_task(db, tid, school_ids)
+        db.commit()
+        me = school_ids[0]
+        db.query(models.DataEntry).filter(models.DataEntry.school_id == me, models.DataEntry.report_id % 3 == 0) \
+          .update({"submitted_at": now})
+        db.commit()
+
+        print(f"{args.reports} báo cáo + {args.reports} yêu cầu nộp file, {args.schools} trường")
+        for label, before_fn, after_fn in [
+            ("GET /data-reports/", lambda: legacy_data_reports(db, me, args.reports),
+             lambda: crud.get_data_report_list_rows(db, current_school_id=me, limit=args.reports)),
+            ("GET /file-tasks/", lambda: legacy_file_tasks(db, me, args.reports),
+             lambda: crud.get_file_task_list_rows(db, current_school_id=me, limit=args.reports)),
+        ]:
+            before, old_rows = _best_of(before_fn)
+            after, new_rows = _best_of(after_fn)
+            assert [(r.id, r.is_submitted, r.is_reminded) for r in old_rows] == \
+                   [(r["id"], r["is_submitted"], r["is_reminded"]) for r in new_rows]
+            print(f"  {label:<20} before {before * 1000:8.1f} ms   after {after * 1000:8.1f} ms   x{before / after:.1f}")
+        db.close()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
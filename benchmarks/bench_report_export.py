@@ -0,0 +1,94 @@
+# benchmarks/bench_report_export.py
+"""
+So sánh các định dạng xuất dữ liệu tổng hợp (GET /data-reports/{id}/export-excel?format=...)
+trên một báo cáo lớn: thời gian đến khối dữ liệu đầu tiên, tổng thời gian sinh file và kích thước file.
+
+    python benchmarks/bench_report_export.py [--schools 200] [--rows-per-school 1000]
+
+Mặc định 200 trường x 1000 dòng = 200k dòng, 12 cột đủ các kiểu int/float/date/enum/str.
+Parquet chỉ chạy khi đã cài pyarrow.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+import crud, models, report_export
+from database import build_engine
+
+DTYPES = ["str", "int", "float", "date", "enum", "int"]
+COLUMNS = [{
+    "name": f"c{i}", "title": f"Chỉ tiêu {i}", "dtype": DTYPES[i % len(DTYPES)], "required": False,
+    "enum": ["Đạt", "Chưa đạt", "Không áp dụng"] if DTYPES[i % len(DTYPES)] == "enum" else None,
+} for i in range(12)]
+
+
+def _value(dtype, r):
+    if dtype == "int":
+        return r * 3
+    if dtype == "float":
+        return r / 7
+    if dtype == "date":
+        return f"2025-{r % 12 + 1:02d}-{r % 28 + 1:02d}"
+    if dtype == "enum":
+        return ["Đạt", "Chưa đạt", "Không áp dụng"][r % 3]
+    return f"Ghi chú dòng {r}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schools", type=int, default=200)
+    parser.add_argument("--rows-per-school", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        models.Base.metadata.create_all(bind=engine)
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        db = Session()
+
+        year = models.SchoolYear(name="2025-2026")
+        db.add(year)
+        db.commit()
+        report = models.DataReport(title="Báo cáo lớn", deadline=datetime.utcnow() + timedelta(days=7),
+                                   school_year_id=year.id, columns_schema=COLUMNS)
+        db.add(report)
+        db.commit()
+        report_id = report.id
+        crud._bulk_insert(db, models.School, [{"name": f"Trường {i:03d}", "api_key": f"k{i}"} for i in range(args.schools)])
+        now = datetime.utcnow()
+        for (sid,) in db.query(models.School.id).all():
+            rows = [{col["name"]: _value(col["dtype"], r + sid * 37) for col in COLUMNS} for r in range(args.rows_per_school)]
+            crud._bulk_insert(db, models.DataEntry, [
+                {"report_id": report_id, "school_id": sid, "data": rows, "submitted_at": now}
+            ])
+        db.commit()
+        db.close()
+
+        total_rows = args.schools * args.rows_per_school
+        print(f"{total_rows} dòng ({args.schools} trường x {args.rows_per_school}), {len(COLUMNS)} cột")
+        for export_format, (stream, _, _) in report_export.EXPORT_FORMATS.items():
+            if not report_export.is_available(export_format):
+                print(f"  {export_format:<8} bỏ qua (chưa cài pyarrow)")
+                continue
+            started = time.perf_counter()
+            first_chunk = None
+            size = 0
+            for chunk in stream(report_id, COLUMNS, session_factory=Session):
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - started
+                size += len(chunk)
+            elapsed = time.perf_counter() - started
+            print(f"  {export_format:<8} khối đầu {first_chunk:6.2f} s   tổng {elapsed:6.2f} s   "
+                  f"{size / 1024 / 1024:7.1f} MiB")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# benchmarks/bench_sqlite_profile.py
+"""
+So sánh thông lượng nộp báo cáo đồng thời trên SQLite: engine mặc định vs profile đã tinh chỉnh
+(WAL, busy_timeout, synchronous=NORMAL, cache_size, mmap_size).
+
+    python benchmarks/bench_sqlite_profile.py [--schools 200] [--threads 16] [--rounds 5]
+
+Mỗi luồng mô phỏng một trường: lặp lại việc đọc danh sách báo cáo rồi gọi
+crud.create_or_update_data_submission (đúng đường đi của POST /data-reports/{id}/submit).
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy.orm import sessionmaker
+
+import crud, models
+from database import build_engine
+
+
+def _seed(session_factory, n_schools: int) -> int:
+    db = session_factory()
+    try:
+        year = models.SchoolYear(name="2025-2026")
+        db.add(year)
+        db.flush()
+        db.add_all([models.School(name=f"Trường {i:04d}") for i in range(n_schools)])
+        report = models.DataReport(
+            title="Báo cáo sĩ số", deadline=datetime.utcnow() + timedelta(days=7),
+            school_year_id=year.id, columns_schema=[{"name": "lop", "title": "Lớp", "dtype": "str"}],
+        )
+        db.add(report)
+        db.flush()
+        school_ids = [sid for (sid,) in db.query(models.School.id).all()]
+        db.add_all([models.DataEntry(report_id=report.id, school_id=sid) for sid in school_ids])
+        db.commit()
+        return report.id
+    finally:
+        db.close()
+
+
+def run(tuned: bool, n_schools: int, n_threads: int, rounds: int) -> float:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", tuned=tuned)
+        models.Base.metadata.create_all(bind=engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        report_id = _seed(session_factory, n_schools)
+        rows = [{"lop": f"{k}A", "si_so": 35 + k} for k in range(30)]
+
+        errors = []
+        ops = [0] * n_threads
+
+        def worker(idx: int):
+            db = session_factory()
+            try:
+                for r in range(rounds):
+                    for school_id in range(idx + 1, n_schools + 1, n_threads):
+                        try:
+                            crud.get_data_reports(db, current_school_id=school_id)
+                            crud.create_or_update_data_submission(db, report_id, school_id, rows)
+                            ops[idx] += 1
+                        except Exception as e:  # "database is locked" khi không có busy_timeout
+                            db.rollback()
+                            errors.append(e)
+            finally:
+                db.close()
+
+        threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+        started = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+
+    done = sum(ops)
+    label = "tuned  " if tuned else "default"
+    print(f"{label}: {done} submits in {elapsed:.2f}s -> {done / elapsed:8.1f} submits/s, {len(errors)} errors")
+    return done / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--schools", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    before = run(False, args.schools, args.threads, args.rounds)
+    after = run(True, args.schools, args.threads, args.rounds)
+    print(f"speedup: x{after / before:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# cache.py
+"""
+Bộ nhớ đệm trong tiến trình cho các truy vấn tổng hợp của trang quản trị
+(báo cáo tuân thủ, thống kê dashboard) và cho việc xác thực API key của các trường.
+
+- Mỗi cache có giới hạn số phần tử (bỏ phần tử ít dùng nhất - LRU) và thời gian sống (TTL).
+- crud.py gọi invalidate_all() sau mỗi thao tác ghi (nộp bài, sửa công việc, thêm/xóa trường...),
+  TTL chỉ còn giới hạn độ trễ của những thay đổi không qua ghi, ví dụ công việc vừa quá hạn.
+- Số lần hit/miss xem qua GET /admin/cache-stats.
+
+Mỗi worker (tiến trình) có cache riêng; chạy nhiều worker thì dữ liệu có thể cũ tối đa TTL giây.
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+# Đặt CACHE_TTL_SECONDS=0 để tắt cache
+CACHE_TTL_SECONDS = _env_number("CACHE_TTL_SECONDS", 60.0, float)
+CACHE_MAX_ENTRIES = _env_number("CACHE_MAX_ENTRIES", 256)
+# API key -> trường (kể cả key sai); key bị thu hồi khi xóa trường hoặc reset CSDL
+API_KEY_CACHE_TTL_SECONDS = _env_number("API_KEY_CACHE_TTL_SECONDS", 300.0, float)
+API_KEY_CACHE_SIZE = _env_number("API_KEY_CACHE_SIZE", 2048)
+
+
+class TTLCache:
+    """Cache LRU + TTL an toàn đa luồng (endpoint đồng bộ chạy trên threadpool của FastAPI)."""
+
+    def __init__(self, name: str, maxsize: int = CACHE_MAX_ENTRIES, ttl: float = CACHE_TTL_SECONDS):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Trả về giá trị đã cache của `key`, hoặc gọi loader() rồi lưu lại."""
+        if self.ttl <= 0 or self.maxsize <= 0:
+            return loader()
+
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] > now:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return item[1]
+            self.misses += 1
+            generation = self.invalidations
+
+        # Chạy truy vấn ngoài khóa để các key khác không phải chờ
+        value = loader()
+
+        with self._lock:
+            # Bỏ qua kết quả nếu có thao tác ghi xảy ra trong lúc đang tải (tránh lưu dữ liệu cũ)
+            if generation == self.invalidations:
+                self._data[key] = (time.monotonic() + self.ttl, value)
+                self._data.move_to_end(key)
+                while len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return value
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+compliance_summary = TTLCache("compliance_summary")
+dashboard_stats = TTLCache("dashboard_stats", maxsize=1)
+api_keys = TTLCache("api_keys", maxsize=API_KEY_CACHE_SIZE, ttl=API_KEY_CACHE_TTL_SECONDS)
+
+# Cache phụ thuộc dữ liệu nộp bài / công việc; api_keys chỉ đổi khi thêm/xóa trường nên làm mới riêng
+_DERIVED_CACHES = (compliance_summary, dashboard_stats)
+
+
+def invalidate_all() -> None:
+    """Xóa mọi cache tổng hợp; gọi sau khi commit một thao tác ghi."""
+    for c in _DERIVED_CACHES:
+        c.invalidate()
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    return {c.name: c.stats() for c in (*_DERIVED_CACHES, api_keys)}
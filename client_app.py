@@ -29,6 +29,16 @@ from spreadsheet_widget import SpreadsheetWidget, ColumnSpec
 
 API_URL = "https://auto-report-backend.onrender.com"
 
+# Server nén JSON bằng gzip: Qt tự gửi Accept-Encoding và tự giải nén khi request KHÔNG tự đặt header này.
+# JSON lặp nhiều (template_data) có thể nén hơn 40 lần, vượt ngưỡng chống "bom giải nén" mặc định của Qt
+# (áp dụng từ 10 MiB) nên nới ngưỡng cho API của chính hệ thống.
+DECOMPRESSED_SAFETY_THRESHOLD = 256 * 1024 * 1024
+
+def api_request(url: QUrl) -> QNetworkRequest:
+    req = QNetworkRequest(url)
+    req.setDecompressedSafetyCheckThreshold(DECOMPRESSED_SAFETY_THRESHOLD)
+    return req
+
 def resource_path(relative_path):
     """ Get absolute path to resource, works for dev and for PyInstaller """
     try:
@@ -90,6 +100,8 @@ def get_drive_service() -> Tuple[object, str | None]:
 
 class UploadWorker(QObject):
     finished = Signal(str); error = Signal(str); progress = Signal(int)
+    # Drive báo 404: thư mục server trả về (lấy từ cache) không còn tồn tại
+    folder_missing = Signal()
     def __init__(self, service, file_path, folder_id):
         super().__init__(); self.service = service; self.file_path = file_path; self.folder_id = folder_id
     def run(self):
@@ -103,6 +115,9 @@ class UploadWorker(QObject):
                 status, response = request.next_chunk()
                 if status: self.progress.emit(int(status.progress() * 100))
             self.finished.emit(response.get('webViewLink'))
+        except HttpError as e:
+            if e.resp.status == 404: self.folder_missing.emit()
+            else: self.error.emit(str(e))
         except Exception as e: self.error.emit(str(e))
 
 class ListItemWidget(QWidget):
@@ -216,6 +231,8 @@ class ClientWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.network_manager = QNetworkAccessManager(self)
+        # Phản hồi GET gần nhất theo (URL, header): {key: (etag, body)} để gửi If-None-Match
+        self._etag_cache = {}
         self.setWindowTitle("Hệ thống Báo cáo - phiên bản dành cho trường học")
         self.setWindowIcon(QIcon(resource_path('baocao.ico')))
         self.setGeometry(200, 200, 1100, 800)
@@ -245,6 +262,8 @@ class ClientWindow(QMainWindow):
         """)
 
         self.api_key = self.load_api_key()
+        # Cursor của GET /sync; None = lần đồng bộ tiếp theo tải toàn bộ
+        self._sync_cursor = None
         self.drive_service = None
         self.user_email = None
         self.current_displayed_report_id = None
@@ -273,7 +292,7 @@ class ClientWindow(QMainWindow):
         else:
             QMessageBox.information(self, "Chào mừng", "Vui lòng nhập Mã API được cung cấp và nhấn 'Lưu'.")
 
-    def _handle_reply(self, reply: QNetworkReply, on_success: Callable, on_error: Callable):
+    def _handle_reply(self, reply: QNetworkReply, on_success: Callable, on_error: Callable, cache_key=None):
         try:
             if reply.error() == QNetworkReply.NoError:
                 status_code = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
@@ -283,6 +302,9 @@ class ClientWindow(QMainWindow):
                 if 200 <= int(status_code) < 300:
                     try:
                         text = raw.decode('utf-8') if raw else ''
+                        etag = bytes(reply.rawHeader(b"ETag")).decode('latin-1')
+                        if cache_key is not None and etag:
+                            self._etag_cache[cache_key] = (etag, text)
                         on_success(json.loads(text) if text else {}, {})
                     except Exception:
                         on_error(int(status_code), "Lỗi giải mã JSON từ server.")
@@ -304,21 +326,33 @@ class ClientWindow(QMainWindow):
             url.setQuery(q)
 
         def do_get(url_obj: QUrl, redirects_left: int = 5):
-            req = QNetworkRequest(url_obj)
+            req = api_request(url_obj)
             req.setRawHeader(b"Accept", b"application/json,*/*")
             req.setRawHeader(b"User-Agent", b"ClientApp/1.0")
             if headers:
                 for k, v in headers.items():
                     req.setRawHeader(k.encode(), v.encode())
 
+            # Gửi ETag của lần tải trước; server trả 304 nếu dữ liệu không đổi
+            cache_key = (url_obj.toString(), tuple(sorted((headers or {}).items())))
+            cached = self._etag_cache.get(cache_key)
+            if cached:
+                req.setRawHeader(b"If-None-Match", cached[0].encode('latin-1'))
+
             reply = self.network_manager.get(req)
 
             def finished():
+                status_code = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
+                if cached and status_code and int(status_code) == 304:
+                    reply.readAll()
+                    reply.deleteLater()
+                    on_success(json.loads(cached[1]) if cached[1] else {}, {})
+                    return
+
                 if reply.error() != QNetworkReply.NoError:
                     self._handle_reply(reply, on_success, on_error)
                     return
 
-                status_code = reply.attribute(QNetworkRequest.HttpStatusCodeAttribute)
                 if status_code and 300 <= int(status_code) < 400 and redirects_left > 0:
                     red_attr = getattr(QNetworkRequest, "RedirectionTargetAttribute", None)
                     target = reply.attribute(red_attr) if red_attr is not None else None
@@ -329,7 +363,7 @@ class ClientWindow(QMainWindow):
                         do_get(new_url, redirects_left - 1)
                         return
 
-                self._handle_reply(reply, on_success, on_error)
+                self._handle_reply(reply, on_success, on_error, cache_key)
 
             reply.finished.connect(finished)
 
@@ -340,7 +374,7 @@ class ClientWindow(QMainWindow):
         url = QUrl(f"{API_URL}{endpoint}")
 
         def do_post(url_obj: QUrl, redirects_left: int = 5):
-            req = QNetworkRequest(url_obj)
+            req = api_request(url_obj)
             req.setHeader(QNetworkRequest.ContentTypeHeader, "application/json")
             req.setRawHeader(b"Accept", b"application/json,*/*")
             req.setRawHeader(b"User-Agent", b"ClientApp/1.0")
@@ -504,11 +538,132 @@ class ClientWindow(QMainWindow):
         self.api_get("/schools/me", on_success, on_error, headers={"x-api-key": self.api_key})
 
     def on_authentication_success(self, school_name):
-        self.school_info_label.setText(f"Đang làm việc với tư cách: Trường {school_name}"); self.refresh_data()
+        self.school_info_label.setText(f"Đang làm việc với tư cách: Trường {school_name}")
+        # API key (trường) có thể vừa đổi: đồng bộ lại từ đầu
+        self._sync_cursor = None
+        self.refresh_data()
 
     def refresh_data(self):
-        self.load_file_tasks()
-        self.load_data_reports()
+        self.sync_data()
+
+    def sync_data(self):
+        """
+        Đồng bộ tăng dần qua GET /sync: chỉ nhận các công việc / báo cáo thay đổi sau cursor lần trước
+        (bài nộp, nhắc nhở, khóa, xóa...) và cập nhật từng dòng trong danh sách.
+        """
+        if not self.api_key: return
+        self.load_ft_button.setDisabled(True)
+        self.load_ft_button.setText("Đang tải...")
+        self.load_dr_button.setDisabled(True)
+        self.load_dr_button.setText("Đang tải...")
+
+        def finish():
+            self.load_ft_button.setDisabled(False)
+            self.load_ft_button.setText("Làm mới danh sách")
+            self.load_dr_button.setDisabled(False)
+            self.load_dr_button.setText("Làm mới")
+
+        def on_success(payload, _):
+            full = payload.get('full', True)
+            deleted = payload.get('deleted', {})
+            if full:
+                self.ft_list_widget.clear()
+                self.dr_list_widget.clear()
+                self.display_file_task_details(None, None)
+                self.display_data_report_sheet(None, None)
+            self._apply_list_delta(self.ft_list_widget, payload.get('file_tasks', []), deleted.get('file_task', []),
+                                   self._make_file_task_widget, "Không có công việc nào.")
+            self._apply_list_delta(self.dr_list_widget, payload.get('data_reports', []), deleted.get('data_report', []),
+                                   self._make_data_report_widget, "Không có báo cáo nào.")
+            self._sync_cursor = payload.get('cursor')
+            finish()
+
+        def on_error(s, e):
+            handle_api_error(self, s, e, "Không thể đồng bộ dữ liệu.")
+            finish()
+
+        params = {"since": self._sync_cursor} if self._sync_cursor else None
+        self.api_get("/sync", on_success, on_error, headers={"x-api-key": self.api_key}, params=params)
+
+    def _apply_list_delta(self, list_widget, rows, deleted_ids, make_widget, empty_text):
+        """
+        Áp dụng thay đổi vào QListWidget (dữ liệu mỗi dòng ở Qt.UserRole, sắp theo hạn nộp mới nhất trước):
+        xóa các id trong deleted_ids, cập nhật tại chỗ dòng đã có, chèn dòng mới đúng vị trí.
+        """
+        items = {}
+        for row in range(list_widget.count() - 1, -1, -1):
+            item = list_widget.item(row)
+            data = item.data(Qt.UserRole)
+            if data is None:
+                list_widget.takeItem(row)  # dòng "Không có ..." cũ
+            else:
+                items[data['id']] = item
+
+        for item_id in deleted_ids:
+            item = items.pop(item_id, None)
+            if item is not None:
+                list_widget.takeItem(list_widget.row(item))
+
+        for data in rows:
+            item = items.get(data['id'])
+            if item is not None:
+                old = item.data(Qt.UserRole)
+                if old == data:
+                    continue
+                if old.get('deadline') == data.get('deadline'):
+                    # Giữ nguyên vị trí và lựa chọn hiện tại, chỉ thay nội dung
+                    item.setData(Qt.UserRole, data)
+                    widget = make_widget(data)
+                    item.setSizeHint(widget.sizeHint())
+                    list_widget.setItemWidget(item, widget)
+                    if item is list_widget.currentItem() and list_widget is self.ft_list_widget:
+                        self.display_file_task_details(item, None)
+                    continue
+                list_widget.takeItem(list_widget.row(item))
+
+            position = list_widget.count()
+            for row in range(list_widget.count()):
+                other = list_widget.item(row).data(Qt.UserRole)
+                if (other.get('deadline', ''), other['id']) < (data.get('deadline', ''), data['id']):
+                    position = row
+                    break
+            item = QListWidgetItem()
+            item.setData(Qt.UserRole, data)
+            list_widget.insertItem(position, item)
+            widget = make_widget(data)
+            item.setSizeHint(widget.sizeHint())
+            list_widget.setItemWidget(item, widget)
+            items[data['id']] = item
+
+        if not items:
+            placeholder_item = QListWidgetItem(empty_text)
+            placeholder_item.setFlags(Qt.NoItemFlags)
+            list_widget.addItem(placeholder_item)
+
+    def _make_file_task_widget(self, task):
+        deadline_dt = datetime.strptime(task['deadline'], "%Y-%m-%dT%H:%M:%S")
+        return FileTaskItemWidget(
+            task['title'], deadline_dt,
+            task.get('is_submitted', False), task.get('is_reminded', False), task.get('is_locked', False)
+        )
+
+    def _make_data_report_widget(self, report):
+        deadline_str = "N/A"
+        if report.get('deadline'):
+            try:
+                deadline_dt = datetime.strptime(report['deadline'], "%Y-%m-%dT%H:%M:%S")
+                deadline_str = deadline_dt.strftime("%H:%M %d/%m/%Y")
+            except ValueError:
+                deadline_str = report['deadline']
+        return ListItemWidget(
+            item_id=report['id'],
+            title=report['title'],
+            deadline=deadline_str,
+            attachment_url=report.get('attachment_url'),
+            is_submitted=report.get('is_submitted', False),
+            is_reminded=report.get('is_reminded', False),
+            is_locked=report.get('is_locked', False)
+        )
 
     def handle_final_submission(self, task_id, file_url):
         self.ft_status_label.setText("Đang hoàn tất nộp bài...")
@@ -544,37 +699,7 @@ class ClientWindow(QMainWindow):
         if url: webbrowser.open(url)
        
     def load_file_tasks(self):
-        if not self.api_key: return
-        self.load_ft_button.setDisabled(True)
-        self.load_ft_button.setText("Đang tải...")
-        def on_success(tasks, _):
-            self.ft_list_widget.clear()
-            self.display_file_task_details(None, None)
-            if not tasks:
-                placeholder_item = QListWidgetItem("Không có công việc nào.")
-                placeholder_item.setFlags(Qt.NoItemFlags)
-                self.ft_list_widget.addItem(placeholder_item)
-            tasks.sort(key=lambda t: t['deadline'], reverse=True)
-            for task in tasks:
-                deadline_dt = datetime.strptime(task['deadline'], "%Y-%m-%dT%H:%M:%S")
-                is_submitted = task.get('is_submitted', False)
-                is_reminded = task.get('is_reminded', False)
-                is_locked = task.get('is_locked', False)
-                list_item = QListWidgetItem(self.ft_list_widget)
-                list_item.setData(Qt.UserRole, task)
-                item_widget = FileTaskItemWidget(
-                    task['title'], deadline_dt,
-                    is_submitted, is_reminded, is_locked
-                )
-                list_item.setSizeHint(item_widget.sizeHint())
-                self.ft_list_widget.setItemWidget(list_item, item_widget)
-            self.load_ft_button.setDisabled(False)
-            self.load_ft_button.setText("Làm mới danh sách")
-        def on_error(s, e):
-            handle_api_error(self, s, e, "Không thể tải công việc.")
-            self.load_ft_button.setDisabled(False)
-            self.load_ft_button.setText("Làm mới")
-        self.api_get("/file-tasks/", on_success, on_error, headers={"x-api-key": self.api_key})
+        self.sync_data()
         
     def submit_file_handler(self):
         current_item = self.ft_list_widget.currentItem()
@@ -596,7 +721,7 @@ class ClientWindow(QMainWindow):
         self.progress_bar.show()
         try:
             self.drive_service, self.user_email = get_drive_service()
-            def on_folder_id_success(data, headers):
+            def on_folder_id_success(data, headers, refreshed=False):
                 folder_id = data.get("folder_id")
                 self.upload_thread = QThread()
                 self.upload_worker = UploadWorker(self.drive_service, file_path, folder_id)
@@ -605,16 +730,27 @@ class ClientWindow(QMainWindow):
                 self.upload_worker.finished.connect(self.on_upload_finished)
                 self.upload_worker.error.connect(self.on_upload_error)
                 self.upload_worker.progress.connect(self.on_upload_progress)
-                self.upload_worker.finished.connect(self.upload_thread.quit)
-                self.upload_worker.finished.connect(self.upload_worker.deleteLater)
+                if refreshed:
+                    self.upload_worker.folder_missing.connect(lambda: self.on_upload_error("Không tìm thấy thư mục nộp bài trên Google Drive."))
+                else:
+                    self.upload_worker.folder_missing.connect(lambda: request_folder(refresh=True))
+                for signal in (self.upload_worker.finished, self.upload_worker.error, self.upload_worker.folder_missing):
+                    signal.connect(self.upload_thread.quit)
+                    signal.connect(self.upload_worker.deleteLater)
                 self.upload_thread.finished.connect(self.upload_thread.deleteLater)
                 self.upload_thread.start()
                 self.ft_status_label.setText("Đang tải file lên Google Drive...")
             def on_folder_id_error(s, e):
                 handle_api_error(self, s, e, "Không thể lấy thư mục nộp bài.")
                 self.submit_file_button.setDisabled(False)
-            params = {"user_email": self.user_email} if self.user_email else {}
-            self.api_get(f"/file-tasks/{task_id}/upload-folder", on_folder_id_success, on_folder_id_error, headers={"x-api-key": self.api_key}, params=params)
+            def request_folder(refresh=False):
+                # refresh=True: server bỏ qua ID thư mục đã cache và dò lại trên Drive
+                params = {"user_email": self.user_email} if self.user_email else {}
+                if refresh: params["refresh"] = "true"
+                self.api_get(f"/file-tasks/{task_id}/upload-folder",
+                             lambda data, headers: on_folder_id_success(data, headers, refreshed=refresh),
+                             on_folder_id_error, headers={"x-api-key": self.api_key}, params=params)
+            request_folder()
         except Exception as e:
             QMessageBox.critical(self, "Lỗi Google Drive", f"Không thể kết nối: {e}")
             self.submit_file_button.setDisabled(False)
@@ -636,57 +772,7 @@ class ClientWindow(QMainWindow):
     
     @Slot()
     def load_data_reports(self):
-        if not self.api_key: return
-        self.load_dr_button.setDisabled(True)
-        self.load_dr_button.setText("Đang tải...")
-
-        def on_success(reports, _):
-            self.dr_list_widget.clear()
-            self.display_data_report_sheet(None, None)
-            
-            if not reports:
-                placeholder_item = QListWidgetItem("Không có báo cáo nào.")
-                placeholder_item.setFlags(Qt.NoItemFlags)
-                self.dr_list_widget.addItem(placeholder_item)
-            else:
-                reports.sort(key=lambda r: r.get('deadline', ''), reverse=True)
-                for report in reports:
-                    deadline_str = "N/A"
-                    if report.get('deadline'):
-                        try:
-                            deadline_dt = datetime.strptime(report['deadline'], "%Y-%m-%dT%H:%M:%S")
-                            deadline_str = deadline_dt.strftime("%H:%M %d/%m/%Y")
-                        except ValueError:
-                            deadline_str = report['deadline']
-                    
-                    is_submitted = report.get('is_submitted', False)
-                    is_reminded = report.get('is_reminded', False)
-                    is_locked = report.get('is_locked', False)
-                    
-                    list_item = QListWidgetItem(self.dr_list_widget)
-                    list_item.setData(Qt.UserRole, report)
-                    
-                    item_widget = ListItemWidget(
-                        item_id=report['id'],
-                        title=report['title'],
-                        deadline=deadline_str,
-                        attachment_url=report.get('attachment_url'),
-                        is_submitted=is_submitted,
-                        is_reminded=is_reminded,
-                        is_locked=is_locked
-                    )
-                    list_item.setSizeHint(item_widget.sizeHint())
-                    self.dr_list_widget.setItemWidget(list_item, item_widget)
-                    
-            self.load_dr_button.setDisabled(False)
-            self.load_dr_button.setText("Làm mới")
-
-        def on_error(s, e):
-            handle_api_error(self, s, e, "Lỗi tải danh sách báo cáo.")
-            self.load_dr_button.setDisabled(False)
-            self.load_dr_button.setText("Làm mới")
-
-        self.api_get("/data-reports/", on_success, on_error, headers={"x-api-key": self.api_key})
+        self.sync_data()
 
     @Slot(QListWidgetItem, QListWidgetItem)
     def display_data_report_sheet(self, current_item, previous_item):
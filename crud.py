@@ -1,19 +1,25 @@
 import os.path
 import re
 import io
+import json
+import base64
+import binascii
+import threading
+from dataclasses import dataclass
 from fastapi import HTTPException
+from sqlalchemy import select, insert, update, delete, exists, literal, true, or_, and_, func, case, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, joinedload
 from unidecode import unidecode
-from typing import Optional, Set, List, Tuple, Dict, Any, Literal
-from datetime import datetime
+from typing import Optional, Set, List, Tuple, Dict, Any, Literal, Iterator, BinaryIO, Callable
+from datetime import datetime, date
 
 from sqlalchemy.exc import IntegrityError
-from google.oauth2 import service_account
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 from googleapiclient.http import MediaIoBaseDownload, MediaIoBaseUpload
 
-import models, schemas
+import cache, drive_cache, google_services, models, schemas
 
 # MODIFIED: ID thư mục gốc mới trên Drive của bạn
 ROOT_DRIVE_FOLDER_ID = "0AB0xC4mVFuxMUk9PVA" # ID của thư mục PHONGVH-XH_HONAI
@@ -26,19 +32,94 @@ SERVER_SCOPES = [
 
 SERVICE_ACCOUNT_FILE = 'service_account.json'
 
+# Lưu dữ liệu nhập liệu theo từng dòng (bảng data_entry_rows) thay vì một JSON cho cả trường.
+# Đọc luôn hỗ trợ cả hai kiểu lưu nên có thể bật/tắt mà không cần chuyển đổi dữ liệu cũ.
+DATA_ENTRY_ROW_STORAGE = os.getenv("DATA_ENTRY_ROW_STORAGE", "0").lower() in ("1", "true", "yes")
+
 def _get_google_service(service_name: str, version: str):
+    """Service dùng lại theo từng luồng và credentials dùng chung (xem google_services)."""
     if not os.path.exists(SERVICE_ACCOUNT_FILE):
         raise FileNotFoundError(f"Không tìm thấy file khóa dịch vụ trên server: '{SERVICE_ACCOUNT_FILE}'")
-    
+
+    creds = google_services.service_account_credentials(SERVICE_ACCOUNT_FILE, SERVER_SCOPES)
+    return google_services.get_service(service_name, version, creds), creds
+
+class DriveFolderNotFound(Exception):
+    """Drive báo 404 cho một thư mục (thường là ID lấy từ cache nhưng thư mục đã bị xóa trên Drive)."""
+    def __init__(self, folder_id: str):
+        super().__init__(f"Không tìm thấy thư mục Drive {folder_id}")
+        self.folder_id = folder_id
+
+# Đệm trong bộ nhớ trước hai bảng drive_folders / drive_folder_shares (theo từng worker)
+_drive_folder_ids: Dict[Tuple[str, str], str] = {}
+_drive_folder_shares: Set[Tuple[str, str]] = set()
+_drive_folder_lock = threading.Lock()
+
+def _dialect_insert(db: Session):
+    return pg_insert if db.get_bind().dialect.name == "postgresql" else sqlite_insert
+
+def _write_drive_cache(db: Session, *statements) -> None:
+    """
+    Ghi cache thư mục Drive bằng một session ngắn riêng (cùng engine với `db`) để không commit
+    giao dịch của request đang gọi. Lỗi ghi cache chỉ được in ra, không làm hỏng request.
+    """
     try:
-        creds = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE, scopes=SERVER_SCOPES)
-        service = build(service_name, version, credentials=creds)
-        return service, creds
+        with Session(db.get_bind()) as cache_db:
+            for stmt in statements:
+                cache_db.execute(stmt)
+            cache_db.commit()
     except Exception as e:
-        raise
-
-def _share_folder_with_user(service, folder_id: str, user_email: str):
+        print(f"Không ghi được cache thư mục Drive: {e}")
+
+def _cached_drive_folder(db: Optional[Session], parent_id: str, name_ascii: str) -> Optional[str]:
+    key = (parent_id, name_ascii)
+    with _drive_folder_lock:
+        folder_id = _drive_folder_ids.get(key)
+    if folder_id is None and db is not None:
+        folder_id = db.query(models.DriveFolder.folder_id).filter(
+            models.DriveFolder.parent_id == parent_id, models.DriveFolder.name == name_ascii
+        ).scalar()
+        if folder_id:
+            with _drive_folder_lock:
+                _drive_folder_ids[key] = folder_id
+    return folder_id
+
+def _remember_drive_folder(db: Optional[Session], parent_id: str, name_ascii: str, folder_id: str):
+    with _drive_folder_lock:
+        _drive_folder_ids[(parent_id, name_ascii)] = folder_id
+    if db is None:
+        return
+    stmt = _dialect_insert(db)(models.DriveFolder).values(
+        parent_id=parent_id, name=name_ascii, folder_id=folder_id, created_at=datetime.utcnow()
+    )
+    _write_drive_cache(db, stmt.on_conflict_do_update(index_elements=["parent_id", "name"], set_={"folder_id": folder_id}))
+
+def _forget_drive_folder(db: Optional[Session], folder_id: str, with_children: bool = True):
+    """Bỏ ID thư mục khỏi cache; with_children=True bỏ luôn các thư mục con đã cache (thư mục đã bị xóa)."""
+    with _drive_folder_lock:
+        for key, value in list(_drive_folder_ids.items()):
+            if value == folder_id or (with_children and key[0] == folder_id):
+                del _drive_folder_ids[key]
+        _drive_folder_shares.difference_update({key for key in _drive_folder_shares if key[0] == folder_id})
+    if db is None:
+        return
+    condition = models.DriveFolder.folder_id == folder_id
+    if with_children:
+        condition = or_(condition, models.DriveFolder.parent_id == folder_id)
+    _write_drive_cache(db, delete(models.DriveFolder).where(condition),
+                       delete(models.DriveFolderShare).where(models.DriveFolderShare.folder_id == folder_id))
+
+def _share_folder_with_user(service, folder_id: str, user_email: str, db: Optional[Session] = None):
+    key = (folder_id, user_email.lower())
+    with _drive_folder_lock:
+        if key in _drive_folder_shares:
+            return True
+    if db is not None and db.query(exists().where(
+        models.DriveFolderShare.folder_id == key[0], models.DriveFolderShare.email == key[1]
+    )).scalar():
+        with _drive_folder_lock:
+            _drive_folder_shares.add(key)
+        return True
     try:
         permission = {
             'type': 'user',
@@ -52,47 +133,91 @@ def _share_folder_with_user(service, folder_id: str, user_email: str):
             sendNotificationEmail=False
         ).execute()
         print(f"Successfully shared folder {folder_id} with {user_email}")
-        return True
     except HttpError as e:
-        if e.resp.status == 403:
-             print(f"Could not share folder {folder_id} with {user_email}. Maybe permission already exists? Error: {e}")
-             return True
-        print(f"An error occurred while sharing folder: {e}")
-        return False
-
-def _get_or_create_folder(service, name: str, parent_id: str):
+        if e.resp.status == 404:
+            _forget_drive_folder(db, folder_id)
+            raise DriveFolderNotFound(folder_id)
+        if e.resp.status != 403:
+            print(f"An error occurred while sharing folder: {e}")
+            return False
+        print(f"Could not share folder {folder_id} with {user_email}. Maybe permission already exists? Error: {e}")
+    with _drive_folder_lock:
+        _drive_folder_shares.add(key)
+    if db is not None:
+        _write_drive_cache(db, _dialect_insert(db)(models.DriveFolderShare).values(
+            folder_id=key[0], email=key[1], created_at=datetime.utcnow()
+        ).on_conflict_do_nothing())
+    return True
+
+def _get_or_create_folder(service, name: str, parent_id: str, db: Optional[Session] = None, refresh: bool = False):
+    """
+    ID thư mục con `name` của `parent_id`, tạo mới nếu chưa có. Kết quả được cache (bảng drive_folders
+    khi có `db`); refresh=True bỏ qua cache và hỏi lại Drive. Drive báo 404 (thư mục cha không còn)
+    thì xóa thư mục cha khỏi cache và ném DriveFolderNotFound.
+    """
+    folder_name_ascii = unidecode(name)
+    if not refresh:
+        folder_id = _cached_drive_folder(db, parent_id, folder_name_ascii)
+        if folder_id:
+            return folder_id
     try:
-        folder_name_ascii = unidecode(name)
         query = f"name='{folder_name_ascii}' and '{parent_id}' in parents and mimeType='application/vnd.google-apps.folder' and trashed=false"
         
         response = service.files().list(q=query, spaces='drive', fields='files(id)', supportsAllDrives=True, includeItemsFromAllDrives=True).execute()
         folders = response.get('files', [])
         
         if folders:
-            return folders[0].get('id')
-        
-        folder_metadata = {'name': folder_name_ascii, 'mimeType': 'application/vnd.google-apps.folder', 'parents': [parent_id]}
-        folder = service.files().create(body=folder_metadata, fields='id', supportsAllDrives=True).execute()
-        return folder.get('id')
+            folder_id = folders[0].get('id')
+        else:
+            folder_metadata = {'name': folder_name_ascii, 'mimeType': 'application/vnd.google-apps.folder', 'parents': [parent_id]}
+            folder = service.files().create(body=folder_metadata, fields='id', supportsAllDrives=True).execute()
+            folder_id = folder.get('id')
     except HttpError as e:
+        if e.resp.status == 404:
+            _forget_drive_folder(db, parent_id)
+            raise DriveFolderNotFound(parent_id)
         return None
+    _remember_drive_folder(db, parent_id, folder_name_ascii, folder_id)
+    return folder_id
+
+# Upload resumable lên Drive: mỗi khối phải là bội số của 256 KiB
+DRIVE_UPLOAD_CHUNK_ALIGN = 256 * 1024
 
-def upload_attachment_to_drive(file_name: str, file_content: bytes) -> Optional[str]:
+def upload_attachment_to_drive(file_name: str, file_obj: BinaryIO, db: Optional[Session] = None,
+                               chunk_size: int = 8 * 1024 * 1024,
+                               progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Optional[str]:
     """
     Tải file đính kèm lên một thư mục chia sẻ chung và trả về link có thể xem.
+    Nội dung đọc dần từ `file_obj` (file tạm của UploadFile) và gửi bằng upload resumable theo từng khối
+    `chunk_size` byte, nên bộ nhớ chỉ giữ một khối; `progress(đã gửi, tổng)` được gọi sau mỗi khối.
+    Hàm chặn cho tới khi xong: endpoint phải gọi trên thread pool.
     """
+    chunk_size = max(chunk_size // DRIVE_UPLOAD_CHUNK_ALIGN, 1) * DRIVE_UPLOAD_CHUNK_ALIGN
     try:
         service, _ = _get_google_service('drive', 'v3')
-        # Tạo một thư mục chung để chứa tất cả file đính kèm cho gọn
-        shared_folder_id = _get_or_create_folder(service, SHARED_ATTACHMENTS_FOLDER_NAME, ROOT_DRIVE_FOLDER_ID)
-        if not shared_folder_id:
-            print("Lỗi: Không thể tạo thư mục cho file đính kèm.")
-            return None
-
-        file_metadata = {'name': file_name, 'parents': [shared_folder_id]}
-        media = MediaIoBaseUpload(io.BytesIO(file_content), mimetype='application/octet-stream', resumable=True)
-        
-        file = service.files().create(body=file_metadata, media_body=media, fields='id, webViewLink', supportsAllDrives=True).execute()
+        file = None
+        for refresh in (False, True):
+            # Tạo một thư mục chung để chứa tất cả file đính kèm cho gọn
+            shared_folder_id = _get_or_create_folder(service, SHARED_ATTACHMENTS_FOLDER_NAME, ROOT_DRIVE_FOLDER_ID, db, refresh=refresh)
+            if not shared_folder_id:
+                print("Lỗi: Không thể tạo thư mục cho file đính kèm.")
+                return None
+
+            file_metadata = {'name': file_name, 'parents': [shared_folder_id]}
+            file_obj.seek(0)
+            media = MediaIoBaseUpload(file_obj, mimetype='application/octet-stream', chunksize=chunk_size, resumable=True)
+            request = service.files().create(body=file_metadata, media_body=media, fields='id, webViewLink', supportsAllDrives=True)
+            try:
+                while file is None:
+                    upload_status, file = request.next_chunk(num_retries=3)
+                    if upload_status and progress:
+                        progress(upload_status.resumable_progress, upload_status.total_size)
+                break
+            except HttpError as e:
+                # Thư mục chung trong cache đã bị xóa trên Drive: tìm / tạo lại một lần
+                if e.resp.status != 404 or refresh:
+                    raise
+                _forget_drive_folder(db, shared_folder_id)
         
         # Cấp quyền cho mọi người có link đều xem được
         file_id = file.get('id')
@@ -101,7 +226,7 @@ def upload_attachment_to_drive(file_name: str, file_content: bytes) -> Optional[
         print(f"Đã tải và chia sẻ file: {file.get('webViewLink')}")
         
         return file.get('webViewLink')
-    except HttpError as e:
+    except (HttpError, DriveFolderNotFound) as e:
         print(f"Lỗi khi tải file đính kèm lên Drive: {e}")
         return None
 
@@ -130,39 +255,113 @@ def extract_drive_file_id_from_url(url: str) -> Optional[str]:
     return None
 
 def download_file_from_drive(file_id: str) -> Tuple[Optional[bytes], Optional[str]]:
+    """
+    Tải nội dung một file Drive. Lời gọi files.get lấy tên file cũng lấy luôn modifiedTime/md5Checksum
+    để kiểm tra bản trong drive_cache: còn khớp thì dùng lại, không tải lại nội dung.
+    """
     try:
         service, _ = _get_google_service('drive', 'v3')
-        file_metadata = service.files().get(fileId=file_id, fields='name', supportsAllDrives=True).execute()
+        file_metadata = service.files().get(
+            fileId=file_id, fields='name,modifiedTime,md5Checksum', supportsAllDrives=True
+        ).execute()
         file_name = file_metadata.get('name')
+        cached = drive_cache.drive_files.get(file_id, file_metadata)
+        if cached is not None:
+            return cached, file_name
         request = service.files().get_media(fileId=file_id, supportsAllDrives=True)
         file_buffer = io.BytesIO()
         downloader = MediaIoBaseDownload(file_buffer, request)
         done = False
         while not done:
             status, done = downloader.next_chunk()
-        file_buffer.seek(0)
-        return file_buffer.read(), file_name
+        content = file_buffer.getvalue()
+        drive_cache.drive_files.put(file_id, file_metadata, content)
+        return content, file_name
     except HttpError as error:
         print(f"Lỗi khi tải file từ Google Drive: {error}")
         return None, None
 
-def get_school_by_api_key(db: Session, api_key: str):
-    return db.query(models.School).filter(models.School.api_key == api_key).first()
+@dataclass(frozen=True)
+class SchoolIdentity:
+    """Thông tin trường dùng cho xác thực API key: nhẹ, không gắn với session nên lưu cache được."""
+    id: int
+    name: str
+    api_key: str
 
-def get_school_years(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.SchoolYear).order_by(models.SchoolYear.start_date.desc()).offset(skip).limit(limit).all()
+def get_school_by_api_key(db: Session, api_key: str) -> Optional[SchoolIdentity]:
+    """
+    Tra cứu trường theo API key qua cache.api_keys (LRU + TTL).
+    Key sai cũng được cache (giá trị None) để client cấu hình sai không truy vấn CSDL mỗi lần poll.
+    """
+    if not api_key:
+        return None
+    return cache.api_keys.get_or_load(api_key, lambda: _load_school_identity(db, api_key))
+
+def _load_school_identity(db: Session, api_key: str) -> Optional[SchoolIdentity]:
+    row = db.execute(
+        select(models.School.id, models.School.name, models.School.api_key)
+        .where(models.School.api_key == api_key)
+    ).first()
+    return SchoolIdentity(*row) if row else None
+
+# ====== PHÂN TRANG KEYSET (cursor) ======
+# Cursor là base64 của khóa sắp xếp (ví dụ [deadline, id]) của dòng cuối trang trước.
+# Trang sau lọc WHERE (deadline, id) < cursor nên dùng được index và không lệch khi có bản ghi mới chen vào.
+
+_CURSOR_TYPES = {datetime: datetime.fromisoformat, date: date.fromisoformat, str: str, int: int}
+
+def encode_cursor(*values) -> str:
+    raw = json.dumps([v.isoformat() if isinstance(v, (datetime, date)) else v for v in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, *types) -> tuple:
+    """Giải mã cursor thành tuple với kiểu lần lượt là `types`; ValueError nếu cursor không hợp lệ."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError(cursor)
+        return tuple(_CURSOR_TYPES[t](v) for t, v in zip(types, values))
+    except (binascii.Error, UnicodeDecodeError, TypeError, json.JSONDecodeError) as e:
+        raise ValueError(cursor) from e
+
+def next_cursor(rows, limit: Optional[int], *keys: str) -> Optional[str]:
+    """Cursor của trang tiếp theo, None nếu đây là trang cuối (ít hơn `limit` dòng)."""
+    if not rows or not limit or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(*(last[k] if isinstance(last, dict) else getattr(last, k) for k in keys))
+
+def _keyset_after(columns, values, descending: bool):
+    (first, tie), (first_value, tie_value) = columns, values
+    if descending:
+        return or_(first < first_value, and_(first == first_value, tie < tie_value))
+    return or_(first > first_value, and_(first == first_value, tie > tie_value))
+
+SCHOOL_YEAR_CURSOR = (str, int)  # (name, id), mới nhất trước
+SCHOOL_CURSOR = (str, int)       # (name, id), theo tên
+TASK_CURSOR = (datetime, int)    # (deadline, id), hạn nộp mới nhất trước
+
+def get_school_years(db: Session, skip: int = 0, limit: int = 100, after: Optional[tuple] = None):
+    # Tên năm học dạng "2024-2025" nên sắp theo tên giảm dần cũng là năm mới nhất trước
+    query = db.query(models.SchoolYear)
+    if after:
+        query = query.filter(_keyset_after((models.SchoolYear.name, models.SchoolYear.id), after, descending=True))
+    return query.order_by(models.SchoolYear.name.desc(), models.SchoolYear.id.desc()).offset(skip).limit(limit).all()
 
 def create_school_year(db: Session, school_year: schemas.SchoolYearCreate):
     try:
         drive_service, _ = _get_google_service('drive', 'v3')
-        folder_id = _get_or_create_folder(drive_service, school_year.name, ROOT_DRIVE_FOLDER_ID)
+        folder_id = _get_or_create_folder(drive_service, school_year.name, ROOT_DRIVE_FOLDER_ID, db)
         
         if not folder_id:
             return None
         
         db_school_year = models.SchoolYear(**school_year.dict(), drive_folder_id=folder_id)
         db.add(db_school_year)
+        db.flush()
+        log_change(db, "school_year", db_school_year.id)
         db.commit()
+        cache.invalidate_all()
         db.refresh(db_school_year)
         return db_school_year
     except Exception as e:
@@ -173,7 +372,9 @@ def delete_school_year(db: Session, school_year_id: int):
     db_school_year = db.query(models.SchoolYear).filter(models.SchoolYear.id == school_year_id).first()
     if db_school_year:
         db.delete(db_school_year)
+        log_change(db, "school_year", school_year_id, action="delete")
         db.commit()
+        cache.invalidate_all()
     return db_school_year
 
 def update_school_year(db: Session, school_year_id: int, school_year_update: schemas.SchoolYearUpdate):
@@ -190,7 +391,10 @@ def update_school_year(db: Session, school_year_id: int, school_year_update: sch
                 try:
                     drive_service, _ = _get_google_service('drive', 'v3')
                     success = _rename_drive_folder(drive_service, db_school_year.drive_folder_id, update_data['name'])
-                    if not success:
+                    if success:
+                        # Tên cũ không còn trỏ tới thư mục này; các thư mục con vẫn giữ nguyên
+                        _forget_drive_folder(db, db_school_year.drive_folder_id, with_children=False)
+                    else:
                         print(f"CẢNH BÁO: Không thể đổi tên thư mục Google Drive cho năm học ID {school_year_id}.")
                 except Exception as e:
                     print(f"Lỗi kết nối Google Drive API để đổi tên: {e}")
@@ -198,18 +402,29 @@ def update_school_year(db: Session, school_year_id: int, school_year_update: sch
         # Cập nhật các trường trong database
         for key, value in update_data.items():
             setattr(db_school_year, key, value)
+        log_change(db, "school_year", school_year_id)
         db.commit()
+        cache.invalidate_all()
         db.refresh(db_school_year)
     return db_school_year
 
-def get_schools(db: Session, skip: int = 0, limit: int = 100):
-    return db.query(models.School).order_by(models.School.name).offset(skip).limit(limit).all()
+def get_schools(db: Session, skip: int = 0, limit: int = 100, after: Optional[tuple] = None):
+    query = db.query(models.School)
+    if after:
+        query = query.filter(_keyset_after((models.School.name, models.School.id), after, descending=False))
+    return query.order_by(models.School.name, models.School.id).offset(skip).limit(limit).all()
 
 def create_school(db: Session, school: schemas.SchoolCreate):
     db_school = models.School(name=school.name)
     db.add(db_school)
     try:
+        db.flush()
+        # Trường mới thuộc diện "được giao" của các yêu cầu nộp file giao cho tất cả
+        refresh_compliance_counters(db, "file", school_id=db_school.id)
+        log_change(db, "school", db_school.id)
         db.commit()
+        cache.invalidate_all()
+        cache.api_keys.invalidate()
         db.refresh(db_school)
     except IntegrityError:
         db.rollback()
@@ -219,74 +434,128 @@ def create_school(db: Session, school: schemas.SchoolCreate):
 def delete_school(db: Session, school_id: int):
     db_school = db.query(models.School).filter(models.School.id == school_id).first()
     if db_school:
+        delete_compliance_counters(db, school_id=school_id)
         db.delete(db_school)
+        log_change(db, "school", school_id, action="delete")
         db.commit()
+        cache.invalidate_all()
+        # API key của trường bị xóa phải hết hiệu lực ngay
+        cache.api_keys.invalidate()
     return db_school
 
-def get_or_create_file_submission_folder(db: Session, task_id: int, school_id: int, user_email: Optional[str] = None) -> Optional[str]:
+def get_or_create_file_submission_folder(db: Session, task_id: int, school_id: int, user_email: Optional[str] = None,
+                                         refresh: bool = False) -> Optional[str]:
+    """
+    Thư mục "Thang mm-YYYY" của trường trong thư mục năm học. ID thư mục và việc chia sẻ đã được cache
+    (drive_folders / drive_folder_shares) nên từ lần nộp thứ hai trong tháng không gọi Drive API.
+    refresh=True (client gặp 404 khi tải lên) bỏ qua cache và dò lại trên Drive.
+    """
     task = db.query(models.FileTask).options(joinedload(models.FileTask.school_year)).filter(models.FileTask.id == task_id).first()
     school = db.query(models.School).filter(models.School.id == school_id).first()
     if not task or not school or not task.school_year or not task.school_year.drive_folder_id:
         return None
     drive_service, _ = _get_google_service('drive', 'v3')
-    school_folder_id = _get_or_create_folder(drive_service, school.name, task.school_year.drive_folder_id)
-    if not school_folder_id:
-        return None
     month_name = f"Thang {datetime.now().strftime('%m-%Y')}"
-    monthly_folder_id = _get_or_create_folder(drive_service, month_name, school_folder_id)
-    
-    if monthly_folder_id and user_email:
-        _share_folder_with_user(drive_service, monthly_folder_id, user_email)
+    for attempt_refresh in ((True,) if refresh else (False, True)):
+        try:
+            school_folder_id = _get_or_create_folder(drive_service, school.name, task.school_year.drive_folder_id, db, attempt_refresh)
+            if not school_folder_id:
+                return None
+            monthly_folder_id = _get_or_create_folder(drive_service, month_name, school_folder_id, db, attempt_refresh)
+            
+            if monthly_folder_id and user_email:
+                _share_folder_with_user(drive_service, monthly_folder_id, user_email, db)
+
+            return monthly_folder_id
+        except DriveFolderNotFound as e:
+            # ID trong cache không còn trên Drive (đã bỏ khỏi cache): dò lại từ Drive một lần
+            print(f"{e}, dò lại thư mục nộp bài từ Drive.")
+    return None
+
+def _file_task_assignment_clauses(school_id: int):
+    """
+    Trả về (is_reminded, is_assigned) cho một trường dưới dạng biểu thức EXISTS tương quan với FileTask.
+    Task không có bản ghi giao việc (TaskReminder) nào được coi là giao cho tất cả các trường.
+    """
+    reminder = models.TaskReminder
+    is_reminded = exists().where(
+        reminder.task_type == "file",
+        reminder.task_id == models.FileTask.id,
+        reminder.school_id == school_id,
+    )
+    has_assignees = exists().where(reminder.task_type == "file", reminder.task_id == models.FileTask.id)
+    return is_reminded, or_(~has_assignees, is_reminded)
+
+def _file_task_page(query, school_year_id: Optional[int], skip: int, limit: Optional[int], after: Optional[tuple] = None):
+    if school_year_id:
+        query = query.where(models.FileTask.school_year_id == school_year_id)
+    if after:
+        query = query.where(_keyset_after((models.FileTask.deadline, models.FileTask.id), after, descending=True))
+    return query.order_by(models.FileTask.deadline.desc(), models.FileTask.id.desc()).offset(skip).limit(limit)
 
-    return monthly_folder_id
+FILE_TASK_LIST_COLUMNS = (
+    models.FileTask.id, models.FileTask.title, models.FileTask.content, models.FileTask.deadline,
+    models.FileTask.school_year_id, models.FileTask.attachment_url, models.FileTask.created_at,
+)
 
-def get_file_tasks(
+def get_file_task_list_rows(
     db: Session,
     school_year_id: Optional[int] = None,
     current_school_id: Optional[int] = None,
     skip: int = 0,
-    limit: int = 100
-):
+    limit: Optional[int] = 100,
+    task_ids: Optional[List[int]] = None,
+    after: Optional[tuple] = None
+) -> List[Dict[str, Any]]:
     """
-    SỬA ĐỔI: Xóa bộ lọc is_locked để client thấy cả các task đã bị khóa.
+    Danh sách yêu cầu nộp file dạng dict, sẵn sàng trả về cho GET /file-tasks/.
+    is_submitted / is_reminded của trường hiện tại được tính ngay trong cùng câu SELECT.
+    task_ids: chỉ lấy các yêu cầu này (dùng cho /sync).
+    after: (deadline, id) của dòng cuối trang trước (phân trang keyset, xem decode_cursor).
     """
-    tasks_query = db.query(models.FileTask)
-    if school_year_id:
-        tasks_query = tasks_query.filter(models.FileTask.school_year_id == school_year_id)
-
-    tasks = tasks_query.order_by(models.FileTask.deadline.desc()).all()
-
-    reminders_all = db.query(models.TaskReminder.task_id, models.TaskReminder.school_id)\
-                      .filter(models.TaskReminder.task_type == "file").all()
-    assigned_map: dict[int, set[int]] = {}
-    for t_id, s_id in reminders_all:
-        assigned_map.setdefault(t_id, set()).add(s_id)
-
-    reminded_task_ids: set[int] = set()
+    is_locked = func.coalesce(models.FileTask.is_locked, False).label("is_locked")
     if current_school_id:
-        filtered = []
-        for t in tasks:
-            assignees = assigned_map.get(t.id, set())
-            if not assignees or (current_school_id in assignees):
-                filtered.append(t)
-        tasks = filtered
-        reminded_task_ids = {t_id for (t_id, s_id) in reminders_all if s_id == current_school_id}
-
-    tasks = tasks[skip: skip + limit]
-    return tasks, reminded_task_ids
+        is_reminded, is_assigned = _file_task_assignment_clauses(current_school_id)
+        is_submitted = exists().where(
+            models.FileSubmission.task_id == models.FileTask.id,
+            models.FileSubmission.school_id == current_school_id,
+        )
+        query = select(*FILE_TASK_LIST_COLUMNS, is_locked,
+                       is_submitted.label("is_submitted"), is_reminded.label("is_reminded")).where(is_assigned)
+    else:
+        query = select(*FILE_TASK_LIST_COLUMNS, is_locked,
+                       literal(False).label("is_submitted"), literal(False).label("is_reminded"))
+    if task_ids is not None:
+        query = query.where(models.FileTask.id.in_(task_ids))
+    query = _file_task_page(query, school_year_id, skip, limit, after)
+    return [_list_row(row) for row in db.execute(query).mappings()]
+
+def _list_row(row) -> Dict[str, Any]:
+    item = dict(row)
+    # SQLite trả về 0/1 cho các biểu thức EXISTS
+    for key in ("is_locked", "is_submitted", "is_reminded"):
+        item[key] = bool(item[key])
+    return item
 
 def create_file_task(db: Session, task: schemas.FileTaskCreate):
     db_task = models.FileTask(**task.dict())
     db.add(db_task)
+    db.flush()
+    refresh_compliance_counters(db, "file", [db_task.id])
+    log_change(db, "file_task", db_task.id)
     db.commit()
+    cache.invalidate_all()
     db.refresh(db_task)
     return db_task
 
 def delete_file_task(db: Session, task_id: int):
     db_task = db.query(models.FileTask).filter(models.FileTask.id == task_id).first()
     if db_task:
+        delete_compliance_counters(db, kind="file", item_id=task_id)
         db.delete(db_task)
+        log_change(db, "file_task", task_id, action="delete")
         db.commit()
+        cache.invalidate_all()
     return db_task
 
 def update_file_task(db: Session, task_id: int, task_update: schemas.FileTaskUpdate):
@@ -296,7 +565,11 @@ def update_file_task(db: Session, task_id: int, task_update: schemas.FileTaskUpd
         update_data = task_update.dict(exclude_unset=True)
         for key, value in update_data.items():
             setattr(db_task, key, value)
+        if "deadline" in update_data or "school_year_id" in update_data:
+            refresh_compliance_counters(db, "file", [task_id])
+        log_change(db, "file_task", task_id)
         db.commit()
+        cache.invalidate_all()
         db.refresh(db_task)
     return db_task
 
@@ -304,51 +577,119 @@ def get_file_task_by_id(db: Session, task_id: int):
     return db.query(models.FileTask).filter(models.FileTask.id == task_id).first()
 
 def create_file_submission(db: Session, submission: schemas.FileSubmissionCreate, school_id: int):
-    db_submission = db.query(models.FileSubmission).filter_by(task_id=submission.task_id, school_id=school_id).first()
-    if db_submission:
-        db_submission.file_url = submission.file_url
-        db_submission.submitted_at = datetime.utcnow()
-    else:
-        db_submission = models.FileSubmission(**submission.dict(), school_id=school_id)
-        db.add(db_submission)
+    """
+    Nộp (hoặc nộp lại) file cho một yêu cầu. Một câu INSERT ... ON CONFLICT (task_id, school_id) DO UPDATE
+    trên chỉ mục ux_file_submissions_task_school: hai request nộp lần đầu cùng lúc thì request sau
+    ghi đè bản nộp thay vì lỗi IntegrityError.
+    """
+    values = {**submission.dict(), "school_id": school_id, "submitted_at": datetime.utcnow()}
+    stmt = _dialect_insert(db)(models.FileSubmission).values(**values)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=["task_id", "school_id"],
+        set_={"file_url": stmt.excluded.file_url, "submitted_at": stmt.excluded.submitted_at}
+    ))
+    refresh_compliance_counters(db, "file", [submission.task_id], school_id=school_id)
+    log_change(db, "file_task", submission.task_id, school_id=school_id)
     db.commit()
-    db.refresh(db_submission)
-    return db_submission
+    cache.invalidate_all()
+    return db.query(models.FileSubmission).filter_by(task_id=submission.task_id, school_id=school_id).one()
 
 def get_file_task_status(db: Session, task_id: int):
-    task = get_file_task_by_id(db, task_id)
-    if not task:
-        return None
+    return get_status_for_tasks(db, "file", [task_id]).get(task_id)
 
-    target_ids = [sid for (sid,) in db.query(models.TaskReminder.school_id)
-                                  .filter(models.TaskReminder.task_type == "file",
-                                          models.TaskReminder.task_id == task_id).all()]
-    if target_ids:
-        eligible_schools = db.query(models.School).filter(models.School.id.in_(target_ids)).all()
-    else:
-        eligible_schools = get_schools(db)
-
-    submission_map = {sub.school_id: sub for sub in task.submissions}
-    submitted_schools_info = []
-    not_submitted_schools = []
-    for school in eligible_schools:
-        if school.id in submission_map:
-            submission = submission_map[school.id]
-            submitted_schools_info.append({
-                "id": school.id, "name": school.name,
-                "file_url": submission.file_url, "submitted_at": submission.submitted_at
-            })
+def get_status_for_tasks(db: Session, task_type: Literal["file", "data"], ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """
+    Tính trạng thái nộp của nhiều công việc cùng lúc (dùng cho scheduler và trang quản trị).
+    - file: 1 truy vấn task + 1 truy vấn (giao việc JOIN trường LEFT JOIN bản nộp)
+            + 1 truy vấn cho các task giao cho tất cả các trường (nếu có).
+    - data: 1 truy vấn báo cáo + 1 truy vấn (DataEntry JOIN trường).
+    Trả về {id: {"task"|"report": ..., "submitted_schools": [...], "not_submitted_schools": [...]}};
+    id không tồn tại sẽ không có trong kết quả.
+    """
+    ids = list(dict.fromkeys(ids))
+    if not ids:
+        return {}
+    if task_type == "data":
+        return _data_report_statuses(db, ids)
+
+    tasks = db.execute(select(models.FileTask).where(models.FileTask.id.in_(ids))).scalars().all()
+    if not tasks:
+        return {}
+    result = {t.id: {"task": t, "submitted_schools": [], "not_submitted_schools": []} for t in tasks}
+
+    def _collect(rows):
+        for task_id, school, file_url, submitted_at in rows:
+            status_data = result[task_id]
+            if file_url is not None:
+                status_data["submitted_schools"].append({
+                    "id": school.id, "name": school.name,
+                    "file_url": file_url, "submitted_at": submitted_at
+                })
+            else:
+                status_data["not_submitted_schools"].append(school)
+
+    submission_join = and_(models.FileSubmission.task_id == models.FileTask.id,
+                           models.FileSubmission.school_id == models.School.id)
+    columns = (models.FileTask.id, models.School, models.FileSubmission.file_url, models.FileSubmission.submitted_at)
+
+    # Task có bản ghi giao việc: chỉ các trường được giao
+    assigned_rows = db.execute(
+        select(*columns)
+        .select_from(models.TaskReminder)
+        .join(models.FileTask, models.FileTask.id == models.TaskReminder.task_id)
+        .join(models.School, models.School.id == models.TaskReminder.school_id)
+        .outerjoin(models.FileSubmission, submission_join)
+        .where(models.TaskReminder.task_type == "file", models.TaskReminder.task_id.in_(result.keys()))
+        .order_by(models.School.name)
+    ).all()
+    _collect(assigned_rows)
+
+    # Task không có bản ghi giao việc nào: giao cho tất cả các trường
+    unassigned_ids = set(result) - {row[0] for row in assigned_rows}
+    if unassigned_ids:
+        _collect(db.execute(
+            select(*columns)
+            .select_from(models.FileTask)
+            .join(models.School, true())
+            .outerjoin(models.FileSubmission, submission_join)
+            .where(models.FileTask.id.in_(unassigned_ids))
+            .order_by(models.School.name)
+        ).all())
+    return result
+
+def _data_report_statuses(db: Session, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    reports = db.execute(select(models.DataReport).where(models.DataReport.id.in_(ids))).scalars().all()
+    result = {r.id: {"report": r, "submitted_schools": [], "not_submitted_schools": []} for r in reports}
+    if not result:
+        return {}
+
+    rows = db.execute(
+        select(models.DataEntry.report_id, models.School, models.DataEntry.submitted_at)
+        .select_from(models.DataEntry)
+        .join(models.School, models.School.id == models.DataEntry.school_id)
+        .where(models.DataEntry.report_id.in_(result.keys()))
+        .order_by(models.School.name)
+    ).all()
+    for report_id, school, submitted_at in rows:
+        status_data = result[report_id]
+        if submitted_at:
+            status_data["submitted_schools"].append({"id": school.id, "name": school.name, "submitted_at": submitted_at})
         else:
-            not_submitted_schools.append(school)
-
-    return {"task": task, "submitted_schools": submitted_schools_info, "not_submitted_schools": not_submitted_schools}
+            status_data["not_submitted_schools"].append(school)
+    return result
 
 def get_submitted_file_task_ids_for_school(db: Session, school_id: int) -> Set[int]:
     submitted_tasks = db.query(models.FileSubmission.task_id).filter(models.FileSubmission.school_id == school_id).distinct().all()
     return {task_id for (task_id,) in submitted_tasks}
 
-def get_submissions_for_file_task(db: Session, task_id: int) -> List[models.FileSubmission]:
-    return db.query(models.FileSubmission).filter(models.FileSubmission.task_id == task_id).all()
+def get_submission_files_for_task(db: Session, task_id: int) -> List[Tuple[str, str]]:
+    """[(tên trường, file_url)] của các bài nộp cho một yêu cầu, trong một truy vấn JOIN (không nạp từng School)."""
+    return [tuple(row) for row in db.execute(
+        select(models.School.name, models.FileSubmission.file_url)
+        .join(models.School, models.School.id == models.FileSubmission.school_id)
+        .where(models.FileSubmission.task_id == task_id)
+        .order_by(models.School.name)
+    )]
 
 def create_data_report(db: Session, report: schemas.DataReportCreate,
                        target_school_ids: Optional[List[int]] = None) -> models.DataReport:
@@ -362,29 +703,117 @@ def create_data_report(db: Session, report: schemas.DataReportCreate,
         attachment_url=report.attachment_url
     )
     db.add(db_report)
-    db.commit()
-    db.refresh(db_report)
+    db.flush()
 
     if target_school_ids:
-        schools = db.query(models.School).filter(models.School.id.in_(target_school_ids)).all()
+        school_ids = _existing_school_ids(db, target_school_ids)
     else:
-        schools = get_schools(db)
+        school_ids = [sid for (sid,) in db.execute(select(models.School.id))]
 
-    for s in schools:
-        db.add(models.DataEntry(report_id=db_report.id, school_id=s.id, data=report.template_data, submitted_at=None))
+    bulk_assign_data_report(db, db_report.id, school_ids, report.template_data)
+    refresh_compliance_counters(db, "data", [db_report.id])
+    log_change(db, "data_report", db_report.id)
     db.commit()
+    cache.invalidate_all()
+    db.refresh(db_report)
     return db_report
+
+# Số bản ghi mỗi câu lệnh INSERT nhiều dòng (giữ dưới giới hạn số tham số của SQLite/PostgreSQL)
+BULK_INSERT_CHUNK = 1000
+
+def _existing_school_ids(db: Session, school_ids: List[int]) -> List[int]:
+    """Lọc danh sách id trường: bỏ id trùng và id không tồn tại, giữ nguyên thứ tự."""
+    wanted = list(dict.fromkeys(school_ids))
+    existing: Set[int] = set()
+    for i in range(0, len(wanted), BULK_INSERT_CHUNK):
+        chunk = wanted[i:i + BULK_INSERT_CHUNK]
+        existing.update(sid for (sid,) in db.execute(select(models.School.id).where(models.School.id.in_(chunk))))
+    return [sid for sid in wanted if sid in existing]
+
+def _bulk_insert(db: Session, model, rows: List[Dict[str, Any]]) -> int:
+    """
+    INSERT nhiều dòng bằng executemany (SQLAlchemy gộp thành INSERT ... VALUES (...), (...)),
+    không tạo đối tượng ORM cho từng dòng. Không commit.
+    """
+    for i in range(0, len(rows), BULK_INSERT_CHUNK):
+        db.execute(insert(model), rows[i:i + BULK_INSERT_CHUNK])
+    return len(rows)
+
+def bulk_assign_data_report(db: Session, report_id: int, school_ids: List[int],
+                            template_data: Optional[List[Dict[str, Any]]] = None) -> int:
+    """Tạo bản ghi DataEntry (chưa nộp, chứa dữ liệu mẫu) cho các trường được giao."""
+    return _bulk_insert(db, models.DataEntry, [
+        {"report_id": report_id, "school_id": sid, "data": template_data, "submitted_at": None}
+        for sid in school_ids
+    ])
+
+def bulk_assign_file_task(db: Session, task_id: int, school_ids: List[int]) -> int:
+    """Tạo bản ghi TaskReminder (bản ghi giao nhiệm vụ) cho các trường được giao."""
+    now = datetime.utcnow()
+    return _bulk_insert(db, models.TaskReminder, [
+        {"task_type": "file", "task_id": task_id, "school_id": sid, "created_at": now}
+        for sid in school_ids
+    ])
        
+def _write_entry_data(db: Session, entry: models.DataEntry, rows: List[Dict[str, Any]]) -> None:
+    """
+    Ghi dữ liệu của một DataEntry theo chế độ lưu đang bật.
+    - Chế độ theo dòng: chỉ INSERT/UPDATE/DELETE những dòng thay đổi, DataEntry.data = NULL.
+    - Chế độ JSON: ghi cả danh sách vào DataEntry.data và xóa các dòng cũ (nếu có).
+    """
+    if not DATA_ENTRY_ROW_STORAGE:
+        entry.data = rows
+        db.execute(delete(models.DataEntryRow).where(models.DataEntryRow.entry_id == entry.id))
+        return
+
+    existing = {
+        row_index: (row_id, data)
+        for row_id, row_index, data in db.execute(
+            select(models.DataEntryRow.id, models.DataEntryRow.row_index, models.DataEntryRow.data)
+            .where(models.DataEntryRow.entry_id == entry.id)
+        )
+    }
+    to_insert, to_update = [], []
+    for idx, row in enumerate(rows):
+        if idx not in existing:
+            to_insert.append({"entry_id": entry.id, "row_index": idx, "data": row})
+        elif existing[idx][1] != row:
+            to_update.append({"id": existing[idx][0], "data": row})
+
+    if len(existing) > len(rows):
+        db.execute(delete(models.DataEntryRow).where(
+            models.DataEntryRow.entry_id == entry.id,
+            models.DataEntryRow.row_index >= len(rows)
+        ))
+    if to_update:
+        db.execute(update(models.DataEntryRow), to_update)
+    if to_insert:
+        db.execute(insert(models.DataEntryRow), to_insert)
+    entry.data = None
+
+def _read_entry_data(db: Session, entry: models.DataEntry) -> List[Dict[str, Any]]:
+    """Đọc dữ liệu của một DataEntry, bất kể đang lưu dạng JSON hay theo dòng."""
+    if entry.data is not None:
+        return entry.data
+    return [data for (data,) in db.execute(
+        select(models.DataEntryRow.data)
+        .where(models.DataEntryRow.entry_id == entry.id)
+        .order_by(models.DataEntryRow.row_index)
+    )]
+
 def create_or_update_data_submission(db: Session, report_id: int, school_id: int, submission_data: List[Dict[str, Any]]) -> Optional[models.DataEntry]:
     entry = db.query(models.DataEntry).filter_by(report_id=report_id, school_id=school_id).first()
     
     if not entry:
         return None
 
-    entry.data = submission_data
+    _write_entry_data(db, entry, submission_data)
     entry.submitted_at = datetime.utcnow()
+    refresh_compliance_counters(db, "data", [report_id], school_id=school_id)
+    log_change(db, "data_report", report_id, school_id=school_id)
     
     db.commit()
+    cache.invalidate_all()
     db.refresh(entry)
     return entry
 
@@ -394,7 +823,7 @@ def get_data_submission_for_school(db: Session, report_id: int, school_id: int)
     if not entry:
         return None
     
-    return {"data": entry.data or []}
+    return {"data": _read_entry_data(db, entry) or []}
 
 def get_data_reports(db: Session, school_year_id: Optional[int] = None, current_school_id: Optional[int] = None, skip: int = 0, limit: int = 100):
     """
@@ -423,26 +852,216 @@ def get_data_reports(db: Session, school_year_id: Optional[int] = None, current_
     
     return reports, reminded_report_ids
     
+DATA_REPORT_LIST_COLUMNS = (
+    models.DataReport.id, models.DataReport.title, models.DataReport.description, models.DataReport.deadline,
+    models.DataReport.created_at, models.DataReport.columns_schema, models.DataReport.template_data,
+    models.DataReport.attachment_url,
+)
+
+def get_data_report_list_rows(
+    db: Session,
+    school_year_id: Optional[int] = None,
+    current_school_id: Optional[int] = None,
+    skip: int = 0,
+    limit: Optional[int] = 100,
+    report_ids: Optional[List[int]] = None,
+    after: Optional[tuple] = None
+) -> List[Dict[str, Any]]:
+    """
+    Danh sách báo cáo nhập liệu dạng dict cho GET /data-reports/.
+    Với trường hiện tại: JOIN DataEntry của trường (lọc báo cáo được giao + cờ đã nộp)
+    và EXISTS trên task_reminders (cờ đã nhắc) trong cùng một câu SELECT.
+    report_ids: chỉ lấy các báo cáo này (dùng cho /sync).
+    after: (deadline, id) của dòng cuối trang trước (phân trang keyset).
+    """
+    is_locked = func.coalesce(models.DataReport.is_locked, False).label("is_locked")
+    if current_school_id:
+        is_reminded = exists().where(
+            models.TaskReminder.task_type == "data",
+            models.TaskReminder.task_id == models.DataReport.id,
+            models.TaskReminder.school_id == current_school_id,
+        )
+        query = (
+            select(*DATA_REPORT_LIST_COLUMNS, is_locked,
+                   models.DataEntry.submitted_at.isnot(None).label("is_submitted"),
+                   is_reminded.label("is_reminded"))
+            .join(models.DataEntry, and_(models.DataEntry.report_id == models.DataReport.id,
+                                         models.DataEntry.school_id == current_school_id))
+        )
+    else:
+        query = select(*DATA_REPORT_LIST_COLUMNS, is_locked,
+                       literal(False).label("is_submitted"), literal(False).label("is_reminded"))
+
+    if school_year_id:
+        query = query.where(models.DataReport.school_year_id == school_year_id)
+    if report_ids is not None:
+        query = query.where(models.DataReport.id.in_(report_ids))
+    if after:
+        query = query.where(_keyset_after((models.DataReport.deadline, models.DataReport.id), after, descending=True))
+    query = query.order_by(models.DataReport.deadline.desc(), models.DataReport.id.desc()).offset(skip).limit(limit)
+    return [_list_row(row) for row in db.execute(query).mappings()]
+
 def get_data_report_status(db: Session, report_id: int):
-    report = db.query(models.DataReport).filter(models.DataReport.id == report_id).first()
-    if not report: return None
-    entry_map = {e.school_id: e for e in report.entries}
-    target_ids = list(entry_map.keys())
-    if not target_ids:
-        return {"report": report, "submitted_schools": [], "not_submitted_schools": []}
-
-    target_schools = db.query(models.School).filter(models.School.id.in_(target_ids)).all()
-    submitted_schools_info = []
-    not_submitted_schools = []
-    for s in target_schools:
-        e = entry_map.get(s.id)
-        if e and e.submitted_at:
-            submitted_schools_info.append({"id": s.id, "name": s.name, "submitted_at": e.submitted_at})
-        else:
-            not_submitted_schools.append(s)
-    return {"report": report, "submitted_schools": submitted_schools_info, "not_submitted_schools": not_submitted_schools}
+    return get_status_for_tasks(db, "data", [report_id]).get(report_id)
+
+# ====== NHẬT KÝ THAY ĐỔI & ĐỒNG BỘ TĂNG DẦN (GET /sync) ======
+
+# Cursor của /sync là change_log.id, nên id phải được cấp theo đúng thứ tự commit: nếu giao dịch cấp
+# id nhỏ hơn commit sau giao dịch cấp id lớn hơn, client đã đọc qua id lớn sẽ bỏ sót thay đổi đó.
+# - SQLite: chỉ một người ghi, khóa ghi giữ tới khi commit nên id luôn theo thứ tự commit.
+# - PostgreSQL: giao dịch lấy khóa advisory (mức giao dịch) trước khi ghi change_log, khóa tự nhả khi
+#   commit / rollback. Các giao dịch ghi nhật ký vì vậy cấp id và commit lần lượt, và tập id mà một
+#   snapshot nhìn thấy luôn là một đoạn liên tục từ đầu.
+PG_CHANGE_LOG_LOCK_KEY = 7_240_315_016
+
+def _lock_change_log(db: Session) -> None:
+    if db.get_bind().dialect.name == "postgresql":
+        db.execute(select(func.pg_advisory_xact_lock(PG_CHANGE_LOG_LOCK_KEY)))
+
+def log_change(db: Session, entity: str, entity_ids, action: str = "upsert", school_id: Optional[int] = None) -> None:
+    """
+    Ghi nhật ký thay đổi cho một hoặc nhiều id. Không commit: gọi ngay trước commit của thao tác ghi
+    (trên PostgreSQL giao dịch giữ khóa change_log từ đây tới lúc commit).
+    """
+    if isinstance(entity_ids, int):
+        entity_ids = [entity_ids]
+    _lock_change_log(db)
+    now = datetime.utcnow()
+    _bulk_insert(db, models.ChangeLogEntry, [
+        {"entity": entity, "entity_id": entity_id, "action": action, "school_id": school_id, "created_at": now}
+        for entity_id in dict.fromkeys(entity_ids)
+    ])
+
+def get_sync_payload(db: Session, since: Optional[int], current_school_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Thay đổi sau cursor `since` cho client:
+    - Trường (có API key): yêu cầu nộp file / báo cáo được giao cho trường kèm cờ đã nộp, đã nhắc, đã khóa.
+    - Quản trị (không có API key): thêm danh sách trường và năm học, không có cờ theo trường.
+    Bản ghi đã xóa, hoặc không còn giao cho trường, nằm trong "deleted".
+    Trả về full=True kèm toàn bộ dữ liệu khi chưa có cursor, cursor không hợp lệ hoặc CSDL vừa reset.
+    """
+    log = models.ChangeLogEntry
+    head = db.execute(select(func.coalesce(func.max(log.id), 0))).scalar_one()
+    is_admin = current_school_id is None
+
+    changes = None
+    if since and since <= head:
+        visible = log.school_id.is_(None) if is_admin else or_(log.school_id.is_(None), log.school_id == current_school_id)
+        entries = db.execute(
+            select(log.id, log.entity, log.entity_id, log.action)
+            .where(log.id > since, log.id <= head, visible)
+            .order_by(log.id)
+        ).all()
+        if not any(entity == "reset" for _, entity, _, _ in entries):
+            # Chỉ giữ thao tác cuối cùng cho mỗi bản ghi
+            changes = {}
+            for _, entity, entity_id, action in entries:
+                changes.setdefault(entity, {})[entity_id] = action
+
+    payload: Dict[str, Any] = {"cursor": head, "full": changes is None,
+                               "file_tasks": [], "data_reports": [], "schools": [], "school_years": [],
+                               "deleted": {"file_task": [], "data_report": [], "school": [], "school_year": []}}
+
+    def _collect(entity: str, load):
+        if changes is None:
+            payload[entity + "s"] = load(None)
+            return
+        actions = changes.get(entity, {})
+        upsert_ids = [entity_id for entity_id, action in actions.items() if action != "delete"]
+        rows = load(upsert_ids) if upsert_ids else []
+        found = {row["id"] if isinstance(row, dict) else row.id for row in rows}
+        payload[entity + "s"] = rows
+        # Đã xóa, hoặc không còn hiển thị với client này (ví dụ không còn được giao cho trường)
+        payload["deleted"][entity] = [entity_id for entity_id in actions if entity_id not in found]
+
+    _collect("file_task", lambda ids: get_file_task_list_rows(
+        db, current_school_id=current_school_id, limit=None, task_ids=ids))
+    _collect("data_report", lambda ids: get_data_report_list_rows(
+        db, current_school_id=current_school_id, limit=None, report_ids=ids))
+    if is_admin:
+        _collect("school", lambda ids: db.execute(
+            select(models.School).where(models.School.id.in_(ids)) if ids is not None else select(models.School)
+        ).scalars().all())
+        _collect("school_year", lambda ids: db.execute(
+            select(models.SchoolYear).where(models.SchoolYear.id.in_(ids)) if ids is not None else select(models.SchoolYear)
+        ).scalars().all())
+    return payload
+
+# ====== PHIÊN BẢN DỮ LIỆU CHO ETAG ======
+# Mỗi hàm trả về một chuỗi ghép từ vài COUNT/MAX rẻ (chạy trong một câu SELECT);
+# chuỗi chỉ đổi khi dữ liệu mà endpoint tương ứng trả về có thể đã đổi.
+
+def _version_tag(db: Session, *aggregates) -> str:
+    row = db.execute(select(*[agg.scalar_subquery() for agg in aggregates])).one()
+    return "|".join("" if value is None else str(value) for value in row)
+
+def _schools_version_aggregates():
+    return (select(func.count(models.School.id)), select(func.max(models.School.updated_at)))
+
+def get_schools_version(db: Session) -> str:
+    return _version_tag(db, *_schools_version_aggregates())
+
+def get_file_task_list_version(db: Session, current_school_id: Optional[int] = None) -> str:
+    file_reminder = models.TaskReminder.task_type == "file"
+    aggregates = [
+        select(func.count(models.FileTask.id)),
+        select(func.max(models.FileTask.updated_at)),
+        # Cờ "được giao" phụ thuộc việc task có TaskReminder nào hay không
+        select(func.count(models.TaskReminder.id)).where(file_reminder),
+        select(func.max(models.TaskReminder.id)).where(file_reminder),
+    ]
+    if current_school_id:
+        own = models.FileSubmission.school_id == current_school_id
+        aggregates += [
+            select(func.count(models.FileSubmission.id)).where(own),
+            select(func.max(models.FileSubmission.submitted_at)).where(own),
+        ]
+    return _version_tag(db, *aggregates)
+
+def get_data_report_list_version(db: Session, current_school_id: Optional[int] = None) -> str:
+    aggregates = [
+        select(func.count(models.DataReport.id)),
+        select(func.max(models.DataReport.updated_at)),
+    ]
+    if current_school_id:
+        own_entry = models.DataEntry.school_id == current_school_id
+        own_reminder = and_(models.TaskReminder.task_type == "data",
+                            models.TaskReminder.school_id == current_school_id)
+        aggregates += [
+            select(func.count(models.DataEntry.id)).where(own_entry),
+            select(func.max(models.DataEntry.submitted_at)).where(own_entry),
+            select(func.count(models.TaskReminder.id)).where(own_reminder),
+        ]
+    return _version_tag(db, *aggregates)
+
+def get_file_task_status_version(db: Session, task_id: int) -> str:
+    of_task = models.FileSubmission.task_id == task_id
+    return _version_tag(
+        db,
+        select(models.FileTask.updated_at).where(models.FileTask.id == task_id),
+        select(func.count(models.FileSubmission.id)).where(of_task),
+        select(func.max(models.FileSubmission.submitted_at)).where(of_task),
+        select(func.count(models.TaskReminder.id)).where(models.TaskReminder.task_type == "file",
+                                                         models.TaskReminder.task_id == task_id),
+        *_schools_version_aggregates(),
+    )
+
+def get_data_report_status_version(db: Session, report_id: int) -> str:
+    of_report = models.DataEntry.report_id == report_id
+    return _version_tag(
+        db,
+        select(models.DataReport.updated_at).where(models.DataReport.id == report_id),
+        select(func.count(models.DataEntry.id)).where(of_report),
+        select(func.count(models.DataEntry.submitted_at)).where(of_report),
+        select(func.max(models.DataEntry.submitted_at)).where(of_report),
+        *_schools_version_aggregates(),
+    )
 
 def get_dashboard_stats(db: Session) -> schemas.DashboardStats:
+    """Thống kê dashboard, lưu trong cache.dashboard_stats đến khi có thao tác ghi hoặc hết TTL."""
+    return cache.dashboard_stats.get_or_load("dashboard", lambda: _load_dashboard_stats(db))
+
+def _load_dashboard_stats(db: Session) -> schemas.DashboardStats:
     now = datetime.utcnow()
     
     overdue_file_tasks = db.query(models.FileTask).filter(
@@ -472,68 +1091,195 @@ def update_data_submission_by_admin(db: Session, report_id: int, school_id: int,
     if not entry:
         return None
 
-    entry.data = submission_update.data
+    _write_entry_data(db, entry, submission_update.data)
     if not entry.submitted_at:
         entry.submitted_at = datetime.utcnow()
         
     entry.last_edited_by = "admin"
     entry.last_edited_at = datetime.utcnow()
+    refresh_compliance_counters(db, "data", [report_id], school_id=school_id)
+    log_change(db, "data_report", report_id, school_id=school_id)
     
     db.commit()
+    cache.invalidate_all()
     db.refresh(entry)
     return entry
 
-def get_all_data_submissions_for_report(db: Session, report_id: int) -> List[Dict[str, Any]]:
-    q = (
-        db.query(models.DataEntry)
-        .filter(models.DataEntry.report_id == report_id, models.DataEntry.submitted_at.isnot(None))
-        .all()
+def iter_data_submission_rows(db: Session, report_id: int, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+    """
+    Duyệt lần lượt từng dòng dữ liệu đã nộp của một báo cáo, theo thứ tự bản ghi rồi thứ tự dòng.
+    Dùng hai truy vấn chạy song song (JSON cũ và bảng data_entry_rows) có yield_per nên
+    không phải nạp toàn bộ báo cáo vào bộ nhớ.
+    """
+    for _, _, row in iter_data_submission_rows_with_school(db, report_id, batch_size):
+        yield row
+
+def iter_data_submission_rows_with_school(
+    db: Session, report_id: int, batch_size: int = 500
+) -> Iterator[Tuple[str, datetime, Dict[str, Any]]]:
+    """Như iter_data_submission_rows nhưng kèm (tên trường, thời điểm nộp) của từng dòng, dùng khi xuất file."""
+    entries = db.execute(
+        select(models.DataEntry.id, models.School.name, models.DataEntry.submitted_at, models.DataEntry.data)
+        .outerjoin(models.School, models.School.id == models.DataEntry.school_id)
+        .where(models.DataEntry.report_id == report_id, models.DataEntry.submitted_at.isnot(None))
+        .order_by(models.DataEntry.id)
+        .execution_options(yield_per=batch_size)
+    )
+    row_stream = db.execute(
+        select(models.DataEntryRow.entry_id, models.DataEntryRow.data)
+        .join(models.DataEntry, models.DataEntry.id == models.DataEntryRow.entry_id)
+        .where(models.DataEntry.report_id == report_id, models.DataEntry.submitted_at.isnot(None))
+        .order_by(models.DataEntryRow.entry_id, models.DataEntryRow.row_index)
+        .execution_options(yield_per=batch_size)
     )
-           
-    results = []
-    for entry in q:
-        if entry.data: 
-            results.extend(entry.data)
-    return results
+    pending = next(row_stream, None)
+    for entry_id, school_name, submitted_at, data in entries:
+        if data is not None:
+            for row in data:
+                yield school_name, submitted_at, row
+            continue
+        while pending is not None and pending.entry_id < entry_id:
+            pending = next(row_stream, None)
+        while pending is not None and pending.entry_id == entry_id:
+            yield school_name, submitted_at, pending.data
+            pending = next(row_stream, None)
+
+def has_data_submissions(db: Session, report_id: int) -> bool:
+    return db.execute(select(exists().where(
+        models.DataEntry.report_id == report_id, models.DataEntry.submitted_at.isnot(None)
+    ))).scalar()
+
+def get_all_data_submissions_for_report(db: Session, report_id: int) -> List[Dict[str, Any]]:
+    return list(iter_data_submission_rows(db, report_id))
+
+def migrate_data_entries_to_rows(db: Session, report_id: Optional[int] = None, batch_size: int = 200) -> int:
+    """
+    Chuyển các bản ghi đã nộp đang lưu JSON sang bảng data_entry_rows (dùng cho `manage.py backfill-data-rows`).
+    Trả về số bản ghi đã chuyển.
+    """
+    converted = 0
+    last_id = 0
+    while True:
+        q = db.query(models.DataEntry).filter(
+            models.DataEntry.id > last_id, models.DataEntry.submitted_at.isnot(None)
+        )
+        if report_id:
+            q = q.filter(models.DataEntry.report_id == report_id)
+        batch = q.order_by(models.DataEntry.id).limit(batch_size).all()
+        if not batch:
+            return converted
+        last_id = batch[-1].id
+        # Cột JSON có thể là SQL NULL hoặc JSON 'null' nên lọc ở Python
+        batch = [entry for entry in batch if entry.data is not None]
+        for entry in batch:
+            rows = entry.data
+            db.execute(delete(models.DataEntryRow).where(models.DataEntryRow.entry_id == entry.id))
+            if rows:
+                db.execute(insert(models.DataEntryRow),
+                           [{"entry_id": entry.id, "row_index": i, "data": row} for i, row in enumerate(rows)])
+            entry.data = None
+        db.commit()
+        converted += len(batch)
  
 def delete_data_report(db: Session, report_id: int):
     db_report = db.query(models.DataReport).filter(models.DataReport.id == report_id).first()
     if db_report:
+        delete_compliance_counters(db, kind="data", item_id=report_id)
         db.delete(db_report)
+        log_change(db, "data_report", report_id, action="delete")
         db.commit()
+        cache.invalidate_all()
     return db_report
     
-def create_reminders_for_task(db: Session, task_type: str, task_id: int):
-    not_submitted_schools = []
-    if task_type == "file":
-        status_data = get_file_task_status(db, task_id)
-        if not status_data: return False, "Không tìm thấy công việc."
-        not_submitted_schools = status_data.get('not_submitted_schools', [])
-    elif task_type == "data":
-        status_data = get_data_report_status(db, task_id)
-        if not status_data: return False, "Không tìm thấy báo cáo."
-        not_submitted_schools = status_data.get('not_submitted_schools', [])
-
-    if not not_submitted_schools:
-        return True, "Tất cả các trường đã nộp, không cần gửi nhắc nhở."
-    
-    count = 0
-    for school in not_submitted_schools:
-        existing_reminder = db.query(models.TaskReminder).filter_by(
-            task_type=task_type, task_id=task_id, school_id=school.id
-        ).first()
-        if not existing_reminder:
-            reminder = models.TaskReminder(task_type=task_type, task_id=task_id, school_id=school.id)
-            db.add(reminder)
-            count += 1
-    
+def _pending_reminders_select(task_type: str, task_ids: List[int], now: datetime):
+    """
+    SELECT các cặp (task_type, task_id, school_id, created_at) cần tạo nhắc nhở:
+    trường được giao, chưa nộp và chưa có nhắc nhở.
+    """
+    reminder = models.TaskReminder
+    already_reminded = exists().where(
+        reminder.task_type == task_type,
+        reminder.task_id == (models.FileTask.id if task_type == "file" else models.DataEntry.report_id),
+        reminder.school_id == (models.School.id if task_type == "file" else models.DataEntry.school_id),
+    )
+
+    if task_type == "data":
+        # Báo cáo nhập liệu: mỗi DataEntry là một trường được giao
+        return (
+            select(literal(task_type), models.DataEntry.report_id, models.DataEntry.school_id, literal(now))
+            .where(models.DataEntry.report_id.in_(task_ids),
+                   models.DataEntry.submitted_at.is_(None),
+                   ~already_reminded)
+        )
+
+    # Yêu cầu nộp file: TaskReminder đồng thời là bản ghi giao việc, nên trường được giao
+    # đã có sẵn bản ghi. Chỉ các yêu cầu "giao cho tất cả" (chưa có TaskReminder nào)
+    # mới phát sinh nhắc nhở mới, cho mọi trường chưa nộp.
+    has_assignments = exists().where(reminder.task_type == "file", reminder.task_id == models.FileTask.id)
+    submitted = exists().where(
+        models.FileSubmission.task_id == models.FileTask.id,
+        models.FileSubmission.school_id == models.School.id,
+    )
+    return (
+        select(literal(task_type), models.FileTask.id, models.School.id, literal(now))
+        .select_from(models.FileTask)
+        .join(models.School, true())
+        .where(models.FileTask.id.in_(task_ids), ~has_assignments, ~submitted)
+    )
+
+def create_reminders_for_tasks(db: Session, task_type: str, task_ids: List[int]) -> int:
+    """
+    Tạo nhắc nhở cho các trường chưa nộp của nhiều công việc bằng MỘT câu lệnh
+    INSERT ... SELECT ... WHERE NOT EXISTS (kèm ON CONFLICT DO NOTHING để an toàn khi chạy song song).
+    Trả về số nhắc nhở đã tạo.
+    """
+    task_ids = list(dict.fromkeys(task_ids))
+    if not task_ids:
+        return 0
+
+    now = datetime.utcnow()
+    dialect_insert = pg_insert if db.bind.dialect.name == "postgresql" else sqlite_insert
+    stmt = dialect_insert(models.TaskReminder).from_select(
+        ["task_type", "task_id", "school_id", "created_at"],
+        _pending_reminders_select(task_type, task_ids, now)
+    ).on_conflict_do_nothing()
+    result = db.execute(stmt)
+    inserted = max(result.rowcount or 0, 0)
+    if task_type == "file" and inserted:
+        # Yêu cầu "giao cho tất cả" vừa có TaskReminder nên tập trường được giao thay đổi
+        refresh_compliance_counters(db, "file", task_ids)
+        log_change(db, "file_task", task_ids)
+    elif inserted:
+        # Cờ "đã nhắc" chỉ đổi với các trường vừa được nhắc
+        _lock_change_log(db)
+        db.execute(insert(models.ChangeLogEntry).from_select(
+            ["entity", "entity_id", "action", "school_id", "created_at"],
+            select(literal("data_report"), models.TaskReminder.task_id, literal("upsert"),
+                   models.TaskReminder.school_id, literal(now))
+            .where(models.TaskReminder.task_type == "data",
+                   models.TaskReminder.task_id.in_(task_ids),
+                   models.TaskReminder.created_at == now)
+        ))
     db.commit()
-    return True, f"Đã tạo {count} nhắc nhở cho các trường chưa nộp."
+    cache.invalidate_all()
+    return inserted
+
+def create_reminders_for_task(db: Session, task_type: str, task_id: int):
+    model = models.FileTask if task_type == "file" else models.DataReport
+    if db.get(model, task_id) is None:
+        return False, "Không tìm thấy công việc." if task_type == "file" else "Không tìm thấy báo cáo.", 0
+
+    count = create_reminders_for_tasks(db, task_type, [task_id])
+    if not count:
+        return True, "Không có trường nào cần nhắc thêm (đã nộp hoặc đã được nhắc).", 0
+    return True, f"Đã tạo {count} nhắc nhở cho các trường chưa nộp.", count
 
 def reset_database(db: Session):
     try:
+        db.query(models.SchoolComplianceCounter).delete()
         db.query(models.TaskReminder).delete()
         db.query(models.FileSubmission).delete()
+        db.query(models.DataEntryRow).delete()
         db.query(models.DataEntry).delete()
         db.commit()
         db.query(models.FileTask).delete()
@@ -542,7 +1288,11 @@ def reset_database(db: Session):
         db.query(models.School).delete()
         db.commit()
         db.query(models.SchoolYear).delete()
+        # Giữ nhật ký thay đổi (cursor của client phải tăng tiếp), chỉ đánh dấu để client tải lại toàn bộ
+        log_change(db, "reset", 0)
         db.commit()
+        cache.invalidate_all()
+        cache.api_keys.invalidate()
         return True, "Đã xóa toàn bộ dữ liệu thành công."
     except Exception as e:
         db.rollback()
@@ -563,8 +1313,12 @@ def update_data_report(db: Session, report_id: int, report_update: schemas.DataR
 
         for key, value in update_data.items():
             setattr(db_report, key, value)
+        if "deadline" in update_data:
+            refresh_compliance_counters(db, "data", [report_id])
+        log_change(db, "data_report", report_id)
             
         db.commit()
+        cache.invalidate_all()
         db.refresh(db_report)
     return db_report
     
@@ -580,25 +1334,204 @@ def create_file_task_with_targets(
     """
     db_task = models.FileTask(**task.dict())
     db.add(db_task)
-    db.commit()
-    db.refresh(db_task)
+    db.flush()
 
     ids_to_assign = []
     if target_school_ids is None:
         # Nếu target_school_ids là None, có nghĩa là giao cho TẤT CẢ các trường
-        all_schools = db.query(models.School.id).all()
-        ids_to_assign = [s.id for s in all_schools]
+        ids_to_assign = [sid for (sid,) in db.execute(select(models.School.id))]
     else:
-        # Ngược lại, chỉ giao cho các trường được chỉ định
-        ids_to_assign = target_school_ids
+        # Ngược lại, chỉ giao cho các trường được chỉ định còn tồn tại (bỏ id trùng vì có chỉ mục UNIQUE)
+        ids_to_assign = _existing_school_ids(db, target_school_ids)
+        if target_school_ids and not ids_to_assign:
+            # Yêu cầu không có reminder được coi là giao cho tất cả: không để danh sách sai thành "tất cả"
+            db.rollback()
+            raise HTTPException(status_code=400, detail="Không có trường nào hợp lệ trong danh sách được giao.")
+
+    # Tạo "lời nhắc" (thực chất là bản ghi giao nhiệm vụ) cho mỗi trường trong cùng giao dịch
+    bulk_assign_file_task(db, db_task.id, ids_to_assign)
+    refresh_compliance_counters(db, "file", [db_task.id])
+    log_change(db, "file_task", db_task.id)
+    db.commit()
+    cache.invalidate_all()
+    db.refresh(db_task)
+    return db_task
 
-    if ids_to_assign:
-        for sid in ids_to_assign:
-            # Tạo một "lời nhắc" (thực chất là bản ghi giao nhiệm vụ) cho mỗi trường
-            db.add(models.TaskReminder(task_type="file", task_id=db_task.id, school_id=sid))
-        db.commit()
+def _compliance_score(ontime: int, late: int, missing: int, assigned: int) -> int:
+    """Trả về điểm: -1/0/1/2 (không giao/thiếu/trễ/đúng hạn)."""
+    if assigned == 0:
+        return -1
+    if missing > 0:
+        return 0
+    if late > 0:
+        return 1
+    if ontime > 0:
+        return 2
+    return 0
+
+def _summarize_compliance(per_school, kind: str) -> Dict[str, Any]:
+    """Chia các trường thành 3 nhóm ontime/late/missing theo 'kind' từ bộ đếm và điểm của từng trường."""
+    ontime, late, missing = [], [], []
 
-    return db_task
+    def _push(target_list, ps, assigned_total, ontime_total, late_total, missing_total):
+        target_list.append({
+            "id": ps["id"],
+            "name": ps["name"],
+            "assigned_count": assigned_total,
+            "ontime_count": ontime_total,
+            "late_count": late_total,
+            "missing_count": missing_total,
+        })
+
+    for ps in per_school:
+        if kind == "file":
+            if ps["file_assigned"] == 0:
+                continue
+            score = ps["file_status"]
+            if score == 2:
+                _push(ontime, ps, ps["file_assigned"], ps["file_ontime"], ps["file_late"], ps["file_missing"])
+            elif score == 1:
+                _push(late, ps, ps["file_assigned"], ps["file_ontime"], ps["file_late"], ps["file_missing"])
+            elif score == 0:
+                _push(missing, ps, ps["file_assigned"], ps["file_ontime"], ps["file_late"], ps["file_missing"])
+
+        elif kind == "data":
+            if ps["data_assigned"] == 0:
+                continue
+            score = ps["data_status"]
+            if score == 2:
+                _push(ontime, ps, ps["data_assigned"], ps["data_ontime"], ps["data_late"], ps["data_missing"])
+            elif score == 1:
+                _push(late, ps, ps["data_assigned"], ps["data_ontime"], ps["data_late"], ps["data_missing"])
+            elif score == 0:
+                _push(missing, ps, ps["data_assigned"], ps["data_ontime"], ps["data_late"], ps["data_missing"])
+
+        else:  # kind == "both"
+            # Gộp theo trạng thái "tốt nhất" giữa file và data
+            score = max(ps["file_status"], ps["data_status"])
+            assigned_total = ps["file_assigned"] + ps["data_assigned"]
+            ontime_total = ps["file_ontime"] + ps["data_ontime"]
+            late_total = ps["file_late"] + ps["data_late"]
+            missing_total = ps["file_missing"] + ps["data_missing"]
+
+            if assigned_total == 0:
+                continue
+
+            if score == 2:
+                _push(ontime, ps, assigned_total, ontime_total, late_total, missing_total)
+            elif score == 1:
+                _push(late, ps, assigned_total, ontime_total, late_total, missing_total)
+            else:  # 0 hoặc -1 (không nên có -1 nếu assigned_total > 0)
+                _push(missing, ps, assigned_total, ontime_total, late_total, missing_total)
+
+    # Sắp xếp theo tên
+    ontime.sort(key=lambda x: x["name"])
+    late.sort(key=lambda x: x["name"])
+    missing.sort(key=lambda x: x["name"])
+
+    return {"ontime": ontime, "late": late, "missing": missing}
+
+
+# ====== BỘ ĐẾM TUÂN THỦ (school_compliance_counters) ======
+
+def _compliance_status(submitted_at, deadline):
+    """Biểu thức SQL: 0 = chưa nộp, 1 = nộp trễ, 2 = đúng hạn (thời gian trong CSDL đều là UTC)."""
+    return case((submitted_at.is_(None), 0), (submitted_at <= deadline, 2), else_=1)
+
+def _compliance_pairs_select(kind: str, item_ids: Optional[List[int]], school_id: Optional[int]):
+    """
+    SELECT (school_id, kind, item_id, school_year_id, deadline, status) cho mọi cặp được giao:
+    - file: trường có TaskReminder, hoặc tất cả các trường nếu yêu cầu không có reminder nào.
+    - data: mỗi dòng DataEntry.
+    item_ids / school_id = None nghĩa là không giới hạn.
+    """
+    if kind == "data":
+        stmt = (
+            select(models.DataEntry.school_id, literal("data"), models.DataReport.id,
+                   models.DataReport.school_year_id, models.DataReport.deadline,
+                   _compliance_status(models.DataEntry.submitted_at, models.DataReport.deadline))
+            .join(models.DataReport, models.DataReport.id == models.DataEntry.report_id)
+            .join(models.School, models.School.id == models.DataEntry.school_id)
+        )
+        if item_ids is not None:
+            stmt = stmt.where(models.DataReport.id.in_(item_ids))
+        if school_id is not None:
+            stmt = stmt.where(models.DataEntry.school_id == school_id)
+        return stmt
+
+    filters = []
+    if item_ids is not None:
+        filters.append(models.FileTask.id.in_(item_ids))
+    if school_id is not None:
+        filters.append(models.School.id == school_id)
+    columns = (models.School.id, literal("file"), models.FileTask.id, models.FileTask.school_year_id,
+               models.FileTask.deadline, _compliance_status(models.FileSubmission.submitted_at, models.FileTask.deadline))
+    submission_join = and_(models.FileSubmission.task_id == models.FileTask.id,
+                           models.FileSubmission.school_id == models.School.id)
+    has_reminder = exists().where(
+        models.TaskReminder.task_type == "file",
+        models.TaskReminder.task_id == models.FileTask.id
+    )
+    return union_all(
+        select(*columns)
+        .select_from(models.TaskReminder)
+        .join(models.FileTask, and_(models.FileTask.id == models.TaskReminder.task_id,
+                                    models.TaskReminder.task_type == "file"))
+        .join(models.School, models.School.id == models.TaskReminder.school_id)
+        .outerjoin(models.FileSubmission, submission_join)
+        .where(*filters),
+        select(*columns)
+        .select_from(models.FileTask)
+        .join(models.School, true())
+        .outerjoin(models.FileSubmission, submission_join)
+        .where(*filters, ~has_reminder),
+    )
+
+def refresh_compliance_counters(db: Session, kind: Literal["file", "data"],
+                                item_ids: Optional[List[int]] = None, school_id: Optional[int] = None) -> int:
+    """
+    Tính lại bộ đếm tuân thủ cho các công việc `item_ids` (None = tất cả), giới hạn ở `school_id` nếu có.
+    Xóa rồi INSERT ... SELECT từ các bảng gốc, không commit: các hàm ghi gọi hàm này trước khi commit
+    để bộ đếm thay đổi cùng giao dịch với dữ liệu.
+    """
+    if item_ids is not None:
+        item_ids = list(dict.fromkeys(item_ids))
+        if not item_ids:
+            return 0
+    db.flush()
+    counter = models.SchoolComplianceCounter
+    stmt = delete(counter).where(counter.kind == kind)
+    if item_ids is not None:
+        stmt = stmt.where(counter.item_id.in_(item_ids))
+    if school_id is not None:
+        stmt = stmt.where(counter.school_id == school_id)
+    db.execute(stmt)
+
+    result = db.execute(insert(counter).from_select(
+        ["school_id", "kind", "item_id", "school_year_id", "deadline", "status"],
+        _compliance_pairs_select(kind, item_ids, school_id)
+    ))
+    return max(result.rowcount or 0, 0)
+
+def delete_compliance_counters(db: Session, kind: Optional[str] = None,
+                               item_id: Optional[int] = None, school_id: Optional[int] = None) -> None:
+    """Xóa bộ đếm của một công việc hoặc một trường (khi xóa công việc / trường). Không commit."""
+    counter = models.SchoolComplianceCounter
+    stmt = delete(counter)
+    if kind is not None:
+        stmt = stmt.where(counter.kind == kind)
+    if item_id is not None:
+        stmt = stmt.where(counter.item_id == item_id)
+    if school_id is not None:
+        stmt = stmt.where(counter.school_id == school_id)
+    db.execute(stmt)
+
+def rebuild_compliance_counters(db: Session) -> int:
+    """Tính lại toàn bộ bảng school_compliance_counters từ các bảng gốc. Trả về số cặp đã ghi."""
+    total = refresh_compliance_counters(db, "file") + refresh_compliance_counters(db, "data")
+    db.commit()
+    cache.invalidate_all()
+    return total
 
 def compute_compliance_summary(
     db: Session,
@@ -608,6 +1541,80 @@ def compute_compliance_summary(
     kind: Literal["file", "data", "both"] = "both"
 ) -> Dict[str, Any]:
     """
+    Tổng hợp tình trạng nộp theo khoảng thời gian [start, end] từ bảng school_compliance_counters:
+    một truy vấn GROUP BY (trường, loại) lọc theo hạn nộp, thay vì tính lại từ các bảng gốc.
+    Cho kết quả giống compute_compliance_summary_reference khi bộ đếm đồng bộ với dữ liệu.
+    Kết quả được lưu trong cache.compliance_summary theo tham số truy vấn.
+    """
+    from datetime import timezone
+
+    start_utc = start.astimezone(timezone.utc)
+    end_utc = end.astimezone(timezone.utc)
+    return cache.compliance_summary.get_or_load(
+        (start_utc, end_utc, school_year_id or None, kind),
+        lambda: _compute_compliance_summary(db, start_utc, end_utc, school_year_id, kind)
+    )
+
+def _compute_compliance_summary(db: Session, start_utc: datetime, end_utc: datetime,
+                                school_year_id: int | None, kind: str) -> Dict[str, Any]:
+    counter = models.SchoolComplianceCounter
+
+    stmt = (
+        select(counter.school_id, counter.kind, func.count(),
+               func.sum(case((counter.status == 2, 1), else_=0)),
+               func.sum(case((counter.status == 1, 1), else_=0)),
+               func.sum(case((counter.status == 0, 1), else_=0)))
+        .where(counter.deadline >= start_utc, counter.deadline <= end_utc)
+        .group_by(counter.school_id, counter.kind)
+    )
+    if kind != "both":
+        stmt = stmt.where(counter.kind == kind)
+    if school_year_id:
+        stmt = stmt.where(counter.school_year_id == school_year_id)
+
+    counts: Dict[int, Dict[str, int]] = {}
+    for school_id, item_kind, assigned, ontime_count, late_count, missing_count in db.execute(stmt):
+        counters = counts.setdefault(school_id, {
+            "file_assigned": 0, "file_ontime": 0, "file_late": 0, "file_missing": 0,
+            "data_assigned": 0, "data_ontime": 0, "data_late": 0, "data_missing": 0,
+        })
+        counters[f"{item_kind}_assigned"] = int(assigned or 0)
+        counters[f"{item_kind}_ontime"] = int(ontime_count or 0)
+        counters[f"{item_kind}_late"] = int(late_count or 0)
+        counters[f"{item_kind}_missing"] = int(missing_count or 0)
+
+    if not counts:
+        return {"ontime": [], "late": [], "missing": []}
+
+    names = dict(db.execute(select(models.School.id, models.School.name).where(models.School.id.in_(counts.keys()))).all())
+    per_school = []
+    for school_id, counters in counts.items():
+        # Bộ đếm của trường đã bị xóa (giống bản tham chiếu: bỏ qua sid không có trong per_school)
+        if school_id not in names:
+            continue
+        per_school.append({
+            "id": school_id,
+            "name": names[school_id],
+            "file_status": _compliance_score(counters["file_ontime"], counters["file_late"],
+                                             counters["file_missing"], counters["file_assigned"]),
+            "data_status": _compliance_score(counters["data_ontime"], counters["data_late"],
+                                             counters["data_missing"], counters["data_assigned"]),
+            **counters,
+        })
+    return _summarize_compliance(per_school, kind)
+
+
+def compute_compliance_summary_reference(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    school_year_id: int | None,
+    kind: Literal["file", "data", "both"] = "both"
+) -> Dict[str, Any]:
+    """
+    BẢN THAM CHIẾU (tính bằng vòng lặp Python trên đối tượng ORM), giữ lại để đối chiếu kết quả
+    với compute_compliance_summary. Không dùng trong các endpoint vì phải nạp toàn bộ dữ liệu.
+
     Tổng hợp tình trạng nộp theo khoảng thời gian [start, end].
     - Chuẩn hóa thời gian sang UTC để so sánh ổn định trên Render/localhost.
     - Tính trạng thái RIÊNG cho 'file' và 'data':
@@ -638,18 +1645,6 @@ def compute_compliance_summary(
         for s in schools
     }
 
-    def _score_from_counts(ontime, late, missing, assigned):
-        """Trả về điểm: -1/0/1/2 (không giao/thiếu/trễ/đúng hạn)."""
-        if assigned == 0:
-            return -1
-        if missing > 0:
-            return 0
-        if late > 0:
-            return 1
-        if ontime > 0:
-            return 2
-        return 0
-
     # ====== FILE TASKS ======
     if kind in ("file", "both"):
         q = db.query(models.FileTask).filter(
@@ -709,7 +1704,7 @@ def compute_compliance_summary(
 
         # Gán điểm trạng thái file cho từng trường
         for ps in per_school.values():
-            ps["file_status"] = _score_from_counts(
+            ps["file_status"] = _compliance_score(
                 ps["file_ontime"], ps["file_late"], ps["file_missing"], ps["file_assigned"]
             )
 
@@ -757,70 +1752,11 @@ def compute_compliance_summary(
 
         # Gán điểm trạng thái data cho từng trường
         for ps in per_school.values():
-            ps["data_status"] = _score_from_counts(
+            ps["data_status"] = _compliance_score(
                 ps["data_ontime"], ps["data_late"], ps["data_missing"], ps["data_assigned"]
             )
 
-    # ====== HỢP NHẤT KẾT QUẢ THEO 'kind' ======
-    ontime, late, missing = [], [], []
-
-    def _push(target_list, ps, assigned_total, ontime_total, late_total, missing_total):
-        target_list.append({
-            "id": ps["id"],
-            "name": ps["name"],
-            "assigned_count": assigned_total,
-            "ontime_count": ontime_total,
-            "late_count": late_total,
-            "missing_count": missing_total,
-        })
-
-    for ps in per_school.values():
-        if kind == "file":
-            if ps["file_assigned"] == 0:
-                continue
-            score = ps["file_status"]
-            if score == 2:
-                _push(ontime, ps, ps["file_assigned"], ps["file_ontime"], ps["file_late"], ps["file_missing"])
-            elif score == 1:
-                _push(late, ps, ps["file_assigned"], ps["file_ontime"], ps["file_late"], ps["file_missing"])
-            elif score == 0:
-                _push(missing, ps, ps["file_assigned"], ps["file_ontime"], ps["file_late"], ps["file_missing"])
-
-        elif kind == "data":
-            if ps["data_assigned"] == 0:
-                continue
-            score = ps["data_status"]
-            if score == 2:
-                _push(ontime, ps, ps["data_assigned"], ps["data_ontime"], ps["data_late"], ps["data_missing"])
-            elif score == 1:
-                _push(late, ps, ps["data_assigned"], ps["data_ontime"], ps["data_late"], ps["data_missing"])
-            elif score == 0:
-                _push(missing, ps, ps["data_assigned"], ps["data_ontime"], ps["data_late"], ps["data_missing"])
-
-        else:  # kind == "both"
-            # Gộp theo trạng thái "tốt nhất" giữa file và data
-            score = max(ps["file_status"], ps["data_status"])
-            assigned_total = ps["file_assigned"] + ps["data_assigned"]
-            ontime_total = ps["file_ontime"] + ps["data_ontime"]
-            late_total = ps["file_late"] + ps["data_late"]
-            missing_total = ps["file_missing"] + ps["data_missing"]
-
-            if assigned_total == 0:
-                continue
-
-            if score == 2:
-                _push(ontime, ps, assigned_total, ontime_total, late_total, missing_total)
-            elif score == 1:
-                _push(late, ps, assigned_total, ontime_total, late_total, missing_total)
-            else:  # 0 hoặc -1 (không nên có -1 nếu assigned_total > 0)
-                _push(missing, ps, assigned_total, ontime_total, late_total, missing_total)
-
-    # Sắp xếp theo tên
-    ontime.sort(key=lambda x: x["name"])
-    late.sort(key=lambda x: x["name"])
-    missing.sort(key=lambda x: x["name"])
-
-    return {"ontime": ontime, "late": late, "missing": missing}
+    return _summarize_compliance(per_school.values(), kind)
 
 
 def get_data_entry_for_school(db: Session, report_id: int, school_id: int) -> Optional[models.DataEntry]:
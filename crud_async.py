@@ -0,0 +1,86 @@
+# crud_async.py
+"""
+Phiên bản bất đồng bộ của các hàm crud chỉ đọc, dùng cho các endpoint được client poll liên tục.
+
+Mỗi hàm chạy đúng logic truy vấn của crud.py thông qua AsyncSession.run_sync: phần code ORM
+chạy trên greenlet, còn mọi IO xuống CSDL đi qua driver async (aiosqlite / asyncpg) và nhả
+event loop trong lúc chờ. Nhờ vậy không chiếm luồng của threadpool và không phải duy trì
+hai bản truy vấn song song.
+"""
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud, schemas
+
+
+async def get_school_by_api_key(db: AsyncSession, api_key: str) -> Optional[crud.SchoolIdentity]:
+    return await db.run_sync(crud.get_school_by_api_key, api_key)
+
+
+async def get_file_task_list_rows(
+    db: AsyncSession,
+    school_year_id: Optional[int] = None,
+    current_school_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[tuple] = None
+) -> List[Dict[str, Any]]:
+    return await db.run_sync(
+        lambda session: crud.get_file_task_list_rows(
+            session, school_year_id=school_year_id, current_school_id=current_school_id, skip=skip, limit=limit,
+            after=after
+        )
+    )
+
+
+async def get_file_task_status(db: AsyncSession, task_id: int):
+    return await db.run_sync(crud.get_file_task_status, task_id)
+
+
+async def get_status_for_tasks(db: AsyncSession, task_type: str, ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    return await db.run_sync(crud.get_status_for_tasks, task_type, ids)
+
+
+async def get_data_report_list_rows(
+    db: AsyncSession,
+    school_year_id: Optional[int] = None,
+    current_school_id: Optional[int] = None,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[tuple] = None
+) -> List[Dict[str, Any]]:
+    return await db.run_sync(
+        lambda session: crud.get_data_report_list_rows(
+            session, school_year_id=school_year_id, current_school_id=current_school_id, skip=skip, limit=limit,
+            after=after
+        )
+    )
+
+
+async def get_data_report_status(db: AsyncSession, report_id: int):
+    return await db.run_sync(crud.get_data_report_status, report_id)
+
+
+async def get_sync_payload(db: AsyncSession, since: Optional[int], current_school_id: Optional[int] = None) -> Dict[str, Any]:
+    return await db.run_sync(crud.get_sync_payload, since, current_school_id)
+
+
+async def get_file_task_list_version(db: AsyncSession, current_school_id: Optional[int] = None) -> str:
+    return await db.run_sync(crud.get_file_task_list_version, current_school_id)
+
+
+async def get_data_report_list_version(db: AsyncSession, current_school_id: Optional[int] = None) -> str:
+    return await db.run_sync(crud.get_data_report_list_version, current_school_id)
+
+
+async def get_file_task_status_version(db: AsyncSession, task_id: int) -> str:
+    return await db.run_sync(crud.get_file_task_status_version, task_id)
+
+
+async def get_data_report_status_version(db: AsyncSession, report_id: int) -> str:
+    return await db.run_sync(crud.get_data_report_status_version, report_id)
+
+
+async def get_dashboard_stats(db: AsyncSession) -> schemas.DashboardStats:
+    return await db.run_sync(crud.get_dashboard_stats)
@@ -1,6 +1,8 @@
 # database.py
 import os
-from sqlalchemy import create_engine, text
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
@@ -12,40 +14,114 @@ load_dotenv()
 # Nếu không có, sẽ dùng CSDL SQLite mặc định cho môi trường phát triển
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./app.db")
 
-# Nếu dùng PostgreSQL trên Render, chuỗi kết nối sẽ bắt đầu bằng "postgresql://"
-# SQLAlchemy sẽ tự động xử lý pool kết nối
-engine_args = {"connect_args": {}}
-if DATABASE_URL.startswith("sqlite"):
-    engine_args["connect_args"] = {"check_same_thread": False}
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
 
-engine = create_engine(DATABASE_URL, **engine_args)
+# --- Cấu hình pool kết nối theo từng loại CSDL (ghi đè bằng biến môi trường) ---
+POOL_DEFAULTS = {
+    # SQLite (WAL): kết nối chỉ là một file handle, người đọc chạy song song còn người ghi luôn xếp hàng
+    # trên khóa ghi (busy_timeout) dù pool lớn hay nhỏ. Pool đủ cho 40 luồng của thread pool FastAPI
+    # để các request đọc không phải chờ pool_timeout.
+    "sqlite": {"pool_size": 10, "max_overflow": 30},
+    # PostgreSQL trên Render: gói nhỏ giới hạn ~100 kết nối cho cả dịch vụ. Mỗi worker có hai engine
+    # (đồng bộ + async), tối đa 2 * (5 + 5) = 20 kết nối, nên 4 worker vẫn còn chỗ cho psql / migrate.
+    "postgresql": {"pool_size": 5, "max_overflow": 5},
+}
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# --- Profile PRAGMA cho SQLite production (đặt SQLITE_TUNING=0 để tắt) ---
+SQLITE_TUNING = os.getenv("SQLITE_TUNING", "1").lower() in ("1", "true", "yes")
+SQLITE_BUSY_TIMEOUT_MS = _env_int("SQLITE_BUSY_TIMEOUT_MS", 5000)
+SQLITE_PRAGMAS = {
+    # WAL: người đọc không bị chặn bởi người ghi; lưu bền trong file CSDL
+    "journal_mode": "WAL",
+    # Chờ khóa ghi thay vì lỗi "database is locked" ngay lập tức
+    "busy_timeout": SQLITE_BUSY_TIMEOUT_MS,
+    # NORMAL an toàn với WAL (chỉ có thể mất giao dịch cuối khi mất điện)
+    "synchronous": "NORMAL",
+    # Giá trị âm = KiB, mặc định 64 MiB page cache mỗi kết nối
+    "cache_size": -_env_int("SQLITE_CACHE_SIZE_KB", 64000),
+    # Đọc qua mmap, mặc định 256 MiB
+    "mmap_size": _env_int("SQLITE_MMAP_SIZE", 268435456),
+    "temp_store": "MEMORY",
+}
 
-Base = declarative_base()
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
 
-def ensure_sqlite_column(engine, table_name: str, column_name: str, column_type_sql: str = "TEXT") -> None:
+def _engine_args(url: str) -> dict:
     """
-    Nếu đang dùng SQLite và bảng `table_name` chưa có cột `column_name`,
-    thì tự động ALTER TABLE để thêm cột đó.
+    Tham số chung cho engine đồng bộ và bất đồng bộ:
+    - SQLite: check_same_thread=False, timeout theo busy_timeout.
+    - Pool (pool_size / max_overflow / pool_timeout / pool_recycle) đọc từ DB_POOL_* theo từng backend.
+    - PostgreSQL: bật pool_pre_ping để bỏ các kết nối đã bị Render đóng.
+    """
+    backend = "sqlite" if url.startswith("sqlite") else "postgresql"
+    engine_args = {"connect_args": {}}
+    is_memory = backend == "sqlite" and (":memory:" in url or url.split("?")[0].rstrip("/").endswith(":"))
+
+    if backend == "sqlite":
+        engine_args["connect_args"] = {
+            "check_same_thread": False,
+            "timeout": SQLITE_BUSY_TIMEOUT_MS / 1000,
+        }
+    else:
+        engine_args["pool_pre_ping"] = True
+        engine_args["pool_recycle"] = _env_int("DB_POOL_RECYCLE", 1800)
+
+    # SQLite :memory: dùng SingletonThreadPool/StaticPool, không nhận các tham số pool
+    if not is_memory:
+        defaults = POOL_DEFAULTS[backend]
+        engine_args["pool_size"] = _env_int("DB_POOL_SIZE", defaults["pool_size"])
+        engine_args["max_overflow"] = _env_int("DB_MAX_OVERFLOW", defaults["max_overflow"])
+        engine_args["pool_timeout"] = _env_int("DB_POOL_TIMEOUT", 30)
+    return engine_args
+
+def build_engine(url: str, tuned: bool = True):
+    """Tạo engine đồng bộ cho `url`; với SQLite, nếu tuned thì áp dụng SQLITE_PRAGMAS mỗi khi mở kết nối."""
+    new_engine = create_engine(url, **_engine_args(url))
+    if url.startswith("sqlite") and tuned:
+        event.listen(new_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
 
-    - column_type_sql: để "TEXT" cho các trường JSON khi lưu trên SQLite.
-    - Không set DEFAULT/NOT NULL để tránh hạn chế ALTER TABLE của SQLite.
+def to_async_url(url: str) -> URL:
     """
-    # Chỉ xử lý với SQLite
-    if not str(engine.url).startswith("sqlite"):
-        return
+    Đổi URL đồng bộ sang driver async: sqlite -> sqlite+aiosqlite, postgresql -> postgresql+asyncpg.
+    asyncpg không hiểu tham số `sslmode` (Render thêm vào URL) nên chuyển thành `ssl`.
+    """
+    sa_url = make_url(url)
+    if sa_url.get_backend_name() == "sqlite":
+        return sa_url.set(drivername="sqlite+aiosqlite")
+    sa_url = sa_url.set(drivername="postgresql+asyncpg")
+    sslmode = sa_url.query.get("sslmode")
+    if sslmode:
+        sa_url = sa_url.difference_update_query(["sslmode"])
+        if sslmode != "disable":
+            sa_url = sa_url.update_query_dict({"ssl": sslmode})
+    return sa_url
 
-    try:
-        from sqlalchemy import text  # import cục bộ để hàm tự chứa
-        with engine.connect() as conn:
-            # Liệt kê các cột đang có
-            cols = conn.execute(text(f"PRAGMA table_info({table_name})")).fetchall()
-            existing = {row[1] for row in cols}  # row[1] là tên cột
-            if column_name not in existing:
-                conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type_sql}"))
-                print(f"[DB MIGRATION] + Added column {table_name}.{column_name} ({column_type_sql})")
-            else:
-                print(f"[DB MIGRATION] = Column {table_name}.{column_name} already exists")
-    except Exception as e:
-        print(f"[DB MIGRATION] ! Failed to ensure column {table_name}.{column_name}: {e}")
+def build_async_engine(url: str, tuned: bool = True):
+    """Tạo AsyncEngine (aiosqlite / asyncpg) với cùng cấu hình pool và PRAGMA như engine đồng bộ."""
+    async_url = to_async_url(url)
+    new_engine = create_async_engine(async_url, **_engine_args(url))
+    if url.startswith("sqlite") and tuned:
+        event.listen(new_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+    return new_engine
+
+engine = build_engine(DATABASE_URL, tuned=SQLITE_TUNING)
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Engine/session bất đồng bộ dùng cho các endpoint đọc nhiều (client poll liên tục).
+# expire_on_commit=False để đối tượng ORM vẫn đọc được sau khi session đóng mà không phát sinh IO.
+async_engine = build_async_engine(DATABASE_URL, tuned=SQLITE_TUNING)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+Base = declarative_base()
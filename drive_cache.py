@@ -0,0 +1,170 @@
+# drive_cache.py
+"""
+Cache trên đĩa cho nội dung file tải từ Google Drive (bài nộp khi "Tải tất cả").
+
+- Mỗi file lưu thành <file_id>.bin kèm <file_id>.json (tên, modifiedTime, md5Checksum, kích thước).
+- Trước khi dùng bản cache, crud.download_file_from_drive gọi files.get(fields='name,modifiedTime,md5Checksum')
+  (vốn đã cần để lấy tên file): chỉ dùng bản cache khi modifiedTime và md5 còn khớp, nếu không thì tải lại.
+- Tổng dung lượng giới hạn bởi DRIVE_CACHE_MAX_BYTES, vượt quá thì xóa file ít dùng nhất (LRU theo mtime).
+- Số lần hit/miss xem qua GET /admin/cache-stats (mục "drive_files").
+
+Đặt DRIVE_CACHE_MAX_BYTES=0 để tắt. Nhiều worker dùng chung thư mục được: file mất do worker khác
+xóa chỉ bị coi là miss.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+DRIVE_CACHE_DIR = os.getenv("DRIVE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "autoreport_drive_cache"))
+DRIVE_CACHE_MAX_BYTES = _env_int("DRIVE_CACHE_MAX_BYTES", 2 * 1024 * 1024 * 1024)
+
+# ID file Drive chỉ gồm các ký tự này; chặn mọi id khác để không ghi ra ngoài thư mục cache
+_FILE_ID_RE = re.compile(r"[A-Za-z0-9_-]{1,200}")
+
+
+class DriveFileCache:
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index: "Optional[OrderedDict[str, int]]" = None  # file_id -> kích thước, cũ nhất trước
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def _paths(self, file_id: str):
+        base = os.path.join(self.directory, file_id)
+        return base + ".bin", base + ".json"
+
+    def _load_index(self) -> None:
+        """Đọc danh sách file đã cache (gọi trong khóa, một lần cho mỗi tiến trình)."""
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+        for name in os.listdir(self.directory):
+            file_id, ext = os.path.splitext(name)
+            if ext != ".bin":
+                continue
+            try:
+                stat = os.stat(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, file_id, stat.st_size))
+        self._index = OrderedDict((file_id, size) for _, file_id, size in sorted(entries))
+        self._total = sum(self._index.values())
+
+    def _remove(self, file_id: str) -> None:
+        size = self._index.pop(file_id, None)
+        if size is not None:
+            self._total -= size
+        for path in self._paths(file_id):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def get(self, file_id: str, metadata: Dict[str, Any]) -> Optional[bytes]:
+        """Nội dung đã cache nếu còn khớp modifiedTime/md5Checksum trong `metadata`, ngược lại None."""
+        if not self.enabled or not _FILE_ID_RE.fullmatch(file_id):
+            return None
+        data_path, meta_path = self._paths(file_id)
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+            if file_id not in self._index:
+                self.misses += 1
+                return None
+            try:
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    cached = json.load(f)
+            except (OSError, ValueError):
+                cached = None
+            if (cached is None or cached.get("modifiedTime") != metadata.get("modifiedTime")
+                    or cached.get("md5Checksum") != metadata.get("md5Checksum")):
+                self._remove(file_id)
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._index.move_to_end(file_id)
+        try:
+            with open(data_path, "rb") as f:
+                content = f.read()
+            os.utime(data_path)  # LRU theo mtime khi nạp lại index
+        except FileNotFoundError:
+            with self._lock:
+                self._index.pop(file_id, None)
+                self.misses += 1
+            return None
+        with self._lock:
+            self.hits += 1
+        return content
+
+    def put(self, file_id: str, metadata: Dict[str, Any], content: bytes) -> None:
+        if not self.enabled or not _FILE_ID_RE.fullmatch(file_id) or len(content) > self.max_bytes:
+            return
+        # Không cache bản tải bị hỏng / không khớp với Drive
+        md5 = metadata.get("md5Checksum")
+        if md5 and hashlib.md5(content).hexdigest() != md5:
+            return
+        data_path, meta_path = self._paths(file_id)
+        with self._lock:
+            if self._index is None:
+                self._load_index()
+        try:
+            # Ghi ra file tạm rồi os.replace để không bao giờ đọc phải file ghi dở
+            for path, payload in ((data_path, content), (meta_path, json.dumps({
+                "name": metadata.get("name"), "modifiedTime": metadata.get("modifiedTime"),
+                "md5Checksum": md5, "size": len(content),
+            }).encode("utf-8"))):
+                fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+                with os.fdopen(fd, "wb") as f:
+                    f.write(payload)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Không ghi được cache file Drive {file_id}: {e}")
+            return
+        with self._lock:
+            previous = self._index.pop(file_id, None)
+            if previous is not None:
+                self._total -= previous
+            self._index[file_id] = len(content)
+            self._total += len(content)
+            while self._total > self.max_bytes and self._index:
+                self._remove(next(iter(self._index)))
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "files": len(self._index) if self._index is not None else None,
+                "bytes": self._total,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "stale": self.stale,
+                "evictions": self.evictions,
+            }
+
+
+drive_files = DriveFileCache(DRIVE_CACHE_DIR, DRIVE_CACHE_MAX_BYTES)
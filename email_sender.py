@@ -1,41 +1,54 @@
 # email_sender.py
 import os.path
 import base64
+import threading
 from email.mime.text import MIMEText
 
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+import google_services
+
 # Phạm vi (scope) chỉ yêu cầu quyền gửi mail
 SCOPES = ['https://www.googleapis.com/auth/gmail.send']
 TOKEN_FILE = 'gmail_token.json' # Dùng file token riêng cho Gmail
 CREDENTIALS_FILE = 'credentials_oauth.json'
 
+# Credentials được giữ trong bộ nhớ giữa các lần gửi; chỉ đọc lại file token khi chưa có hoặc hết hạn
+_creds = None
+_creds_lock = threading.Lock()
+
+def _get_gmail_credentials():
+    global _creds
+    with _creds_lock:
+        creds = _creds
+        if creds and creds.valid:
+            return creds
+        # Kiểm tra xem file token đã tồn tại chưa
+        if not creds and os.path.exists(TOKEN_FILE):
+            creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
+
+        # Nếu chưa có credentials hợp lệ, yêu cầu người dùng đăng nhập
+        if not creds or not creds.valid:
+            if creds and creds.expired and creds.refresh_token:
+                creds.refresh(Request())
+            else:
+                if not os.path.exists(CREDENTIALS_FILE):
+                    raise FileNotFoundError(f"Không tìm thấy file '{CREDENTIALS_FILE}'. Vui lòng làm theo hướng dẫn ở Bước 1.")
+                flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
+                creds = flow.run_local_server(port=0)
+
+            # Lưu credentials cho những lần chạy sau
+            with open(TOKEN_FILE, 'w') as token:
+                token.write(creds.to_json())
+        _creds = creds
+        return creds
+
 def _get_gmail_service():
-    """Xác thực người dùng và trả về đối tượng service của Gmail."""
-    creds = None
-    # Kiểm tra xem file token đã tồn tại chưa
-    if os.path.exists(TOKEN_FILE):
-        creds = Credentials.from_authorized_user_file(TOKEN_FILE, SCOPES)
-    
-    # Nếu chưa có credentials hợp lệ, yêu cầu người dùng đăng nhập
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
-            if not os.path.exists(CREDENTIALS_FILE):
-                raise FileNotFoundError(f"Không tìm thấy file '{CREDENTIALS_FILE}'. Vui lòng làm theo hướng dẫn ở Bước 1.")
-            flow = InstalledAppFlow.from_client_secrets_file(CREDENTIALS_FILE, SCOPES)
-            creds = flow.run_local_server(port=0)
-        
-        # Lưu credentials cho những lần chạy sau
-        with open(TOKEN_FILE, 'w') as token:
-            token.write(creds.to_json())
-            
-    return build('gmail', 'v1', credentials=creds)
+    """Xác thực người dùng và trả về đối tượng service của Gmail (dùng lại theo từng luồng)."""
+    return google_services.get_service('gmail', 'v1', _get_gmail_credentials())
 
 def send_report_email(recipient_email: str, subject: str, body: str):
     """Tạo và gửi email sử dụng tài khoản cá nhân đã xác thực."""
@@ -0,0 +1,78 @@
+# google_services.py
+"""
+Dùng lại các đối tượng service của Google API (Drive, Gmail) giữa các request.
+
+Tạo service mới mỗi lần gọi tốn nhiều hơn vẻ ngoài của build():
+- đọc và phân tích lại file khóa dịch vụ (khóa RSA) rồi xin access token mới từ Google (một vòng mạng),
+- đọc lại discovery document (~200 KB JSON với Drive v3),
+- mở kết nối HTTPS mới (bắt tay TLS) thay vì dùng lại kết nối keep-alive.
+
+Ở đây credentials được nạp một lần cho mỗi tiến trình (token tự làm mới khi hết hạn), discovery document
+được đọc một lần, còn service + httplib2.Http được giữ riêng cho từng luồng vì httplib2 không an toàn
+khi dùng chung giữa các luồng (FastAPI chạy endpoint đồng bộ trên thread pool, "Tải tất cả" có pool riêng).
+"""
+import os
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import google_auth_httplib2
+from google.oauth2 import service_account
+from googleapiclient.discovery import build, build_from_document
+from googleapiclient.discovery_cache import get_static_doc
+from googleapiclient.http import build_http
+
+_lock = threading.Lock()
+_local = threading.local()
+_discovery_docs: Dict[Tuple[str, str], Optional[str]] = {}
+_service_account_creds: Dict[Tuple[str, Tuple[str, ...]], Tuple[float, Any]] = {}
+_stats = {"builds": 0, "reuses": 0, "credential_loads": 0}
+
+
+def _discovery_doc(service_name: str, version: str) -> Optional[str]:
+    # Giữ bản chuỗi chứ không giữ dict: build_from_document sửa trực tiếp dict khi tạo các phương thức
+    key = (service_name, version)
+    if key not in _discovery_docs:
+        _discovery_docs[key] = get_static_doc(service_name, version)
+    return _discovery_docs[key]
+
+
+def service_account_credentials(path: str, scopes: Sequence[str]):
+    """Credentials của service account, nạp lại khi file khóa thay đổi."""
+    key = (os.path.abspath(path), tuple(scopes))
+    mtime = os.path.getmtime(path)
+    with _lock:
+        cached = _service_account_creds.get(key)
+        if cached is None or cached[0] != mtime:
+            creds = service_account.Credentials.from_service_account_file(path, scopes=list(scopes))
+            _service_account_creds[key] = cached = (mtime, creds)
+            _stats["credential_loads"] += 1
+        return cached[1]
+
+
+def get_service(service_name: str, version: str, credentials):
+    """
+    Service của luồng hiện tại cho (service_name, version); tạo mới khi luồng chưa có
+    hoặc khi credentials đã được thay bằng đối tượng khác.
+    """
+    services = getattr(_local, "services", None)
+    if services is None:
+        services = _local.services = {}
+    cached = services.get((service_name, version))
+    if cached is not None and cached[0] is credentials:
+        _stats["reuses"] += 1
+        return cached[1]
+
+    http = google_auth_httplib2.AuthorizedHttp(credentials, http=build_http())
+    doc = _discovery_doc(service_name, version)
+    if doc is not None:
+        service = build_from_document(doc, http=http)
+    else:
+        # API không có discovery document đóng gói sẵn: để build() tự tải
+        service = build(service_name, version, http=http, static_discovery=False)
+    services[(service_name, version)] = (credentials, service)
+    _stats["builds"] += 1
+    return service
+
+
+def get_stats() -> Dict[str, int]:
+    return dict(_stats)
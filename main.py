@@ -1,85 +1,210 @@
 # main.py
+import hashlib
+import inspect
 import io
 import os
 import openpyxl
-import zipfile
 from typing import List, Optional, Any, Dict
 from datetime import datetime
-from fastapi import FastAPI, Depends, HTTPException, status, Header, UploadFile, File, Query
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, Depends, HTTPException, status, Header, UploadFile, File, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.routing import serialize_response
+from starlette.middleware.gzip import DEFAULT_EXCLUDED_CONTENT_TYPES
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.executors.pool import ThreadPoolExecutor
 
-import models, schemas, crud
-from database import engine, SessionLocal
+import cache, drive_cache, google_services, models, schemas, crud, crud_async, migrations, report_export, submission_archive
+from database import engine, SessionLocal, async_engine, AsyncSessionLocal
 from scheduler import check_deadlines_and_send_email
 from io import BytesIO
 from openpyxl.utils import get_column_letter
 
-models.Base.metadata.create_all(bind=engine)
+# Chỉ kiểm tra phiên bản schema (1 truy vấn); migration chạy bằng `python manage.py migrate`
+migrations.check_schema_version(engine)
 
-def _init_sqlite_hotfix_columns():
-    """
-    HÀM MỚI: Hotfix cho SQLite để đảm bảo các cột mới thêm trong ORM
-    sẽ được tự động tạo trong file CSDL nếu chưa có.
-    """
-    from database import ensure_sqlite_column, engine as _engine
-    
-    # Bảng file_tasks
-    ensure_sqlite_column(_engine, "file_tasks", "is_locked", "BOOLEAN")
-    ensure_sqlite_column(_engine, "file_tasks", "attachment_url", "TEXT")
-
-    # Bảng data_reports
-    ensure_sqlite_column(_engine, "data_reports", "template_data", "TEXT")
-    ensure_sqlite_column(_engine, "data_reports", "is_locked", "BOOLEAN")
-    ensure_sqlite_column(_engine, "data_reports", "attachment_url", "TEXT")
-    ensure_sqlite_column(_engine, "data_reports", "description", "TEXT")
-
-    # Bảng data_entries
-    ensure_sqlite_column(_engine, "data_entries", "last_edited_by", "VARCHAR")
-    ensure_sqlite_column(_engine, "data_entries", "last_edited_at", "DATETIME")
-
-# GỌI NGAY khi import xong, trước khi app phục vụ request
-_init_sqlite_hotfix_columns()
 
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+# --- Mã hóa JSON ---
+# FastAPI mới ghi response có response_model thẳng ra bytes bằng Pydantic (serialize_response(dump_json=...)),
+# nhanh hơn nhiều so với jsonable_encoder + orjson; đặt default_response_class sẽ tắt đường này.
+# Chỉ dùng ORJSONResponse cho FastAPI cũ chưa có đường đó (xem benchmarks/bench_json_payloads.py).
+app_options = {}
+if "dump_json" not in inspect.signature(serialize_response).parameters:
+    try:
+        import orjson  # noqa: F401
+        from fastapi.responses import ORJSONResponse
+        app_options["default_response_class"] = ORJSONResponse
+    except ImportError:
+        pass
 
 app = FastAPI(
     title="Hệ thống Báo cáo Tự động",
-    description="API Backend cho hệ thống quản lý và theo dõi báo cáo."
+    description="API Backend cho hệ thống quản lý và theo dõi báo cáo.",
+    **app_options
+)
+
+# --- Nén gzip cho response lớn (danh sách báo cáo kèm template_data, trạng thái, dữ liệu đã nộp) ---
+# Mức 6: JSON nhỏ đi ~8 lần, tốn ít CPU hơn hẳn mức 9 mặc định. File xlsx/parquet/zip đã nén sẵn nên bỏ qua.
+GZIP_MIN_SIZE = _env_int("GZIP_MIN_SIZE", 1024)
+GZIP_COMPRESS_LEVEL = _env_int("GZIP_COMPRESS_LEVEL", 6)
+app.add_middleware(
+    GZipMiddleware, minimum_size=GZIP_MIN_SIZE, compresslevel=GZIP_COMPRESS_LEVEL,
+    exclude_content_types=DEFAULT_EXCLUDED_CONTENT_TYPES + (
+        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        "application/vnd.apache.parquet",
+    ),
 )
 
+# --- Dependency ---
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """Dependency session bất đồng bộ cho các endpoint chỉ đọc."""
+    async with AsyncSessionLocal() as db:
+        yield db
+
+# File đính kèm: giới hạn kích thước và kích thước mỗi khối upload resumable lên Drive
+ATTACHMENT_MAX_BYTES = _env_int("ATTACHMENT_MAX_BYTES", 100 * 1024 * 1024)
+ATTACHMENT_UPLOAD_CHUNK_SIZE = _env_int("ATTACHMENT_UPLOAD_CHUNK_SIZE", 8 * 1024 * 1024)
+
+# Phần dư cho header / boundary của multipart khi so Content-Length với ATTACHMENT_MAX_BYTES
+ATTACHMENT_MULTIPART_OVERHEAD = 64 * 1024
+
+def _attachment_too_large_detail() -> str:
+    return f"File vượt quá giới hạn {round(ATTACHMENT_MAX_BYTES / (1024 * 1024), 1):g} MB."
+
+class AttachmentSizeLimit:
+    """
+    Middleware ASGI thuần: từ chối sớm (413) POST /admin/upload-attachment theo Content-Length, trước khi
+    Starlette đọc body vào file tạm (tham số File(...) được phân tích trước khi endpoint và các dependency
+    chạy nên kiểm tra ở đó là quá muộn). Các request khác đi thẳng qua, response không bị bọc lại.
+    """
+    def __init__(self, app, path: str):
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and scope["path"] == self.path:
+            length = next((value for name, value in scope["headers"] if name == b"content-length"), b"0")
+            try:
+                too_large = int(length) > ATTACHMENT_MAX_BYTES + ATTACHMENT_MULTIPART_OVERHEAD
+            except ValueError:
+                too_large = False
+            if too_large:
+                response = JSONResponse(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                                        content={"detail": _attachment_too_large_detail()})
+                await response(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+app.add_middleware(AttachmentSizeLimit, path="/admin/upload-attachment")
+
+# In tiến độ upload lên Drive mỗi khi vượt thêm một mốc phần trăm này (không in từng khối)
+ATTACHMENT_PROGRESS_STEP = 25
+
+def _drive_upload_progress(file_name: str):
+    """Callback progress cho crud.upload_attachment_to_drive: in một dòng ở mỗi mốc 25%, 50%, 75%."""
+    last_step = 0
+
+    def report(sent: int, total: Optional[int]):
+        nonlocal last_step
+        if not total:
+            return
+        step = sent * 100 // total // ATTACHMENT_PROGRESS_STEP
+        if step > last_step:
+            last_step = step
+            print(f"Đính kèm '{file_name}': đã gửi lên Drive {sent * 100 // total}% ({sent}/{total} byte)")
+
+    return report
+
+def _attachment_size(upload) -> int:
+    if upload.size is not None:
+        return upload.size
+    upload.file.seek(0, os.SEEK_END)
+    return upload.file.tell()
+
 @app.post("/admin/upload-attachment", response_model=Dict[str, str])
-async def upload_attachment(file: UploadFile = File(...)):
+async def upload_attachment(file: UploadFile = File(...), db: Session = Depends(get_db)):
     """
     Nhận file từ admin_app, tải lên Google Drive và trả về URL.
+    Starlette đã ghi file vào file tạm (spooled); nội dung được đọc dần từ đó và gửi lên Drive theo từng khối
+    trên thread pool, không đọc cả file vào bộ nhớ và không chặn event loop; tiến độ gửi lên Drive được in
+    ở các mốc 25/50/75%. Giới hạn ATTACHMENT_MAX_BYTES được middleware kiểm tra theo Content-Length trước
+    khi nhận body; request không có Content-Length (chunked) chỉ bị chặn ở đây, sau khi đã nhận hết file.
     """
     if not file:
         raise HTTPException(status_code=400, detail="Không có file nào được tải lên.")
-    
+    if _attachment_size(file) > ATTACHMENT_MAX_BYTES:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=_attachment_too_large_detail())
+
     try:
-        file_content = await file.read()
-        file_url = crud.upload_attachment_to_drive(file.filename, file_content)
+        file_url = await run_in_threadpool(
+            crud.upload_attachment_to_drive, file.filename, file.file, db,
+            chunk_size=ATTACHMENT_UPLOAD_CHUNK_SIZE, progress=_drive_upload_progress(file.filename),
+        )
         
         if not file_url:
             raise HTTPException(status_code=500, detail="Không thể tải file lên Google Drive.")
             
         return {"file_url": file_url}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Lỗi server khi xử lý file: {e}")
-# --- Dependency ---
-def get_db():
-    db = SessionLocal()
+
+def _etag(*parts) -> str:
+    """ETag yếu từ chuỗi phiên bản dữ liệu (crud.get_*_version) và tham số truy vấn."""
+    return 'W/"%s"' % hashlib.sha1(repr(parts).encode("utf-8")).hexdigest()[:24]
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    # So sánh yếu: bỏ qua tiền tố W/ theo RFC 9110
+    return "*" in candidates or etag.removeprefix("W/") in {tag.removeprefix("W/") for tag in candidates}
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers={"ETag": etag})
+
+# Phân trang keyset cho GET /file-tasks/, /data-reports/, /schools/, /school_years/: cursor của trang sau nằm
+# ở header X-Next-Cursor (không có header = trang cuối), client gửi lại qua ?cursor=. Thân response vẫn là
+# danh sách như cũ để client cũ không bị ảnh hưởng; admin_app.api_get_all_pages đọc header này.
+# Khi có cursor thì bỏ qua skip. Admin / client tải yêu cầu, báo cáo và trường qua GET /sync.
+CURSOR_QUERY = Query(None, description="Giá trị X-Next-Cursor của trang trước")
+
+def _page_after(cursor: Optional[str], cursor_types) -> Optional[tuple]:
+    if not cursor:
+        return None
     try:
-        yield db
-    finally:
-        db.close()
+        return crud.decode_cursor(cursor, *cursor_types)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Cursor phân trang không hợp lệ.")
+
+def _set_next_cursor(response: Response, rows, limit: int, *keys: str) -> None:
+    cursor = crud.next_cursor(rows, limit, *keys)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
 
 def get_school_from_api_key(x_api_key: str = Header(...), db: Session = Depends(get_db)):
-    """Dependency để xác thực API Key của các trường học (client_app)."""
+    """Dependency để xác thực API Key của các trường học (client_app); kết quả được cache theo key."""
     db_school = crud.get_school_by_api_key(db, api_key=x_api_key)
     if db_school is None:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="API Key không hợp lệ.")
@@ -100,6 +225,10 @@ def shutdown_scheduler():
     scheduler.shutdown()
     print("Đã tắt bộ đếm giờ (Scheduler).")
 
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
+
 @app.get("/")
 def read_root():
     return {"message": "Auto Report API is running correctly."}
@@ -113,8 +242,14 @@ def create_new_school_year(school_year: schemas.SchoolYearCreate, db: Session =
     return db_school_year
 
 @app.get("/school_years/", response_model=List[schemas.SchoolYear])
-def read_school_years(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_school_years(db, skip=skip, limit=limit)
+def read_school_years(
+    response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = CURSOR_QUERY,
+    db: Session = Depends(get_db)
+):
+    after = _page_after(cursor, crud.SCHOOL_YEAR_CURSOR)
+    school_years = crud.get_school_years(db, skip=0 if after else skip, limit=limit, after=after)
+    _set_next_cursor(response, school_years, limit, "name", "id")
+    return school_years
 
 @app.put("/school_years/{school_year_id}", response_model=schemas.SchoolYear)
 def update_school_year_by_id(school_year_id: int, school_year: schemas.SchoolYearUpdate, db: Session = Depends(get_db)):
@@ -139,11 +274,21 @@ def create_new_school(school: schemas.SchoolCreate, db: Session = Depends(get_db
     return db_school
 
 @app.get("/schools/", response_model=List[schemas.School])
-def read_schools(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    return crud.get_schools(db, skip=skip, limit=limit)
+def read_schools(
+    response: Response, skip: int = 0, limit: int = 100, cursor: Optional[str] = CURSOR_QUERY,
+    db: Session = Depends(get_db), if_none_match: Optional[str] = Header(None)
+):
+    after = _page_after(cursor, crud.SCHOOL_CURSOR)
+    etag = _etag("schools", crud.get_schools_version(db), skip, limit, cursor)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    schools = crud.get_schools(db, skip=0 if after else skip, limit=limit, after=after)
+    _set_next_cursor(response, schools, limit, "name", "id")
+    return schools
 
 @app.get("/schools/me", response_model=schemas.School)
-def read_school_me(current_school: models.School = Depends(get_school_from_api_key)):
+def read_school_me(current_school: crud.SchoolIdentity = Depends(get_school_from_api_key)):
     return current_school
 
 @app.delete("/schools/{school_id}")
@@ -168,45 +313,69 @@ def create_new_file_task(payload: Dict[str, Any], db: Session = Depends(get_db))
 
 @app.get("/file-tasks/{task_id}/upload-folder")
 def get_upload_folder_for_task(
-    task_id: int, user_email: Optional[str] = None, db: Session = Depends(get_db),
-    current_school: models.School = Depends(get_school_from_api_key)
+    task_id: int, user_email: Optional[str] = None, refresh: bool = False, db: Session = Depends(get_db),
+    current_school: crud.SchoolIdentity = Depends(get_school_from_api_key)
 ):
-    folder_id = crud.get_or_create_file_submission_folder(db, task_id=task_id, school_id=current_school.id, user_email=user_email)
+    """ID thư mục nộp bài của tháng; refresh=true khi Drive báo thư mục không còn (ID trong cache đã cũ)."""
+    folder_id = crud.get_or_create_file_submission_folder(
+        db, task_id=task_id, school_id=current_school.id, user_email=user_email, refresh=refresh
+    )
     if not folder_id:
         raise HTTPException(status_code=404, detail="Không thể tạo thư mục nộp bài.")
     return {"folder_id": folder_id}
 
 @app.get("/file-tasks/", response_model=List[schemas.FileTask])
-def read_file_tasks(
-    school_year_id: Optional[int] = None, skip: int = 0, limit: int = 100, 
-    db: Session = Depends(get_db), x_api_key: Optional[str] = Header(None)
+async def read_file_tasks(
+    response: Response, school_year_id: Optional[int] = None, skip: int = 0, limit: int = 100, 
+    cursor: Optional[str] = CURSOR_QUERY,
+    db: AsyncSession = Depends(get_async_db), x_api_key: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
+    after = _page_after(cursor, crud.TASK_CURSOR)
     current_school_id = None
     if x_api_key:
-        current_school = crud.get_school_by_api_key(db, api_key=x_api_key)
+        current_school = await crud_async.get_school_by_api_key(db, api_key=x_api_key)
         if not current_school: raise HTTPException(status_code=401, detail="API Key không hợp lệ.")
         current_school_id = current_school.id
-    
-    tasks_from_db, reminded_task_ids = crud.get_file_tasks(db, school_year_id=school_year_id, current_school_id=current_school_id, skip=skip, limit=limit)
-    response_tasks = []
-    
-    submitted_task_ids = set()
-    if current_school_id:
-        submitted_task_ids = crud.get_submitted_file_task_ids_for_school(db, school_id=current_school_id)
-    
-    for task in tasks_from_db:
-        task_dict = {c.name: getattr(task, c.name) for c in task.__table__.columns}
-        task_dict['is_locked'] = task_dict.get('is_locked') or False
-        task_dict['is_submitted'] = task.id in submitted_task_ids
-        task_dict['is_reminded'] = task.id in reminded_task_ids
-        response_tasks.append(schemas.FileTask(**task_dict))
-    return response_tasks
+
+    version = await crud_async.get_file_task_list_version(db, current_school_id=current_school_id)
+    etag = _etag("file-tasks", version, school_year_id, current_school_id, skip, limit, cursor)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+    rows = await crud_async.get_file_task_list_rows(
+        db, school_year_id=school_year_id, current_school_id=current_school_id,
+        skip=0 if after else skip, limit=limit, after=after
+    )
+    _set_next_cursor(response, rows, limit, "deadline", "id")
+    return rows
+
+# HÀM MỚI: Đồng bộ tăng dần cho client_app / admin_app, thay cho việc tải lại toàn bộ danh sách
+@app.get("/sync", response_model=schemas.SyncResponse)
+async def sync_changes(
+    since: Optional[int] = Query(None, ge=0, description="Cursor nhận được ở lần đồng bộ trước"),
+    db: AsyncSession = Depends(get_async_db), x_api_key: Optional[str] = Header(None)
+):
+    current_school_id = None
+    if x_api_key:
+        current_school = await crud_async.get_school_by_api_key(db, api_key=x_api_key)
+        if not current_school:
+            raise HTTPException(status_code=401, detail="API Key không hợp lệ.")
+        current_school_id = current_school.id
+    return await crud_async.get_sync_payload(db, since, current_school_id=current_school_id)
 
 @app.get("/file-tasks/{task_id}/status", response_model=schemas.FileTaskStatus)
-def read_file_task_status(task_id: int, db: Session = Depends(get_db)):
-    status_data = crud.get_file_task_status(db, task_id=task_id)
+async def read_file_task_status(
+    task_id: int, response: Response, db: AsyncSession = Depends(get_async_db),
+    if_none_match: Optional[str] = Header(None)
+):
+    etag = _etag("file-task-status", task_id, await crud_async.get_file_task_status_version(db, task_id))
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    status_data = await crud_async.get_file_task_status(db, task_id=task_id)
     if status_data is None: 
         raise HTTPException(status_code=404, detail="Yêu cầu không tồn tại.")
+    response.headers["ETag"] = etag
     # SỬA LỖI: Đảm bảo is_locked không bao giờ là None trước khi trả về
     if status_data['task'].is_locked is None:
         status_data['task'].is_locked = False
@@ -226,25 +395,16 @@ def delete_file_task_by_id(task_id: int, db: Session = Depends(get_db)):
 
 @app.get("/file-tasks/{task_id}/download-all")
 def download_all_submissions_for_task(task_id: int, db: Session = Depends(get_db)):
-    submissions = crud.get_submissions_for_file_task(db, task_id=task_id)
-    if not submissions: raise HTTPException(status_code=404, detail="Không có file nào được nộp.")
-    zip_buffer = io.BytesIO()
-    with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-        for submission in submissions:
-            file_id = crud.extract_drive_file_id_from_url(submission.file_url)
-            if not file_id: continue
-            file_content, file_name = crud.download_file_from_drive(file_id)
-            if file_content and file_name:
-                zip_file_name = f"{submission.school.name} - {file_name}"
-                zip_file.writestr(zip_file_name, file_content)
-    zip_buffer.seek(0)
-    return StreamingResponse(zip_buffer, media_type="application/zip", 
+    # Lấy sẵn dữ liệu cần thiết: ZIP được sinh sau khi endpoint trả về, lúc đó session đã đóng
+    items = crud.get_submission_files_for_task(db, task_id=task_id)
+    if not items: raise HTTPException(status_code=404, detail="Không có file nào được nộp.")
+    return StreamingResponse(submission_archive.stream_submissions_zip(items), media_type="application/zip",
                              headers={"Content-Disposition": f"attachment; filename=task_{task_id}_submissions.zip"})
 
 @app.post("/file-submissions/", response_model=schemas.FileSubmission)
 def create_new_file_submission(
     submission: schemas.FileSubmissionCreate, db: Session = Depends(get_db),
-    current_school: models.School = Depends(get_school_from_api_key)
+    current_school: crud.SchoolIdentity = Depends(get_school_from_api_key)
 ):
     return crud.create_file_submission(db=db, submission=submission, school_id=current_school.id)
 
@@ -270,43 +430,32 @@ def create_new_data_report(payload: Dict[str, Any], db: Session = Depends(get_db
     return db_report
 
 @app.get("/data-reports/", response_model=List[schemas.DataReport])
-def read_data_reports(
-    school_year_id: Optional[int] = None, skip: int = 0, limit: int = 100,
-    db: Session = Depends(get_db), x_api_key: Optional[str] = Header(None)
+async def read_data_reports(
+    response: Response, school_year_id: Optional[int] = None, skip: int = 0, limit: int = 100,
+    cursor: Optional[str] = CURSOR_QUERY,
+    db: AsyncSession = Depends(get_async_db), x_api_key: Optional[str] = Header(None),
+    if_none_match: Optional[str] = Header(None)
 ):
+    after = _page_after(cursor, crud.TASK_CURSOR)
     current_school_id = None
     if x_api_key:
-        current_school = crud.get_school_by_api_key(db, api_key=x_api_key)
+        current_school = await crud_async.get_school_by_api_key(db, api_key=x_api_key)
         if not current_school:
             raise HTTPException(status_code=401, detail="API Key không hợp lệ.")
         current_school_id = current_school.id
 
-    reports_from_db, reminded_report_ids = crud.get_data_reports(db, school_year_id=school_year_id, current_school_id=current_school_id, skip=skip, limit=limit)
-    
-    response_reports = []
-    for report in reports_from_db:
-        report_dict = {
-            "id": report.id,
-            "title": report.title,
-            "description": getattr(report, 'description', None),
-            "deadline": report.deadline,
-            "created_at": report.created_at,
-            "columns_schema": report.columns_schema,
-            "template_data": report.template_data,
-            "attachment_url": report.attachment_url,
-            "is_locked": getattr(report, 'is_locked', False) or False,
-            "is_submitted": False,
-            "is_reminded": False
-        }
-
-        if current_school_id:
-            report_dict['is_reminded'] = report.id in reminded_report_ids
-            entry = crud.get_data_entry_for_school(db, report_id=report.id, school_id=current_school_id)
-            report_dict['is_submitted'] = (entry and entry.submitted_at is not None)
-        
-        response_reports.append(report_dict)
-        
-    return response_reports
+    version = await crud_async.get_data_report_list_version(db, current_school_id=current_school_id)
+    etag = _etag("data-reports", version, school_year_id, current_school_id, skip, limit, cursor)
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    response.headers["ETag"] = etag
+
+    rows = await crud_async.get_data_report_list_rows(
+        db, school_year_id=school_year_id, current_school_id=current_school_id,
+        skip=0 if after else skip, limit=limit, after=after
+    )
+    _set_next_cursor(response, rows, limit, "deadline", "id")
+    return rows
 
 
 @app.get("/data-reports/{report_id}/schema")
@@ -320,7 +469,7 @@ def get_data_report_schema(report_id: int, db: Session = Depends(get_db)):
 @app.get("/data-reports/{report_id}/my-submission", response_model=schemas.DataSubmissionCreate)
 def get_my_data_submission(
     report_id: int, db: Session = Depends(get_db),
-    current_school: models.School = Depends(get_school_from_api_key)
+    current_school: crud.SchoolIdentity = Depends(get_school_from_api_key)
 ):
     submission = crud.get_data_submission_for_school(db, report_id=report_id, school_id=current_school.id)
     if submission is None:
@@ -330,7 +479,7 @@ def get_my_data_submission(
 @app.post("/data-reports/{report_id}/submit", status_code=status.HTTP_200_OK)
 def submit_data_for_report(
     report_id: int, submission: schemas.DataSubmissionCreate, db: Session = Depends(get_db),
-    current_school: models.School = Depends(get_school_from_api_key)
+    current_school: crud.SchoolIdentity = Depends(get_school_from_api_key)
 ):
     entry = crud.create_or_update_data_submission(db, report_id=report_id, school_id=current_school.id, submission_data=submission.data)
     if not entry:
@@ -338,45 +487,43 @@ def submit_data_for_report(
     return {"message": "Đã lưu dữ liệu thành công."}
 
 @app.get("/data-reports/{report_id}/status", response_model=schemas.DataReportStatus)
-def read_data_report_status(report_id: int, db: Session = Depends(get_db)):
-    status_data = crud.get_data_report_status(db, report_id=report_id)
+async def read_data_report_status(
+    report_id: int, response: Response, db: AsyncSession = Depends(get_async_db),
+    if_none_match: Optional[str] = Header(None)
+):
+    etag = _etag("data-report-status", report_id, await crud_async.get_data_report_status_version(db, report_id))
+    if _etag_matches(if_none_match, etag):
+        return _not_modified(etag)
+    status_data = await crud_async.get_data_report_status(db, report_id=report_id)
     if status_data is None:
         raise HTTPException(status_code=404, detail="Báo cáo nhập liệu không tồn tại.")
+    response.headers["ETag"] = etag
     # SỬA LỖI: Đảm bảo is_locked không bao giờ là None trước khi trả về
     if status_data['report'].is_locked is None:
         status_data['report'].is_locked = False
     return status_data
 
 @app.get("/data-reports/{report_id}/export-excel")
-def export_data_report_to_excel(report_id: int, db: Session = Depends(get_db)):
+def export_data_report_to_excel(
+    report_id: int,
+    export_format: str = Query("xlsx", alias="format", pattern="^(xlsx|csv|jsonl|parquet)$"),
+    db: Session = Depends(get_db)
+):
+    """Xuất dữ liệu tổng hợp; format=csv|jsonl|parquet cho phân tích (xem report_export.py)."""
+    if not report_export.is_available(export_format):
+        raise HTTPException(status_code=501, detail="Server chưa cài pyarrow nên không xuất được Parquet.")
     report = db.query(models.DataReport).filter(models.DataReport.id == report_id).first()
     if not report:
         raise HTTPException(status_code=404, detail="Báo cáo không tồn tại.")
 
-    submissions = crud.get_all_data_submissions_for_report(db, report_id=report_id)
-    if not submissions:
+    if not crud.has_data_submissions(db, report_id=report_id):
         raise HTTPException(status_code=404, detail="Chưa có trường nào nộp dữ liệu cho báo cáo này.")
 
-    output = io.BytesIO()
-    workbook = openpyxl.Workbook()
-    sheet = workbook.active
-    
-    headers = [col['title'] for col in report.columns_schema]
-    sheet.append(headers)
-    
-    column_keys = [col['name'] for col in report.columns_schema]
-
-    for item in submissions:
-        row = [item.get(key, "") for key in column_keys]
-        sheet.append(row)
-
-    workbook.save(output)
-    output.seek(0)
-    
+    stream, media_type, extension = report_export.EXPORT_FORMATS[export_format]
     response_headers = {
-        'Content-Disposition': f'attachment; filename="bao_cao_tong_hop_{report_id}.xlsx"'
+        'Content-Disposition': f'attachment; filename="bao_cao_tong_hop_{report_id}.{extension}"'
     }
-    return StreamingResponse(output, headers=response_headers, media_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    return StreamingResponse(stream(report_id, report.columns_schema), headers=response_headers, media_type=media_type)
 
 @app.get("/admin/compliance-summary", response_model=schemas.ComplianceSummary)
 def get_compliance_summary(
@@ -431,8 +578,31 @@ def update_data_report_by_id(report_id: int, report: schemas.DataReportUpdate, d
     return db_report
     
 @app.get("/admin/dashboard-stats", response_model=schemas.DashboardStats)
-def get_dashboard_statistics(db: Session = Depends(get_db)):
-    return crud.get_dashboard_stats(db)
+async def get_dashboard_statistics(db: AsyncSession = Depends(get_async_db)):
+    return await crud_async.get_dashboard_stats(db)
+
+@app.get("/admin/cache-stats", response_model=Dict[str, Dict[str, Any]])
+def get_cache_statistics():
+    """Số lần hit/miss, kích thước và số lần làm mới của các cache tổng hợp, cache file Drive và service Google (theo từng worker)."""
+    return {**cache.get_stats(), "drive_files": drive_cache.drive_files.stats(),
+            "google_services": google_services.get_stats()}
+
+# HÀM MỚI: Trạng thái nộp của nhiều yêu cầu trong một lần gọi, ví dụ ?ids=1&ids=2
+@app.get("/admin/file-tasks/status", response_model=List[schemas.FileTaskStatus])
+async def read_file_task_statuses(ids: List[int] = Query(...), db: AsyncSession = Depends(get_async_db)):
+    statuses = await crud_async.get_status_for_tasks(db, "file", ids)
+    for status_data in statuses.values():
+        if status_data['task'].is_locked is None:
+            status_data['task'].is_locked = False
+    return [statuses[task_id] for task_id in dict.fromkeys(ids) if task_id in statuses]
+
+@app.get("/admin/data-reports/status", response_model=List[schemas.DataReportStatus])
+async def read_data_report_statuses(ids: List[int] = Query(...), db: AsyncSession = Depends(get_async_db)):
+    statuses = await crud_async.get_status_for_tasks(db, "data", ids)
+    for status_data in statuses.values():
+        if status_data['report'].is_locked is None:
+            status_data['report'].is_locked = False
+    return [statuses[report_id] for report_id in dict.fromkeys(ids) if report_id in statuses]
 
 @app.put("/admin/data-submissions/{report_id}/{school_id}", status_code=status.HTTP_200_OK)
 def update_school_submission_by_admin(
@@ -448,14 +618,22 @@ def update_school_submission_by_admin(
         raise HTTPException(status_code=404, detail="Không tìm thấy bản ghi nộp bài của trường này.")
     return {"message": "Đã cập nhật dữ liệu thành công."}
     
-@app.post("/admin/remind/{task_type}/{task_id}", status_code=status.HTTP_200_OK)
+@app.post("/admin/remind/{task_type}/{task_id}", response_model=schemas.ReminderResult, status_code=status.HTTP_200_OK)
 def send_reminders(task_type: str, task_id: int, db: Session = Depends(get_db)):
     if task_type not in ["file", "data"]:
         raise HTTPException(status_code=400, detail="Loại công việc không hợp lệ.")
-    success, message = crud.create_reminders_for_task(db, task_type, task_id)
+    success, message, inserted = crud.create_reminders_for_task(db, task_type, task_id)
     if not success:
         raise HTTPException(status_code=500, detail=message)
-    return {"message": message}
+    return {"message": message, "inserted": inserted}
+
+@app.post("/admin/remind/{task_type}", response_model=schemas.ReminderResult, status_code=status.HTTP_200_OK)
+def send_reminders_bulk(task_type: str, payload: schemas.ReminderBulkCreate, db: Session = Depends(get_db)):
+    """Nhắc nhở các trường chưa nộp cho nhiều công việc cùng lúc (một câu lệnh INSERT)."""
+    if task_type not in ["file", "data"]:
+        raise HTTPException(status_code=400, detail="Loại công việc không hợp lệ.")
+    inserted = crud.create_reminders_for_tasks(db, task_type, payload.task_ids)
+    return {"message": f"Đã tạo {inserted} nhắc nhở cho {len(set(payload.task_ids))} công việc.", "inserted": inserted}
 
 class ResetPayload(BaseModel):
     password: str
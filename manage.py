@@ -0,0 +1,94 @@
+# manage.py
+"""
+CLI quản trị CSDL, chạy tách riêng khỏi app.
+
+    python manage.py migrate [--to N] [--dedupe]
+                                        # nâng cấp schema lên phiên bản mới nhất (hoặc N)
+    python manage.py current            # in phiên bản hiện tại và phiên bản mới nhất
+    python manage.py history            # liệt kê các migration đã áp dụng
+    python manage.py backfill-data-rows [--report-id N]
+                                        # chuyển dữ liệu nhập liệu JSON sang bảng data_entry_rows
+    python manage.py rebuild-compliance # tính lại bảng school_compliance_counters từ dữ liệu gốc
+"""
+import argparse
+import sys
+
+import migrations
+from database import engine
+
+
+def cmd_migrate(args):
+    import models
+    from migrations import ops
+    if args.dedupe:
+        ops.DEDUPE_ON_UNIQUE = True
+    # Tạo các bảng chưa có (CSDL mới) trước khi chạy các script nâng cấp
+    models.Base.metadata.create_all(bind=engine)
+    version = migrations.upgrade(engine, target=args.to)
+    print(f"Schema version: {version}")
+
+
+def cmd_current(args):
+    current = migrations.get_current_version(engine)
+    print(f"Current: {current if current is not None else 'chưa khởi tạo'}")
+    print(f"Head:    {migrations.head_version()}")
+
+
+def cmd_history(args):
+    if migrations.get_current_version(engine) is None:
+        print("CSDL chưa có bảng schema_version.")
+        return
+    for row in migrations.get_history(engine):
+        print(f"{row['version']:04d}  {row['applied_at']:%Y-%m-%d %H:%M:%S}  {row['description']}")
+
+
+def cmd_backfill_data_rows(args):
+    import crud
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        converted = crud.migrate_data_entries_to_rows(db, report_id=args.report_id)
+    finally:
+        db.close()
+    print(f"Đã chuyển {converted} bản ghi sang data_entry_rows.")
+    if not crud.DATA_ENTRY_ROW_STORAGE:
+        print("Lưu ý: DATA_ENTRY_ROW_STORAGE chưa bật, các lần nộp sau vẫn lưu dạng JSON.")
+
+
+def cmd_rebuild_compliance(args):
+    import crud
+    from database import SessionLocal
+    db = SessionLocal()
+    try:
+        total = crud.rebuild_compliance_counters(db)
+    finally:
+        db.close()
+    print(f"Đã tính lại {total} bộ đếm tuân thủ.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Công cụ quản trị CSDL Auto Report")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_migrate = sub.add_parser("migrate", help="Áp dụng các migration còn thiếu")
+    p_migrate.add_argument("--to", type=int, default=None, help="Dừng ở phiên bản này")
+    p_migrate.add_argument("--dedupe", action="store_true",
+                           help="Khi tạo unique index: giữ dòng mới nhất, chuyển dòng trùng sang bảng <bảng>_duplicates")
+    p_migrate.set_defaults(func=cmd_migrate)
+
+    sub.add_parser("current", help="Phiên bản schema hiện tại").set_defaults(func=cmd_current)
+    sub.add_parser("history", help="Các migration đã áp dụng").set_defaults(func=cmd_history)
+
+    p_backfill = sub.add_parser("backfill-data-rows", help="Chuyển dữ liệu nhập liệu JSON sang data_entry_rows")
+    p_backfill.add_argument("--report-id", type=int, default=None)
+    p_backfill.set_defaults(func=cmd_backfill_data_rows)
+
+    sub.add_parser("rebuild-compliance", help="Tính lại bảng school_compliance_counters") \
+        .set_defaults(func=cmd_rebuild_compliance)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
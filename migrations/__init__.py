@@ -0,0 +1,207 @@
+# migrations/__init__.py
+"""
+Hệ thống migration có đánh số phiên bản cho CSDL (SQLite và PostgreSQL).
+
+- Bảng `schema_version` lưu các phiên bản đã áp dụng (version, description, applied_at).
+- Mỗi file `mNNNN_<ten>.py` trong thư mục này khai báo VERSION, DESCRIPTION và hàm upgrade(engine).
+- Chạy migration bằng CLI riêng: `python manage.py migrate`.
+- Khi khởi động app chỉ gọi check_schema_version(): một truy vấn SELECT MAX(version).
+- Việc nâng cấp chạy trong migration_lock(): nhiều worker (uvicorn/gunicorn) khởi động cùng lúc thì chỉ
+  một tiến trình chạy upgrade, các tiến trình khác chờ rồi thấy CSDL đã ở phiên bản mới nhất.
+"""
+import importlib
+import os
+import pkgutil
+from contextlib import contextmanager
+from datetime import datetime
+from typing import List, Optional
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, func, inspect, select, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+# Bảng phiên bản dùng MetaData riêng để models.Base.metadata.create_all không đụng tới
+_metadata = MetaData()
+schema_version = Table(
+    "schema_version", _metadata,
+    Column("version", Integer, primary_key=True, autoincrement=False),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False, default=datetime.utcnow),
+)
+
+# Cho phép app tự chạy migration khi khởi động (mặc định bật để tương thích cách deploy cũ).
+# Trên production nên đặt DB_AUTO_MIGRATE=0 và chạy `python manage.py migrate` ở bước release.
+AUTO_MIGRATE = os.getenv("DB_AUTO_MIGRATE", "1").lower() in ("1", "true", "yes")
+
+# Khóa advisory của PostgreSQL dành cho migration (số bất kỳ, cố định cho ứng dụng)
+PG_MIGRATION_LOCK_KEY = 7_240_315_001
+
+
+@contextmanager
+def migration_lock(engine):
+    """
+    Khóa loại trừ giữa các tiến trình trong lúc nâng cấp schema.
+    - PostgreSQL: pg_advisory_lock trên một kết nối AUTOCOMMIT riêng (không giữ giao dịch mở,
+      nên không chặn CREATE INDEX CONCURRENTLY của chính migration).
+    - SQLite (file): flock trên file <db>.migrate.lock cạnh file CSDL; hệ điều hành tự nhả khi tiến trình chết.
+    - SQLite :memory: chỉ một tiến trình dùng nên không cần khóa.
+    """
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("SELECT pg_advisory_lock(:key)"), {"key": PG_MIGRATION_LOCK_KEY})
+            try:
+                yield
+            finally:
+                conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": PG_MIGRATION_LOCK_KEY})
+        return
+
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or not database or database == ":memory:":
+        yield
+        return
+    with open(f"{database}.migrate.lock", "a+b") as lock_file:
+        _lock_file(lock_file)
+        try:
+            yield
+        finally:
+            _unlock_file(lock_file)
+
+
+def _lock_file(lock_file) -> None:
+    try:
+        import fcntl
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+    except ImportError:  # Windows
+        import msvcrt
+        lock_file.seek(0)
+        while True:
+            try:
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:  # LK_LOCK chỉ thử lại ~10 giây rồi báo lỗi
+                continue
+
+
+def _unlock_file(lock_file) -> None:
+    try:
+        import fcntl
+        fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+    except ImportError:
+        import msvcrt
+        lock_file.seek(0)
+        msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def load_migrations() -> List:
+    """Nạp tất cả các module mNNNN_*.py, sắp xếp theo VERSION tăng dần."""
+    modules = []
+    for info in pkgutil.iter_modules(__path__):
+        if not info.name.startswith("m"):
+            continue
+        module = importlib.import_module(f"{__name__}.{info.name}")
+        modules.append(module)
+    modules.sort(key=lambda m: m.VERSION)
+    versions = [m.VERSION for m in modules]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Trùng số phiên bản migration: {versions}")
+    return modules
+
+
+def head_version() -> int:
+    migrations = load_migrations()
+    return migrations[-1].VERSION if migrations else 0
+
+
+def get_current_version(engine) -> Optional[int]:
+    """Trả về phiên bản hiện tại; None nếu CSDL chưa có bảng schema_version."""
+    try:
+        with engine.connect() as conn:
+            return conn.execute(select(func.max(schema_version.c.version))).scalar() or 0
+    except (OperationalError, ProgrammingError):
+        return None
+
+
+def get_history(engine) -> List[dict]:
+    with engine.connect() as conn:
+        rows = conn.execute(select(schema_version).order_by(schema_version.c.version)).mappings().all()
+    return [dict(r) for r in rows]
+
+
+def _stamp(engine, module) -> None:
+    with engine.begin() as conn:
+        conn.execute(schema_version.insert().values(
+            version=module.VERSION, description=module.DESCRIPTION, applied_at=datetime.utcnow()
+        ))
+
+
+def upgrade(engine, target: Optional[int] = None) -> int:
+    """
+    Áp dụng lần lượt các migration có VERSION > phiên bản hiện tại (tới `target` nếu có).
+    Các migration được viết idempotent nên chạy lại trên CSDL cũ (chưa có schema_version) vẫn an toàn.
+    Trả về phiên bản sau khi nâng cấp.
+    """
+    with migration_lock(engine):
+        return _upgrade_locked(engine, target)
+
+
+def _upgrade_locked(engine, target: Optional[int] = None) -> int:
+    _metadata.create_all(bind=engine, checkfirst=True)
+    # Đọc lại sau khi có khóa: tiến trình khác có thể vừa nâng cấp xong
+    current = get_current_version(engine) or 0
+    for module in load_migrations():
+        if module.VERSION <= current:
+            continue
+        if target is not None and module.VERSION > target:
+            break
+        print(f"[DB MIGRATION] -> {module.VERSION:04d} {module.DESCRIPTION}")
+        module.upgrade(engine)
+        _stamp(engine, module)
+        current = module.VERSION
+    return current
+
+
+def stamp_head(engine) -> int:
+    """Đánh dấu CSDL mới tạo (bằng create_all) là đã ở phiên bản mới nhất."""
+    _metadata.create_all(bind=engine, checkfirst=True)
+    current = get_current_version(engine) or 0
+    for module in load_migrations():
+        if module.VERSION > current:
+            _stamp(engine, module)
+            current = module.VERSION
+    return current
+
+
+def check_schema_version(engine) -> None:
+    """
+    Kiểm tra phiên bản khi app khởi động (một truy vấn nếu CSDL đã cập nhật).
+    - CSDL trống: tạo toàn bộ bảng theo models rồi đánh dấu phiên bản mới nhất.
+    - CSDL cũ hoặc chưa cập nhật: chạy upgrade nếu DB_AUTO_MIGRATE bật, ngược lại báo lỗi.
+    """
+    head = head_version()
+    if get_current_version(engine) == head:
+        return
+
+    with migration_lock(engine):
+        # Đọc lại sau khi có khóa: worker khác có thể vừa tạo / nâng cấp CSDL
+        current = get_current_version(engine)
+        if current == head:
+            return
+
+        if current is None:
+            import models  # import cục bộ để tránh vòng lặp import
+            existing_tables = set(inspect(engine).get_table_names())
+            if not existing_tables & set(models.Base.metadata.tables):
+                models.Base.metadata.create_all(bind=engine)
+                stamp_head(engine)
+                print(f"[DB MIGRATION] Created new database at schema version {head}")
+                return
+
+        if current is not None and current > head:
+            raise RuntimeError(f"CSDL đang ở phiên bản {current}, mới hơn mã nguồn ({head}).")
+
+        if not AUTO_MIGRATE:
+            raise RuntimeError(
+                f"CSDL đang ở phiên bản {current or 0}, cần {head}. Hãy chạy: python manage.py migrate"
+            )
+        import models
+        models.Base.metadata.create_all(bind=engine)
+        _upgrade_locked(engine)
@@ -0,0 +1,26 @@
+# migrations/m0001_legacy_columns.py
+"""Các cột được thêm sau phiên bản đầu tiên (trước đây do _init_sqlite_hotfix_columns xử lý)."""
+from migrations.ops import add_column
+
+VERSION = 1
+DESCRIPTION = "Add is_locked, attachment_url, template_data, description, last_edited_* columns"
+
+JSON_TYPE = {"sqlite": "TEXT", "default": "JSON"}
+TEXT_TYPE = {"sqlite": "TEXT", "default": "VARCHAR"}
+DATETIME_TYPE = {"sqlite": "DATETIME", "default": "TIMESTAMP WITHOUT TIME ZONE"}
+
+
+def upgrade(engine):
+    # Bảng file_tasks
+    add_column(engine, "file_tasks", "is_locked", "BOOLEAN")
+    add_column(engine, "file_tasks", "attachment_url", TEXT_TYPE)
+
+    # Bảng data_reports
+    add_column(engine, "data_reports", "template_data", JSON_TYPE)
+    add_column(engine, "data_reports", "is_locked", "BOOLEAN")
+    add_column(engine, "data_reports", "attachment_url", TEXT_TYPE)
+    add_column(engine, "data_reports", "description", TEXT_TYPE)
+
+    # Bảng data_entries
+    add_column(engine, "data_entries", "last_edited_by", "VARCHAR")
+    add_column(engine, "data_entries", "last_edited_at", DATETIME_TYPE)
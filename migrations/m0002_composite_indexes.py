@@ -0,0 +1,13 @@
+# migrations/m0002_composite_indexes.py
+"""Chỉ mục ghép cho các cặp cột mà crud lọc thường xuyên."""
+from migrations.ops import create_index
+
+VERSION = 2
+DESCRIPTION = "Composite unique indexes on data_entries, file_submissions, task_reminders"
+
+
+def upgrade(engine):
+    create_index(engine, "ux_data_entries_report_school", "data_entries", ["report_id", "school_id"], unique=True)
+    create_index(engine, "ux_file_submissions_task_school", "file_submissions", ["task_id", "school_id"], unique=True)
+    create_index(engine, "ux_task_reminders_type_task_school", "task_reminders", ["task_type", "task_id", "school_id"], unique=True)
+    create_index(engine, "ix_task_reminders_school_type", "task_reminders", ["school_id", "task_type"])
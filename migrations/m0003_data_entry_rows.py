@@ -0,0 +1,27 @@
+# migrations/m0003_data_entry_rows.py
+"""
+Bảng lưu dữ liệu nhập liệu theo từng dòng (DataEntryRow).
+
+Định nghĩa bảng được "đóng băng" tại đây (không import models) để migration luôn tạo đúng schema
+của phiên bản 3, kể cả khi model về sau thay đổi.
+"""
+from sqlalchemy import JSON, Column, ForeignKey, Index, Integer, MetaData, Table
+
+VERSION = 3
+DESCRIPTION = "Create data_entry_rows table"
+
+_metadata = MetaData()
+# Chỉ khai báo cột id để khóa ngoại tham chiếu được; bảng data_entries đã có từ trước
+Table("data_entries", _metadata, Column("id", Integer, primary_key=True))
+_data_entry_rows = Table(
+    "data_entry_rows", _metadata,
+    Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+    Column("entry_id", Integer, ForeignKey("data_entries.id", ondelete="CASCADE"), nullable=False),
+    Column("row_index", Integer, nullable=False),
+    Column("data", JSON, nullable=False),
+    Index("ux_data_entry_rows_entry_row", "entry_id", "row_index", unique=True),
+)
+
+
+def upgrade(engine):
+    _data_entry_rows.create(bind=engine, checkfirst=True)
@@ -0,0 +1,11 @@
+# migrations/m0004_deadline_indexes.py
+"""Chỉ mục theo hạn nộp cho phân trang ORDER BY deadline DESC ... LIMIT."""
+from migrations.ops import create_index
+
+VERSION = 4
+DESCRIPTION = "Deadline indexes on file_tasks and data_reports"
+
+
+def upgrade(engine):
+    create_index(engine, "ix_file_tasks_deadline", "file_tasks", ["deadline"])
+    create_index(engine, "ix_data_reports_deadline", "data_reports", ["deadline"])
@@ -0,0 +1,62 @@
+# migrations/m0005_compliance_counters.py
+"""
+Bảng school_compliance_counters, điền dữ liệu ban đầu từ các bảng gốc.
+
+Định nghĩa bảng và câu lệnh tính bộ đếm được "đóng băng" tại đây (không import models / crud) để
+migration luôn chạy đúng với schema ở phiên bản 5, kể cả khi mã nguồn về sau thay đổi.
+"""
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, MetaData, String, Table, text
+
+VERSION = 5
+DESCRIPTION = "Create school_compliance_counters table"
+
+_metadata = MetaData()
+# Chỉ khai báo cột id để khóa ngoại tham chiếu được; bảng schools đã có từ trước
+Table("schools", _metadata, Column("id", Integer, primary_key=True))
+_counters = Table(
+    "school_compliance_counters", _metadata,
+    Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+    Column("school_id", Integer, ForeignKey("schools.id", ondelete="CASCADE"), nullable=False),
+    Column("kind", String, nullable=False),
+    Column("item_id", Integer, nullable=False),
+    Column("school_year_id", Integer, nullable=True),
+    Column("deadline", DateTime, nullable=False),
+    Column("status", Integer, nullable=False),
+    Index("ux_compliance_counters_school_kind_item", "school_id", "kind", "item_id", unique=True),
+    Index("ix_compliance_counters_kind_deadline", "kind", "deadline"),
+)
+
+# 0 = chưa nộp, 1 = nộp trễ, 2 = đúng hạn
+_FILE_PAIRS = """
+INSERT INTO school_compliance_counters (school_id, kind, item_id, school_year_id, deadline, status)
+SELECT s.id, 'file', t.id, t.school_year_id, t.deadline,
+       CASE WHEN fs.submitted_at IS NULL THEN 0 WHEN fs.submitted_at <= t.deadline THEN 2 ELSE 1 END
+FROM task_reminders r
+JOIN file_tasks t ON t.id = r.task_id AND r.task_type = 'file'
+JOIN schools s ON s.id = r.school_id
+LEFT OUTER JOIN file_submissions fs ON fs.task_id = t.id AND fs.school_id = s.id
+UNION ALL
+SELECT s.id, 'file', t.id, t.school_year_id, t.deadline,
+       CASE WHEN fs.submitted_at IS NULL THEN 0 WHEN fs.submitted_at <= t.deadline THEN 2 ELSE 1 END
+FROM file_tasks t
+CROSS JOIN schools s
+LEFT OUTER JOIN file_submissions fs ON fs.task_id = t.id AND fs.school_id = s.id
+WHERE NOT EXISTS (SELECT 1 FROM task_reminders r2 WHERE r2.task_type = 'file' AND r2.task_id = t.id)
+"""
+
+_DATA_PAIRS = """
+INSERT INTO school_compliance_counters (school_id, kind, item_id, school_year_id, deadline, status)
+SELECT e.school_id, 'data', d.id, d.school_year_id, d.deadline,
+       CASE WHEN e.submitted_at IS NULL THEN 0 WHEN e.submitted_at <= d.deadline THEN 2 ELSE 1 END
+FROM data_entries e
+JOIN data_reports d ON d.id = e.report_id
+JOIN schools s ON s.id = e.school_id
+"""
+
+
+def upgrade(engine):
+    _counters.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM school_compliance_counters"))
+        conn.execute(text(_FILE_PAIRS))
+        conn.execute(text(_DATA_PAIRS))
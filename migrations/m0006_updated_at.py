@@ -0,0 +1,21 @@
+# migrations/m0006_updated_at.py
+"""Cột updated_at dùng để tính ETag cho danh sách trường, yêu cầu nộp file và báo cáo nhập liệu."""
+from sqlalchemy import text
+
+from migrations.ops import add_column
+
+VERSION = 6
+DESCRIPTION = "Add updated_at to schools, file_tasks and data_reports"
+
+DATETIME_TYPE = {"sqlite": "DATETIME", "default": "TIMESTAMP WITHOUT TIME ZONE"}
+
+
+def upgrade(engine):
+    add_column(engine, "schools", "updated_at", DATETIME_TYPE)
+    add_column(engine, "file_tasks", "updated_at", DATETIME_TYPE)
+    add_column(engine, "data_reports", "updated_at", DATETIME_TYPE)
+
+    with engine.begin() as conn:
+        conn.execute(text("UPDATE schools SET updated_at = CURRENT_TIMESTAMP WHERE updated_at IS NULL"))
+        conn.execute(text("UPDATE file_tasks SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"))
+        conn.execute(text("UPDATE data_reports SET updated_at = COALESCE(created_at, CURRENT_TIMESTAMP) WHERE updated_at IS NULL"))
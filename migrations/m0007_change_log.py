@@ -0,0 +1,27 @@
+# migrations/m0007_change_log.py
+"""
+Bảng change_log cho đồng bộ tăng dần (GET /sync).
+
+Định nghĩa bảng được "đóng băng" tại đây (không import models) để migration luôn tạo đúng schema
+của phiên bản 7, kể cả khi model về sau thay đổi.
+"""
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+
+VERSION = 7
+DESCRIPTION = "Create change_log table"
+
+_metadata = MetaData()
+_change_log = Table(
+    "change_log", _metadata,
+    Column("id", Integer, primary_key=True, index=True, autoincrement=True),
+    Column("entity", String, nullable=False),
+    Column("entity_id", Integer, nullable=False),
+    Column("action", String, nullable=False),
+    Column("school_id", Integer, nullable=True),
+    Column("created_at", DateTime),
+    Index("ix_change_log_school_id", "school_id", "id"),
+)
+
+
+def upgrade(engine):
+    _change_log.create(bind=engine, checkfirst=True)
@@ -0,0 +1,31 @@
+# migrations/m0008_drive_folders.py
+"""
+Bảng drive_folders và drive_folder_shares: cache ID thư mục Drive và các lần chia sẻ thư mục.
+
+Định nghĩa bảng được "đóng băng" tại đây (không import models) để migration luôn tạo đúng schema
+của phiên bản 8, kể cả khi model về sau thay đổi.
+"""
+from sqlalchemy import Column, DateTime, MetaData, String, Table
+
+VERSION = 8
+DESCRIPTION = "Create drive_folders and drive_folder_shares tables"
+
+_metadata = MetaData()
+_drive_folders = Table(
+    "drive_folders", _metadata,
+    Column("parent_id", String, primary_key=True),
+    Column("name", String, primary_key=True),
+    Column("folder_id", String, nullable=False, index=True),
+    Column("created_at", DateTime),
+)
+_drive_folder_shares = Table(
+    "drive_folder_shares", _metadata,
+    Column("folder_id", String, primary_key=True),
+    Column("email", String, primary_key=True),
+    Column("created_at", DateTime),
+)
+
+
+def upgrade(engine):
+    _drive_folders.create(bind=engine, checkfirst=True)
+    _drive_folder_shares.create(bind=engine, checkfirst=True)
@@ -0,0 +1,100 @@
+# migrations/ops.py
+"""Các thao tác DDL dùng chung cho script migration, chạy được trên SQLite và PostgreSQL."""
+import os
+from typing import Dict, List, Union
+
+from sqlalchemy import inspect, text
+
+# Migration không tự xóa dữ liệu: gặp bản ghi trùng khi tạo unique index thì dừng và liệt kê.
+# Bật DB_MIGRATE_DEDUPE=1 (hoặc `python manage.py migrate --dedupe`) để giữ bản ghi mới nhất (id lớn nhất)
+# và chuyển các bản ghi cũ hơn sang bảng <bảng>_duplicates trước khi xóa.
+DEDUPE_ON_UNIQUE = os.getenv("DB_MIGRATE_DEDUPE", "0").lower() in ("1", "true", "yes")
+DUPLICATE_REPORT_LIMIT = 20
+
+
+def add_column(engine, table_name: str, column_name: str, column_type_sql: Union[str, Dict[str, str]]) -> None:
+    """
+    Thêm cột nếu bảng chưa có.
+
+    - column_type_sql: chuỗi kiểu SQL, hoặc dict theo dialect, vd {"sqlite": "TEXT", "postgresql": "JSON"}.
+    - Không set DEFAULT/NOT NULL để tránh hạn chế ALTER TABLE của SQLite.
+    """
+    dialect = engine.dialect.name
+    if isinstance(column_type_sql, dict):
+        column_type_sql = column_type_sql.get(dialect) or column_type_sql["default"]
+
+    existing = {c["name"] for c in inspect(engine).get_columns(table_name)}
+    if column_name in existing:
+        return
+    with engine.begin() as conn:
+        conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type_sql}"))
+    print(f"[DB MIGRATION] + Added column {table_name}.{column_name} ({column_type_sql})")
+
+
+def create_index(engine, index_name: str, table_name: str, columns: List[str], unique: bool = False) -> None:
+    """
+    Tạo chỉ mục nếu chưa có, không làm gián đoạn dịch vụ.
+
+    - SQLite: CREATE INDEX IF NOT EXISTS (chỉ khóa ghi trong thời gian build).
+    - PostgreSQL: CREATE INDEX CONCURRENTLY (không khóa ghi); phải chạy ngoài transaction.
+      Nếu lần build trước bị lỗi và để lại index INVALID thì xóa đi và build lại.
+    - unique=True: kiểm tra bản ghi trùng trước (xem _resolve_duplicates).
+    """
+    cols_sql = ", ".join(columns)
+    unique_sql = "UNIQUE " if unique else ""
+
+    if unique:
+        _resolve_duplicates(engine, table_name, cols_sql)
+
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            invalid = conn.execute(text(
+                "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+                "WHERE c.relname = :name AND NOT i.indisvalid"
+            ), {"name": index_name}).first()
+            if invalid:
+                conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}"))
+            conn.execute(text(
+                f"CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {table_name} ({cols_sql})"
+            ))
+    else:
+        with engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE {unique_sql}INDEX IF NOT EXISTS {index_name} ON {table_name} ({cols_sql})"
+            ))
+    print(f"[DB MIGRATION] = Index {index_name} on {table_name} ({cols_sql}) is ready")
+
+
+def _resolve_duplicates(engine, table_name: str, cols_sql: str) -> None:
+    """
+    Mặc định: có nhóm trùng thì ném RuntimeError kèm danh sách (giá trị cột, các id) để xử lý bằng tay.
+    DEDUPE_ON_UNIQUE: giữ id lớn nhất của mỗi nhóm (lần nộp sau cùng), sao chép các dòng còn lại sang
+    <table_name>_duplicates rồi mới xóa, trong cùng một giao dịch.
+    """
+    keep_sql = f"SELECT MAX(id) FROM {table_name} GROUP BY {cols_sql}"
+    with engine.begin() as conn:
+        groups = conn.execute(text(
+            f"SELECT {cols_sql}, COUNT(*) AS n, MIN(id) AS first_id, MAX(id) AS last_id "
+            f"FROM {table_name} GROUP BY {cols_sql} HAVING COUNT(*) > 1 ORDER BY n DESC"
+        )).fetchall()
+        if not groups:
+            return
+        total = sum(row.n - 1 for row in groups)
+        if not DEDUPE_ON_UNIQUE:
+            listed = "\n".join(
+                f"  ({cols_sql}) = {tuple(row[:-3])}: {row.n} dòng, id {row.first_id}..{row.last_id}"
+                for row in groups[:DUPLICATE_REPORT_LIMIT]
+            )
+            more = f"\n  ... và {len(groups) - DUPLICATE_REPORT_LIMIT} nhóm khác" if len(groups) > DUPLICATE_REPORT_LIMIT else ""
+            raise RuntimeError(
+                f"Không tạo được unique index trên {table_name} ({cols_sql}): {len(groups)} nhóm trùng, "
+                f"{total} dòng thừa.\n{listed}{more}\n"
+                f"Hãy xử lý các dòng này, hoặc chạy lại với DB_MIGRATE_DEDUPE=1 để giữ dòng mới nhất "
+                f"và chuyển các dòng cũ sang {table_name}_duplicates."
+            )
+
+        backup = f"{table_name}_duplicates"
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {backup} AS SELECT * FROM {table_name} WHERE 1 = 0"))
+        conn.execute(text(f"INSERT INTO {backup} SELECT * FROM {table_name} WHERE id NOT IN ({keep_sql})"))
+        result = conn.execute(text(f"DELETE FROM {table_name} WHERE id NOT IN ({keep_sql})"))
+        print(f"[DB MIGRATION] - Moved {result.rowcount} duplicate rows from {table_name} ({cols_sql}) to {backup}")
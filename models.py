@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Date, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Boolean, Date, JSON, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -23,6 +23,8 @@ class School(Base):
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
     name = Column(String, unique=True, index=True, nullable=False)
     api_key = Column(String, unique=True, index=True, default=generate_uuid)
+    # Phiên bản dữ liệu cho ETag (danh sách trường)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     file_submissions = relationship("FileSubmission", back_populates="school", cascade="all, delete-orphan")
     data_entries = relationship("DataEntry", back_populates="school", cascade="all, delete-orphan")
@@ -38,12 +40,19 @@ class FileTask(Base):
     is_notification_sent = Column(Boolean, default=False)
     is_locked = Column(Boolean, default=False, nullable=False)
     attachment_url = Column(String, nullable=True)
+    # Thay đổi mỗi lần sửa (tiêu đề, hạn nộp, khóa...) để tính ETag cho client
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     school_year_id = Column(Integer, ForeignKey("school_years.id"))
     school_year = relationship("SchoolYear")
     
     submissions = relationship("FileSubmission", back_populates="task")
 
+    # Danh sách task luôn sắp xếp theo hạn nộp mới nhất trước
+    __table_args__ = (
+        Index("ix_file_tasks_deadline", "deadline"),
+    )
+
 class FileSubmission(Base):
     __tablename__ = "file_submissions"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -55,6 +64,11 @@ class FileSubmission(Base):
     task = relationship("FileTask", back_populates="submissions")
     school = relationship("School", back_populates="file_submissions")
 
+    # Mỗi trường chỉ có một bản nộp cho mỗi yêu cầu (create_file_submission ghi đè bản cũ)
+    __table_args__ = (
+        Index("ux_file_submissions_task_school", "task_id", "school_id", unique=True),
+    )
+
 class DataReport(Base):
     __tablename__ = "data_reports"
     id = Column(Integer, primary_key=True, index=True, autoincrement=True)
@@ -68,11 +82,16 @@ class DataReport(Base):
     
     columns_schema = Column(JSON, nullable=False) 
     template_data = Column(JSON, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     school_year_id = Column(Integer, ForeignKey("school_years.id"))
     school_year = relationship("SchoolYear")
     
     entries = relationship("DataEntry", back_populates="report", cascade="all, delete-orphan")
+
+    __table_args__ = (
+        Index("ix_data_reports_deadline", "deadline"),
+    )
     
 class DataEntry(Base):
     __tablename__ = "data_entries"
@@ -87,6 +106,30 @@ class DataEntry(Base):
     
     report = relationship("DataReport", back_populates="entries")
     school = relationship("School", back_populates="data_entries")
+    rows = relationship("DataEntryRow", back_populates="entry", cascade="all, delete-orphan",
+                        order_by="DataEntryRow.row_index")
+
+    # Mỗi trường chỉ có một bản ghi nhập liệu cho mỗi báo cáo
+    __table_args__ = (
+        Index("ux_data_entries_report_school", "report_id", "school_id", unique=True),
+    )
+
+class DataEntryRow(Base):
+    """
+    Lưu dữ liệu nhập liệu theo từng dòng (tùy chọn, bật bằng DATA_ENTRY_ROW_STORAGE=1).
+    Khi một DataEntry dùng bảng này thì cột DataEntry.data được để NULL.
+    """
+    __tablename__ = "data_entry_rows"
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    entry_id = Column(Integer, ForeignKey("data_entries.id", ondelete="CASCADE"), nullable=False)
+    row_index = Column(Integer, nullable=False)
+    data = Column(JSON, nullable=False)
+
+    entry = relationship("DataEntry", back_populates="rows")
+
+    __table_args__ = (
+        Index("ux_data_entry_rows_entry_row", "entry_id", "row_index", unique=True),
+    )
 
 class TaskReminder(Base):
     __tablename__ = "task_reminders"
@@ -98,4 +141,67 @@ class TaskReminder(Base):
     
     school = relationship("School", back_populates="reminders")
 
+    __table_args__ = (
+        # Tra cứu giao việc / nhắc nhở theo (loại, công việc, trường)
+        Index("ux_task_reminders_type_task_school", "task_type", "task_id", "school_id", unique=True),
+        # Client lọc các nhắc nhở của chính trường mình
+        Index("ix_task_reminders_school_type", "school_id", "task_type"),
+    )
 
+class SchoolComplianceCounter(Base):
+    """
+    Trạng thái nộp của từng cặp (trường, công việc) để tổng hợp báo cáo tuân thủ mà không phải
+    tính lại từ các bảng gốc. Được crud cập nhật trong cùng giao dịch với các thao tác ghi
+    (nộp bài, giao việc, sửa hạn nộp...); `python manage.py rebuild-compliance` tính lại toàn bộ.
+    """
+    __tablename__ = "school_compliance_counters"
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    school_id = Column(Integer, ForeignKey("schools.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)  # "file" hoặc "data"
+    item_id = Column(Integer, nullable=False)  # FileTask.id hoặc DataReport.id
+    # Sao chép từ công việc để lọc theo khoảng thời gian / năm học không cần JOIN
+    school_year_id = Column(Integer, nullable=True)
+    deadline = Column(DateTime, nullable=False)
+    status = Column(Integer, nullable=False)  # 0 = thiếu, 1 = trễ, 2 = đúng hạn
+
+    __table_args__ = (
+        Index("ux_compliance_counters_school_kind_item", "school_id", "kind", "item_id", unique=True),
+        Index("ix_compliance_counters_kind_deadline", "kind", "deadline"),
+    )
+
+class ChangeLogEntry(Base):
+    """
+    Nhật ký thay đổi cho GET /sync: mỗi thao tác ghi lên yêu cầu nộp file, báo cáo, trường, năm học
+    (kể cả nộp bài và nhắc nhở) thêm một dòng trong cùng giao dịch. id tăng dần là cursor của client;
+    action="delete" là tombstone của bản ghi đã xóa.
+    """
+    __tablename__ = "change_log"
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    entity = Column(String, nullable=False)  # "file_task" | "data_report" | "school" | "school_year" | "reset"
+    entity_id = Column(Integer, nullable=False)
+    action = Column(String, nullable=False, default="upsert")  # "upsert" hoặc "delete"
+    # NULL = thay đổi chung; có giá trị = chỉ ảnh hưởng cờ đã nộp / đã nhắc của trường đó
+    school_id = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_change_log_school_id", "school_id", "id"),
+    )
+
+class DriveFolder(Base):
+    """
+    ID thư mục Google Drive theo (thư mục cha, tên ASCII) mà crud._get_or_create_folder đã tìm thấy / tạo,
+    để các lần lấy thư mục nộp bài sau không phải files().list trên Drive. Dòng bị xóa khi Drive báo 404.
+    """
+    __tablename__ = "drive_folders"
+    parent_id = Column(String, primary_key=True)
+    name = Column(String, primary_key=True)
+    folder_id = Column(String, nullable=False, index=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class DriveFolderShare(Base):
+    """Thư mục đã chia sẻ quyền ghi cho email nào (tránh gọi permissions().create lặp lại)."""
+    __tablename__ = "drive_folder_shares"
+    folder_id = Column(String, primary_key=True)
+    email = Column(String, primary_key=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
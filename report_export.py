@@ -0,0 +1,258 @@
+# report_export.py
+"""
+Xuất dữ liệu tổng hợp của một báo cáo nhập liệu (GET /data-reports/{id}/export-excel?format=...).
+
+- xlsx:    workbook write_only, dựng trên file tạm rồi gửi theo từng khối.
+- csv:     sinh và gửi dần từng nhóm dòng (UTF-8 có BOM để Excel đọc đúng tiếng Việt).
+- jsonl:   mỗi dòng một object JSON, gửi dần như csv.
+- parquet: cột có kiểu theo columns_schema (int/float/date/enum), cần cài pyarrow.
+
+Dữ liệu được đọc bằng crud.iter_data_submission_rows_with_school (yield_per) nên bộ nhớ không tăng theo
+số trường đã nộp. Mỗi dòng có thêm hai cột nguồn gốc: tên trường và thời điểm nộp.
+
+Các generator tự mở session riêng: StreamingResponse chạy sau khi endpoint trả về, lúc đó session của
+Depends(get_db) có thể đã đóng.
+"""
+import csv
+import io
+import json
+import re
+import tempfile
+from datetime import date, datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+from zoneinfo import ZoneInfo
+
+import openpyxl
+
+import crud
+from database import SessionLocal
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pyarrow là tùy chọn, chỉ cần cho format=parquet
+    pa = pq = None
+
+EXPORT_CHUNK_SIZE = 64 * 1024
+EXPORT_BATCH_SIZE = 1000
+# Số dòng gom lại trước khi gửi (csv/jsonl) hoặc ghi một row group (parquet)
+EXPORT_FLUSH_ROWS = 5000
+REPORT_TIMEZONE = ZoneInfo("Asia/Ho_Chi_Minh")
+PROVENANCE_HEADERS = ["Trường", "Thời điểm nộp"]
+PROVENANCE_FIELDS = ["school_name", "submitted_at"]
+
+XLSX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+PARQUET_MEDIA_TYPE = "application/vnd.apache.parquet"
+
+
+def _local_time(value: datetime) -> datetime:
+    # submitted_at lưu theo UTC (naive)
+    return value.replace(tzinfo=timezone.utc).astimezone(REPORT_TIMEZONE)
+
+
+def iter_report_rows(db, report_id: int, columns_schema: List[Dict[str, Any]]) -> Iterator[list]:
+    """Từng dòng xuất ra: [tên trường, thời điểm nộp (giờ Việt Nam), giá trị các cột theo columns_schema]."""
+    keys = [col["name"] for col in columns_schema]
+    for school_name, submitted_at, row in crud.iter_data_submission_rows_with_school(db, report_id, EXPORT_BATCH_SIZE):
+        yield [school_name, _local_time(submitted_at), *(row.get(key, "") for key in keys)]
+
+
+def _with_rows(report_id: int, columns_schema, session_factory, consume: Callable[[Iterator[list]], Iterator[bytes]]):
+    db = session_factory()
+    try:
+        yield from consume(iter_report_rows(db, report_id, columns_schema))
+    finally:
+        db.close()
+
+
+def _iter_file_chunks(file_obj) -> Iterator[bytes]:
+    file_obj.seek(0)
+    while True:
+        chunk = file_obj.read(EXPORT_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+# --- xlsx ---
+
+def stream_xlsx(report_id: int, columns_schema: List[Dict[str, Any]], session_factory=SessionLocal) -> Iterator[bytes]:
+    """
+    Workbook write_only: openpyxl ghi từng dòng ra file tạm thay vì giữ ô trong bộ nhớ,
+    file xlsx hoàn chỉnh cũng nằm trên đĩa rồi được gửi đi theo từng khối EXPORT_CHUNK_SIZE.
+    """
+    def consume(rows):
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Tổng hợp")
+        sheet.append(PROVENANCE_HEADERS + [col["title"] for col in columns_schema])
+        for values in rows:
+            # Excel không lưu múi giờ
+            values[1] = values[1].replace(tzinfo=None)
+            sheet.append(values)
+        with tempfile.TemporaryFile() as output:
+            workbook.save(output)
+            yield from _iter_file_chunks(output)
+
+    return _with_rows(report_id, columns_schema, session_factory, consume)
+
+
+# --- csv / jsonl ---
+
+def stream_csv(report_id: int, columns_schema: List[Dict[str, Any]], session_factory=SessionLocal) -> Iterator[bytes]:
+    def consume(rows):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(PROVENANCE_HEADERS + [col["title"] for col in columns_schema])
+        pending = 0
+        first = True
+        for values in rows:
+            values[1] = values[1].strftime("%Y-%m-%d %H:%M:%S")
+            writer.writerow(values)
+            pending += 1
+            if pending >= EXPORT_FLUSH_ROWS:
+                yield (("\ufeff" if first else "") + buffer.getvalue()).encode("utf-8")
+                buffer.seek(0)
+                buffer.truncate()
+                pending = 0
+                first = False
+        yield (("\ufeff" if first else "") + buffer.getvalue()).encode("utf-8")
+
+    return _with_rows(report_id, columns_schema, session_factory, consume)
+
+
+def stream_jsonl(report_id: int, columns_schema: List[Dict[str, Any]], session_factory=SessionLocal) -> Iterator[bytes]:
+    fields = PROVENANCE_FIELDS + [col["name"] for col in columns_schema]
+
+    def consume(rows):
+        lines = []
+        for values in rows:
+            values[1] = values[1].isoformat()
+            lines.append(json.dumps(dict(zip(fields, values)), ensure_ascii=False, default=str))
+            if len(lines) >= EXPORT_FLUSH_ROWS:
+                yield ("\n".join(lines) + "\n").encode("utf-8")
+                lines = []
+        if lines:
+            yield ("\n".join(lines) + "\n").encode("utf-8")
+
+    return _with_rows(report_id, columns_schema, session_factory, consume)
+
+
+# --- parquet ---
+
+_DMY = re.compile(r"(\d{2})/(\d{2})/(\d{4})")
+
+
+def _to_int(value) -> Optional[int]:
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    if isinstance(value, float):
+        return int(value) if value.is_integer() else None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        try:
+            number = float(str(value).replace(",", "."))
+            return int(number) if number.is_integer() else None
+        except ValueError:
+            return None
+
+
+def _to_float(value) -> Optional[float]:
+    if value is None or value == "" or isinstance(value, bool):
+        return None
+    try:
+        return float(value) if not isinstance(value, str) else float(value.replace(",", "."))
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_date(value) -> Optional[date]:
+    # Cùng hai định dạng mà bảng nhập liệu chấp nhận: YYYY-MM-DD và DD/MM/YYYY
+    if not isinstance(value, str) or not value:
+        return None
+    match = _DMY.fullmatch(value)
+    try:
+        if match:
+            day, month, year = match.groups()
+            return date(int(year), int(month), int(day))
+        return date.fromisoformat(value)
+    except ValueError:
+        return None
+
+
+def _to_str(value) -> Optional[str]:
+    if value is None or value == "":
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+def _parquet_column(col: Dict[str, Any]):
+    """(kiểu Arrow, hàm chuyển giá trị) cho một cột theo dtype; giá trị không chuyển được thành null."""
+    dtype = col.get("dtype")
+    if dtype == "int":
+        return pa.int64(), _to_int
+    if dtype == "float":
+        return pa.float64(), _to_float
+    if dtype == "date":
+        return pa.date32(), _to_date
+    if dtype == "enum":
+        return pa.dictionary(pa.int32(), pa.string()), _to_str
+    return pa.string(), _to_str
+
+
+def parquet_schema(columns_schema: List[Dict[str, Any]]):
+    fields = [
+        pa.field("school_name", pa.dictionary(pa.int32(), pa.string())),
+        pa.field("submitted_at", pa.timestamp("us", tz="Asia/Ho_Chi_Minh")),
+    ]
+    for col in columns_schema:
+        arrow_type, _ = _parquet_column(col)
+        fields.append(pa.field(col["name"], arrow_type, metadata={"title": col["title"]}))
+    return pa.schema(fields)
+
+
+def stream_parquet(report_id: int, columns_schema: List[Dict[str, Any]], session_factory=SessionLocal) -> Iterator[bytes]:
+    """Ghi từng row group EXPORT_FLUSH_ROWS dòng ra file tạm (nén zstd) rồi gửi theo khối."""
+    if pa is None:
+        raise RuntimeError("Cần cài pyarrow để xuất Parquet.")
+    schema = parquet_schema(columns_schema)
+    converters = [_parquet_column(col)[1] for col in columns_schema]
+
+    def consume(rows):
+        with tempfile.TemporaryFile() as output:
+            writer = pq.ParquetWriter(output, schema, compression="zstd")
+            columns = [[] for _ in schema]
+
+            def flush():
+                writer.write_batch(pa.record_batch(
+                    [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+                ))
+                for values in columns:
+                    values.clear()
+
+            for values in rows:
+                columns[0].append(values[0])
+                columns[1].append(values[1])
+                for index, (convert, value) in enumerate(zip(converters, values[2:]), start=2):
+                    columns[index].append(convert(value))
+                if len(columns[0]) >= EXPORT_FLUSH_ROWS:
+                    flush()
+            if columns[0]:
+                flush()
+            writer.close()
+            yield from _iter_file_chunks(output)
+
+    return _with_rows(report_id, columns_schema, session_factory, consume)
+
+
+# format -> (generator, media type, phần mở rộng)
+EXPORT_FORMATS = {
+    "xlsx": (stream_xlsx, XLSX_MEDIA_TYPE, "xlsx"),
+    "csv": (stream_csv, "text/csv; charset=utf-8", "csv"),
+    "jsonl": (stream_jsonl, "application/x-ndjson", "jsonl"),
+    "parquet": (stream_parquet, PARQUET_MEDIA_TYPE, "parquet"),
+}
+
+
+def is_available(export_format: str) -> bool:
+    return export_format != "parquet" or pa is not None
@@ -21,10 +21,12 @@ def check_deadlines_and_send_email():
             models.FileTask.deadline < datetime.utcnow(),
             models.FileTask.is_notification_sent == False
         ).all()
+        # Tính trạng thái cho tất cả yêu cầu quá hạn trong một lượt truy vấn
+        file_statuses = crud.get_status_for_tasks(db, "file", [task.id for task in overdue_file_tasks])
 
         for task in overdue_file_tasks:
             print(f"Phát hiện yêu cầu nộp file quá hạn: '{task.title}'")
-            status_data = crud.get_file_task_status(db, task_id=task.id)
+            status_data = file_statuses[task.id]
             
             subject = f"[BÁO CÁO TỰ ĐỘNG] Yêu cầu nộp file '{task.title}' đã quá hạn"
             
@@ -63,10 +65,11 @@ def check_deadlines_and_send_email():
             models.DataReport.deadline < datetime.utcnow(),
             models.DataReport.is_notification_sent == False
         ).all()
+        data_statuses = crud.get_status_for_tasks(db, "data", [report.id for report in overdue_data_reports])
 
         for report in overdue_data_reports:
             print(f"Phát hiện yêu cầu nhập liệu quá hạn: '{report.title}'")
-            status_data = crud.get_data_report_status(db, report_id=report.id)
+            status_data = data_statuses[report.id]
             
             subject = f"[BÁO CÁO TỰ ĐỘNG] Yêu cầu nhập liệu '{report.title}' đã quá hạn"
             
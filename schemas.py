@@ -151,6 +151,13 @@ class DataReportUpdate(BaseModel):
 class AdminDataSubmissionUpdate(BaseModel): 
     data: List[Dict[str, Any]]
 
+class ReminderBulkCreate(BaseModel):
+    task_ids: List[int]
+
+class ReminderResult(BaseModel):
+    message: str
+    inserted: int = 0
+
 class DashboardStats(BaseModel):
     overdue_file_tasks: int
     overdue_data_reports: int
@@ -175,4 +182,20 @@ class ComplianceSummary(BaseModel):
     # 3 nhóm theo yêu cầu:
     ontime: List[SchoolComplianceEntry]
     late: List[SchoolComplianceEntry]
-    missing: List[SchoolComplianceEntry]
\ No newline at end of file
+    missing: List[SchoolComplianceEntry]
+
+
+class SyncDeleted(BaseModel):
+    file_task: List[int] = []
+    data_report: List[int] = []
+    school: List[int] = []
+    school_year: List[int] = []
+
+class SyncResponse(BaseModel):
+    cursor: int
+    full: bool  # True: đây là toàn bộ dữ liệu, client thay thế trạng thái cục bộ
+    file_tasks: List[FileTask] = []
+    data_reports: List[DataReport] = []
+    schools: List[School] = []  # chỉ trả cho quản trị (client không gửi API key)
+    school_years: List[SchoolYear] = []
+    deleted: SyncDeleted = SyncDeleted()
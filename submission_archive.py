@@ -0,0 +1,143 @@
+# submission_archive.py
+"""
+Tạo file ZIP chứa bài nộp của tất cả các trường cho GET /file-tasks/{id}/download-all.
+
+- File được tải từ Google Drive song song bằng một thread pool dùng chung cho mọi request
+  (DOWNLOAD_ALL_WORKERS luồng; mỗi request giữ tối đa DOWNLOAD_ALL_IN_FLIGHT file đang tải/chờ ghi),
+  nên bộ nhớ chỉ giữ vài file một lúc và các luồng (cùng service Drive của từng luồng) được dùng lại.
+- ZIP được ghi tuần tự ra luồng response (zip64, data descriptor), file nào tải xong trước thì ghi trước;
+  client nhận dữ liệu ngay từ file đầu tiên, không phải chờ dựng xong toàn bộ ZIP trong bộ nhớ.
+- Cuối ZIP có _manifest.txt liệt kê các trường không tải được file và lý do.
+"""
+import io
+import os
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Iterator, List, Optional, Tuple
+
+import crud
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+DOWNLOAD_ALL_WORKERS = _env_int("DOWNLOAD_ALL_WORKERS", 8)
+DOWNLOAD_ALL_IN_FLIGHT = _env_int("DOWNLOAD_ALL_IN_FLIGHT", DOWNLOAD_ALL_WORKERS * 2)
+ZIP_WRITE_CHUNK_SIZE = 256 * 1024
+# Bài nộp phần lớn là pdf/docx/xlsx đã nén sẵn: mức 1 đủ cho file văn bản mà không tốn CPU
+ZIP_COMPRESS_LEVEL = 1
+MANIFEST_NAME = "_manifest.txt"
+
+# Tạo luồng dần khi có việc; dùng chung để không tạo lại luồng và service Drive ở mỗi lần "Tải tất cả"
+_download_pool = ThreadPoolExecutor(max_workers=max(DOWNLOAD_ALL_WORKERS, 1), thread_name_prefix="download-all")
+
+
+class _ZipOutput(io.RawIOBase):
+    """Đích ghi của ZipFile: gom các byte đã ghi để generator lấy ra và gửi đi (không seek được)."""
+
+    def __init__(self):
+        super().__init__()
+        self._chunks: List[bytes] = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> Iterator[bytes]:
+        if self._chunks:
+            data = b"".join(self._chunks)
+            self._chunks.clear()
+            yield data
+
+
+def _fetch(file_url: Optional[str]) -> Tuple[Optional[bytes], Optional[str], Optional[str]]:
+    """Tải một bài nộp; trả về (nội dung, tên file, lỗi)."""
+    file_id = crud.extract_drive_file_id_from_url(file_url or "")
+    if not file_id:
+        return None, None, "Link file không hợp lệ"
+    try:
+        content, file_name = crud.download_file_from_drive(file_id)
+    except Exception as e:
+        return None, None, f"Lỗi khi tải file: {e}"
+    if content is None or not file_name:
+        return None, None, "Không tải được file từ Google Drive"
+    return content, file_name, None
+
+
+def _iter_downloads(pool: ThreadPoolExecutor, submissions: List[Tuple[str, str]]):
+    """
+    Tải song song, trả về (tên trường, kết quả _fetch) theo thứ tự hoàn thành; giữ tối đa DOWNLOAD_ALL_IN_FLIGHT file.
+    Khi generator bị đóng giữa chừng, hủy các file của request này chưa bắt đầu tải.
+    """
+    queue = iter(submissions)
+    pending = {}
+
+    def submit_next():
+        for school_name, file_url in queue:
+            pending[pool.submit(_fetch, file_url)] = school_name
+            return
+
+    try:
+        for _ in range(max(DOWNLOAD_ALL_IN_FLIGHT, 1)):
+            submit_next()
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                school_name = pending.pop(future)
+                submit_next()
+                yield school_name, future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+def _unique_name(name: str, used: set) -> str:
+    base, ext = os.path.splitext(name)
+    candidate, index = name, 2
+    while candidate in used:
+        candidate = f"{base} ({index}){ext}"
+        index += 1
+    used.add(candidate)
+    return candidate
+
+
+def _manifest(total: int, failures: List[Tuple[str, str]]) -> str:
+    lines = [f"Tổng số bài nộp: {total}", f"Tải thành công: {total - len(failures)}",
+             f"Không tải được: {len(failures)}"]
+    if failures:
+        lines += ["", "Trường\tLý do"] + [f"{school_name}\t{reason}" for school_name, reason in failures]
+    return "\n".join(lines) + "\n"
+
+
+def stream_submissions_zip(submissions: List[Tuple[str, str]]) -> Iterator[bytes]:
+    """submissions: [(tên trường, file_url)]. Sinh dần các byte của file ZIP."""
+    output = _ZipOutput()
+    failures: List[Tuple[str, str]] = []
+    used_names: set = set()
+    downloads = _iter_downloads(_download_pool, submissions)
+    try:
+        with zipfile.ZipFile(output, "w", zipfile.ZIP_DEFLATED, allowZip64=True,
+                             compresslevel=ZIP_COMPRESS_LEVEL) as archive:
+            for school_name, (content, file_name, error) in downloads:
+                if error:
+                    failures.append((school_name, error))
+                    continue
+                # Không biết trước kích thước nén nên bật zip64 cho từng mục (ZIP > 4 GiB vẫn hợp lệ)
+                with archive.open(_unique_name(f"{school_name} - {file_name}", used_names), "w",
+                                  force_zip64=True) as entry:
+                    for offset in range(0, len(content), ZIP_WRITE_CHUNK_SIZE):
+                        entry.write(content[offset:offset + ZIP_WRITE_CHUNK_SIZE])
+                        yield from output.drain()
+                yield from output.drain()
+            archive.writestr(MANIFEST_NAME, _manifest(len(submissions), failures))
+        yield from output.drain()
+    finally:
+        # Client ngắt kết nối giữa chừng: bỏ các file chưa bắt đầu tải (pool dùng chung vẫn chạy tiếp)
+        downloads.close()
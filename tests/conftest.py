@@ -0,0 +1,58 @@
+# tests/conftest.py
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Các module của ứng dụng nằm ở thư mục gốc của repo
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# main kiểm tra schema của DATABASE_URL ngay khi import: không bao giờ trỏ vào CSDL thật khi chạy test
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='autoreport-test-'), 'app.db')}"
+
+import cache  # noqa: E402
+import models  # noqa: E402
+from database import build_async_engine, build_engine  # noqa: E402
+
+
+@pytest.fixture
+def db_engine(tmp_path):
+    """CSDL SQLite (file, bật PRAGMA như production) riêng cho từng test."""
+    engine = build_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    models.Base.metadata.create_all(bind=engine)
+    cache.invalidate_all()
+    try:
+        yield engine
+    finally:
+        engine.dispose()
+        cache.invalidate_all()
+
+
+@pytest.fixture
+def client(db_engine):
+    """TestClient của main.app dùng CSDL của db_engine cho cả session đồng bộ và bất đồng bộ (không chạy scheduler)."""
+    from fastapi.testclient import TestClient
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    from sqlalchemy.orm import sessionmaker
+
+    import main
+
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+    async_engine = build_async_engine(str(db_engine.url))
+    AsyncSession = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+
+    def get_db():
+        with Session() as db:
+            yield db
+
+    async def get_async_db():
+        async with AsyncSession() as db:
+            yield db
+
+    main.app.dependency_overrides[main.get_db] = get_db
+    main.app.dependency_overrides[main.get_async_db] = get_async_db
+    try:
+        yield TestClient(main.app)
+    finally:
+        main.app.dependency_overrides.clear()
+        async_engine.sync_engine.dispose()
@@ -0,0 +1,99 @@
+# tests/test_compliance_summary.py
+"""
+compute_compliance_summary (bộ đếm school_compliance_counters + GROUP BY) phải cho cùng kết quả với
+compute_compliance_summary_reference (vòng lặp Python trên các bảng gốc).
+"""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import models
+
+NOW = datetime.utcnow().replace(microsecond=0)
+ORPHAN_SCHOOL_ID = 999
+
+
+@pytest.fixture
+def db(db_engine):
+    session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)()
+    try:
+        _seed(session)
+        crud.rebuild_compliance_counters(session)
+        yield session
+    finally:
+        session.close()
+
+
+def _seed(db):
+    year = models.SchoolYear(name="2025-2026")
+    other_year = models.SchoolYear(name="2024-2025")
+    db.add_all([year, other_year])
+    db.flush()
+    a, b, c, d = (models.School(name=name) for name in ("Trường A", "Trường B", "Trường C", "Trường D"))
+    db.add_all([a, b, c, d])
+    db.flush()
+
+    # Giao cho A, B (và một trường đã bị xóa): A đúng hạn, B trễ
+    assigned = models.FileTask(title="Giao A, B", deadline=NOW - timedelta(days=1), school_year_id=year.id)
+    # Không có reminder = giao cho tất cả: A đúng hạn, các trường còn lại thiếu
+    for_all = models.FileTask(title="Tất cả", deadline=NOW - timedelta(days=2), school_year_id=year.id)
+    # Năm học khác, chỉ khác kết quả khi lọc theo năm học
+    old_task = models.FileTask(title="Năm trước", deadline=NOW - timedelta(days=3), school_year_id=other_year.id)
+    # Ngoài khoảng thời gian truy vấn
+    too_old = models.FileTask(title="Quá cũ", deadline=NOW - timedelta(days=90), school_year_id=year.id)
+    db.add_all([assigned, for_all, old_task, too_old])
+    db.flush()
+    for school_id in (a.id, b.id, ORPHAN_SCHOOL_ID):
+        db.add(models.TaskReminder(task_type="file", task_id=assigned.id, school_id=school_id))
+    db.add_all([
+        models.FileSubmission(task_id=assigned.id, school_id=a.id, file_url="u",
+                              submitted_at=assigned.deadline - timedelta(hours=2)),
+        models.FileSubmission(task_id=assigned.id, school_id=b.id, file_url="u",
+                              submitted_at=assigned.deadline + timedelta(hours=2)),
+        models.FileSubmission(task_id=for_all.id, school_id=a.id, file_url="u",
+                              submitted_at=for_all.deadline - timedelta(minutes=5)),
+        models.FileSubmission(task_id=old_task.id, school_id=c.id, file_url="u",
+                              submitted_at=old_task.deadline + timedelta(days=1)),
+    ])
+
+    # Báo cáo dữ liệu: A đúng hạn, B trễ, C chưa nộp, cộng một dòng mồ côi của trường đã bị xóa
+    report = models.DataReport(title="Số liệu", deadline=NOW - timedelta(hours=1), school_year_id=year.id,
+                               columns_schema=[])
+    future = models.DataReport(title="Sắp tới hạn", deadline=NOW + timedelta(days=3), school_year_id=year.id,
+                               columns_schema=[])
+    db.add_all([report, future])
+    db.flush()
+    db.add_all([
+        models.DataEntry(report_id=report.id, school_id=a.id, submitted_at=report.deadline - timedelta(hours=1)),
+        models.DataEntry(report_id=report.id, school_id=b.id, submitted_at=report.deadline + timedelta(minutes=1)),
+        models.DataEntry(report_id=report.id, school_id=c.id, submitted_at=None),
+        models.DataEntry(report_id=report.id, school_id=ORPHAN_SCHOOL_ID, submitted_at=None),
+        models.DataEntry(report_id=future.id, school_id=d.id, submitted_at=None),
+    ])
+    db.commit()
+
+
+@pytest.mark.parametrize("kind", ["file", "data", "both"])
+@pytest.mark.parametrize("by_year", [False, True])
+def test_counters_match_reference(db, kind, by_year):
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    end = datetime.now(timezone.utc) + timedelta(days=30)
+    school_year_id = None
+    if by_year:
+        school_year_id = db.query(models.SchoolYear.id).filter(models.SchoolYear.name == "2025-2026").scalar()
+
+    expected = crud.compute_compliance_summary_reference(db, start, end, school_year_id, kind)
+    assert crud.compute_compliance_summary(db, start, end, school_year_id, kind) == expected
+    # Không để lọt trường đã bị xóa
+    for group in expected.values():
+        assert ORPHAN_SCHOOL_ID not in {item["id"] for item in group}
+
+
+def test_fixture_covers_every_status(db):
+    start = datetime.now(timezone.utc) - timedelta(days=30)
+    end = datetime.now(timezone.utc) + timedelta(days=30)
+    summary = crud.compute_compliance_summary(db, start, end, None, "data")
+    names = {group: [item["name"] for item in items] for group, items in summary.items()}
+    assert names == {"ontime": ["Trường A"], "late": ["Trường B"], "missing": ["Trường C", "Trường D"]}
@@ -0,0 +1,40 @@
+# tests/test_download_all.py
+"""GET /file-tasks/{id}/download-all: tên trường lấy cùng bài nộp trong một truy vấn."""
+import io
+import zipfile
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import models
+
+
+def test_download_all_loads_school_names_in_one_query(client, db_engine, monkeypatch):
+    with sessionmaker(bind=db_engine)() as db:
+        task = models.FileTask(title="Báo cáo", content="c", deadline=datetime.utcnow() + timedelta(days=1))
+        schools = [models.School(name=f"Trường {i}") for i in range(5)]
+        db.add_all([task, *schools])
+        db.flush()
+        db.add_all([models.FileSubmission(task_id=task.id, school_id=school.id,
+                                          file_url=f"https://drive.google.com/file/d/file{i}abc/view")
+                    for i, school in enumerate(schools)])
+        db.commit()
+        task_id = task.id
+    monkeypatch.setattr(crud, "download_file_from_drive", lambda file_id: (file_id.encode(), f"{file_id}.pdf"))
+
+    statements = []
+    listener = lambda conn, cursor, statement, *args: statements.append(statement)  # noqa: E731
+    event.listen(db_engine, "before_cursor_execute", listener)
+    try:
+        response = client.get(f"/file-tasks/{task_id}/download-all")
+    finally:
+        event.remove(db_engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200
+    names = zipfile.ZipFile(io.BytesIO(response.content)).namelist()
+    # File nào tải xong trước thì ghi trước; manifest luôn ở cuối
+    assert sorted(names[:-1]) == [f"Trường {i} - file{i}abc.pdf" for i in range(5)]
+    assert names[-1] == "_manifest.txt"
+    assert len(statements) == 1
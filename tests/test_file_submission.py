@@ -0,0 +1,61 @@
+# tests/test_file_submission.py
+"""create_file_submission: nộp lại ghi đè bản cũ, kể cả khi hai lần nộp đầu tiên chạy đồng thời."""
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import models
+import schemas
+
+
+def _task_and_school(Session):
+    with Session() as db:
+        school = models.School(name="Trường A")
+        task = models.FileTask(title="Báo cáo", deadline=datetime.utcnow() + timedelta(days=1))
+        db.add_all([school, task])
+        db.commit()
+        return task.id, school.id
+
+
+def test_resubmission_updates_existing_row(db_engine):
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+    task_id, school_id = _task_and_school(Session)
+    with Session() as db:
+        first = crud.create_file_submission(db, schemas.FileSubmissionCreate(task_id=task_id, file_url="u1"), school_id)
+        second = crud.create_file_submission(db, schemas.FileSubmissionCreate(task_id=task_id, file_url="u2"), school_id)
+        assert second.id == first.id
+        assert second.file_url == "u2"
+        assert second.submitted_at >= first.submitted_at
+        assert db.query(models.FileSubmission).count() == 1
+
+
+def test_concurrent_first_submissions_do_not_fail(db_engine):
+    Session = sessionmaker(autocommit=False, autoflush=False, bind=db_engine)
+    task_id, school_id = _task_and_school(Session)
+    workers = 6
+    barrier = threading.Barrier(workers)
+    errors = []
+
+    def submit(index):
+        try:
+            with Session() as db:
+                barrier.wait()
+                crud.create_file_submission(
+                    db, schemas.FileSubmissionCreate(task_id=task_id, file_url=f"u{index}"), school_id
+                )
+        except Exception as e:  # pragma: no cover - chỉ xảy ra khi có lỗi
+            errors.append(e)
+
+    threads = [threading.Thread(target=submit, args=(i,)) for i in range(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    with Session() as db:
+        rows = db.query(models.FileSubmission).filter_by(task_id=task_id, school_id=school_id).all()
+        assert len(rows) == 1
+        assert rows[0].file_url in {f"u{i}" for i in range(workers)}
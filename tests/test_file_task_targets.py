@@ -0,0 +1,48 @@
+# tests/test_file_task_targets.py
+"""create_file_task_with_targets chỉ giao cho các trường còn tồn tại."""
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.orm import sessionmaker
+
+import crud
+import models
+import schemas
+
+
+@pytest.fixture
+def db(db_engine):
+    with sessionmaker(autocommit=False, autoflush=False, bind=db_engine)() as session:
+        yield session
+
+
+def _task(db):
+    year = models.SchoolYear(name="2025-2026")
+    db.add(year)
+    db.commit()
+    return schemas.FileTaskCreate(title="Báo cáo", content="c", deadline=datetime.utcnow() + timedelta(days=1),
+                                  school_year_id=year.id)
+
+
+def test_unknown_and_duplicate_school_ids_are_dropped(db):
+    school = models.School(name="Trường A")
+    db.add(school)
+    db.commit()
+
+    task = crud.create_file_task_with_targets(db, _task(db), [school.id, 999, school.id])
+
+    reminders = db.query(models.TaskReminder.school_id).filter_by(task_type="file", task_id=task.id).all()
+    assert reminders == [(school.id,)]
+
+
+def test_only_unknown_school_ids_is_rejected(db):
+    db.add(models.School(name="Trường A"))
+    db.commit()
+
+    with pytest.raises(HTTPException) as excinfo:
+        crud.create_file_task_with_targets(db, _task(db), [998, 999])
+
+    assert excinfo.value.status_code == 400
+    assert db.query(models.FileTask).count() == 0
+    assert db.query(models.TaskReminder).count() == 0
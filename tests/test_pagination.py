@@ -0,0 +1,58 @@
+# tests/test_pagination.py
+"""Phân trang keyset: đi hết các trang theo header X-Next-Cursor."""
+from datetime import datetime, timedelta
+
+from sqlalchemy.orm import sessionmaker
+
+import models
+
+
+def _all_pages(client, endpoint, limit):
+    rows, params, pages = [], {"limit": limit}, 0
+    while True:
+        response = client.get(endpoint, params=params)
+        assert response.status_code == 200, response.text
+        rows += response.json()
+        pages += 1
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            return rows, pages
+        params = {"limit": limit, "cursor": cursor}
+
+
+def test_schools_cursor_round_trip(client, db_engine):
+    with sessionmaker(bind=db_engine)() as db:
+        db.add_all([models.School(name=f"Trường {i:02d}") for i in range(7)])
+        db.commit()
+
+    rows, pages = _all_pages(client, "/schools/", limit=3)
+    assert pages == 3
+    assert [row["name"] for row in rows] == [f"Trường {i:02d}" for i in range(7)]
+
+
+def test_file_task_pages_are_stable_when_rows_are_inserted(client, db_engine):
+    Session = sessionmaker(bind=db_engine)
+    now = datetime.utcnow()
+    with Session() as db:
+        year = models.SchoolYear(name="2025-2026")
+        db.add(year)
+        db.flush()
+        db.add_all([models.FileTask(title=f"T{i}", content="c", deadline=now - timedelta(days=i),
+                                    school_year_id=year.id) for i in range(6)])
+        db.commit()
+        year_id = year.id
+
+    first = client.get("/file-tasks/", params={"limit": 3})
+    # Yêu cầu mới (hạn muộn nhất) tạo giữa hai trang không làm lặp / mất dòng ở trang sau
+    with Session() as db:
+        db.add(models.FileTask(title="Mới", content="c", deadline=now + timedelta(days=1), school_year_id=year_id))
+        db.commit()
+    second = client.get("/file-tasks/", params={"limit": 3, "cursor": first.headers["X-Next-Cursor"]})
+
+    titles = [row["title"] for row in first.json() + second.json()]
+    assert titles == [f"T{i}" for i in range(6)]
+    assert "X-Next-Cursor" in second.headers  # đúng limit dòng: có thể còn trang sau
+
+
+def test_invalid_cursor_is_rejected(client):
+    assert client.get("/schools/", params={"cursor": "không-hợp-lệ"}).status_code == 400
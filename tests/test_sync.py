@@ -0,0 +1,78 @@
+# tests/test_sync.py
+"""GET /sync (nhật ký thay đổi, cursor, bản ghi đã xóa) và ETag / 304 của danh sách."""
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+import models
+
+
+@pytest.fixture
+def setup(db_engine):
+    with sessionmaker(bind=db_engine)() as db:
+        year = models.SchoolYear(name="2025-2026")
+        a, b = models.School(name="Trường A"), models.School(name="Trường B")
+        db.add_all([year, a, b])
+        db.commit()
+        return {"year": year.id, "a": a.id, "b": b.id, "key_a": a.api_key, "key_b": b.api_key}
+
+
+def _create_task(client, setup, targets):
+    response = client.post("/file-tasks/", json={
+        "title": "Báo cáo tháng", "content": "c", "deadline": (datetime.utcnow() + timedelta(days=1)).isoformat(),
+        "school_year_id": setup["year"], "target_school_ids": targets,
+    })
+    assert response.status_code == 200, response.text
+    return response.json()["id"]
+
+
+def test_delta_then_delete(client, setup):
+    _create_task(client, setup, [])
+    initial = client.get("/sync").json()
+    assert initial["full"] is True
+    cursor = initial["cursor"]
+
+    task_id = _create_task(client, setup, [setup["a"]])
+    delta = client.get("/sync", params={"since": cursor}).json()
+    assert delta["full"] is False
+    assert [task["id"] for task in delta["file_tasks"]] == [task_id]
+    assert delta["cursor"] > cursor
+
+    # Trường A được giao, trường B không: với B yêu cầu này nằm trong "deleted"
+    as_a = client.get("/sync", params={"since": cursor}, headers={"X-API-Key": setup["key_a"]}).json()
+    as_b = client.get("/sync", params={"since": cursor}, headers={"X-API-Key": setup["key_b"]}).json()
+    assert [task["id"] for task in as_a["file_tasks"]] == [task_id]
+    assert as_b["file_tasks"] == [] and as_b["deleted"]["file_task"] == [task_id]
+
+    assert client.delete(f"/file-tasks/{task_id}").status_code == 200
+    after_delete = client.get("/sync", params={"since": delta["cursor"]}).json()
+    assert after_delete["full"] is False
+    assert after_delete["file_tasks"] == []
+    assert after_delete["deleted"]["file_task"] == [task_id]
+
+
+def test_cursor_round_trip_returns_nothing_new(client, setup):
+    _create_task(client, setup, [])
+    cursor = client.get("/sync").json()["cursor"]
+    again = client.get("/sync", params={"since": cursor}).json()
+    assert again["full"] is False and again["cursor"] == cursor
+    assert again["file_tasks"] == [] and again["deleted"]["file_task"] == []
+
+
+def test_unknown_cursor_forces_full_sync(client, setup):
+    _create_task(client, setup, [])
+    head = client.get("/sync").json()["cursor"]
+    response = client.get("/sync", params={"since": head + 100}).json()
+    assert response["full"] is True and len(response["file_tasks"]) == 1
+
+
+def test_file_task_list_etag(client, setup):
+    first = client.get("/file-tasks/")
+    etag = first.headers["ETag"]
+    cached = client.get("/file-tasks/", headers={"If-None-Match": etag})
+    assert cached.status_code == 304 and cached.headers["ETag"] == etag
+
+    _create_task(client, setup, [])
+    changed = client.get("/file-tasks/", headers={"If-None-Match": etag})
+    assert changed.status_code == 200 and changed.headers["ETag"] != etag
@@ -0,0 +1,40 @@
+# tests/test_upload_attachment.py
+"""POST /admin/upload-attachment: giới hạn ATTACHMENT_MAX_BYTES."""
+import crud
+import main
+
+
+def _fail_if_called(*args, **kwargs):
+    raise AssertionError("endpoint không được chạy với file quá lớn")
+
+
+def test_oversized_request_is_rejected_before_the_body_is_read(client, monkeypatch):
+    monkeypatch.setattr(main, "ATTACHMENT_MAX_BYTES", 1024)
+    monkeypatch.setattr(main, "_attachment_size", _fail_if_called)
+    monkeypatch.setattr(crud, "upload_attachment_to_drive", _fail_if_called)
+
+    response = client.post("/admin/upload-attachment", files={"file": ("big.bin", b"x" * 200_000)})
+    assert response.status_code == 413
+
+
+def test_chunked_upload_over_the_limit_is_rejected_by_the_endpoint(client, monkeypatch):
+    monkeypatch.setattr(main, "ATTACHMENT_MAX_BYTES", 1024)
+    monkeypatch.setattr(crud, "upload_attachment_to_drive", _fail_if_called)
+
+    def body():
+        yield (b'--B\r\nContent-Disposition: form-data; name="file"; filename="a.bin"\r\n\r\n'
+               + b"y" * 4096 + b"\r\n--B--\r\n")
+
+    response = client.post("/admin/upload-attachment", content=body(),
+                           headers={"content-type": "multipart/form-data; boundary=B"})
+    assert response.status_code == 413
+
+
+def test_small_upload_is_sent_to_drive(client, monkeypatch):
+    uploads = []
+    monkeypatch.setattr(crud, "upload_attachment_to_drive",
+                        lambda name, file_obj, db, **kwargs: uploads.append((name, file_obj.read())) or "https://x")
+
+    response = client.post("/admin/upload-attachment", files={"file": ("a.txt", b"hello")})
+    assert response.status_code == 200 and response.json() == {"file_url": "https://x"}
+    assert uploads == [("a.txt", b"hello")]